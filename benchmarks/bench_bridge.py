@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da ponte RFID (rfid_bridge.server.BridgeServer) com o leitor simulado.
+
+Gera lotes de leituras de N chips cruzando o pórtico em várias antenas,
+conecta K clientes TCP locais e mede as leituras processadas por segundo e
+o tempo até cada cliente receber todas as passagens, com o maior atraso
+registrado nas filas de envio.
+
+Uso:
+    python -m benchmarks.bench_bridge --leituras 200000 --chips 2000 --clientes 1 4 16
+"""
+
+import argparse
+import socket
+import time
+
+from rfid_bridge.crossing_estimator import CrossingEstimator
+from rfid_bridge.rfid_reader import MockRFIDReader
+from rfid_bridge.server import BridgeServer
+
+
+def gerar_lotes(leituras: int, chips: int, tamanho_lote: int):
+    lotes = []
+    for inicio in range(0, leituras, tamanho_lote):
+        lotes.append([(f"E{n % chips:06d}", 1 + n % 4, -40 - n % 25, 0)
+                      for n in range(inicio, min(inicio + tamanho_lote, leituras))])
+    return lotes
+
+
+def medir(leituras: int, chips: int, clientes: int, tamanho_lote: int):
+    leitor = MockRFIDReader("mock", read_delay=0, verbose=False)
+    # "spill": as passagens de uma rajada maior que a fila não se perdem.
+    servidor = BridgeServer(leitor, "127.0.0.1", 0, estimator=CrossingEstimator(gap=0.2), read_timeout=0.05,
+                            overflow="spill")
+    servidor.start()
+    conexoes = [socket.create_connection(servidor.address) for _ in range(clientes)]
+    while servidor.client_count < clientes:
+        time.sleep(0.01)
+
+    inicio = time.perf_counter()
+    leitor.set_mock_data(gerar_lotes(leituras, chips, tamanho_lote))
+    while servidor.stats.reads < leituras:
+        time.sleep(0.001)
+    duracao_leitura = time.perf_counter() - inicio
+
+    # Cada passagem é uma linha; todos os chips passam uma vez.
+    for conexao in conexoes:
+        recebidas = 0
+        while recebidas < chips:
+            dados = conexao.recv(65536)
+            if not dados:
+                break
+            recebidas += dados.count(b"\n")
+    duracao_total = time.perf_counter() - inicio
+
+    atraso_maximo = max(c.max_lag for c in servidor.client_stats())
+    servidor.stop()
+    for conexao in conexoes:
+        conexao.close()
+    return duracao_leitura, duracao_total, atraso_maximo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leituras", type=int, default=100_000)
+    parser.add_argument("--chips", type=int, default=1000)
+    parser.add_argument("--lote", type=int, default=200, help="leituras por ciclo do leitor")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    print(f"{args.leituras} leituras de {args.chips} chips, lotes de {args.lote}")
+    print(f"{'clientes':>8} {'leitura (s)':>12} {'leituras/s':>12} {'entrega (s)':>12} {'atraso máx. (ms)':>17}")
+    for clientes in args.clientes:
+        leitura, total, atraso = medir(args.leituras, args.chips, clientes, args.lote)
+        print(f"{clientes:>8} {leitura:>12.2f} {args.leituras / leitura:>12.0f} {total:>12.2f} {atraso * 1000:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da importação de CSV de atletas com 1..N processos de validação.
+
+Gera um arquivo sintético, mede só a validação (as faixas passam pelo
+ProcessPoolExecutor, sem banco) e a importação completa
+(GerenciadorDeCorrida.carregar_atletas_csv num banco temporário), e mostra o
+ganho em relação a um processo.
+
+Uso:
+    python -m benchmarks.bench_importacao_csv --linhas 200000 --processos 1 2 4 8
+"""
+
+import argparse
+import csv
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from crono_app.business_logic import GerenciadorDeCorrida, validar_linha_csv, BYTES_POR_FAIXA_PARALELA
+from crono_app.database_manager import DatabaseManager
+from crono_app.parallel_csv import dividir_em_faixas, ler_cabecalho, validar_em_ordem
+
+DATA_EVENTO = date(2025, 6, 22)
+
+
+def gerar_csv(caminho: str, linhas: int, semente: int = 42):
+    aleatorio = random.Random(semente)
+    categorias = ["GERAL", "PCD", "ELITE", ""]
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        f.write("num,nome,sexo,data_nascimento,modalidade,categoria\n")
+        for num in range(1, linhas + 1):
+            nascimento = f"{aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 12):02d}/{aleatorio.randint(1940, 2012)}"
+            f.write(f"{num},Atleta Número {num},{aleatorio.choice('MF')},{nascimento},"
+                    f"{aleatorio.choice(['5km', '10km', '21km'])},{aleatorio.choice(categorias)}\n")
+
+
+def medir_validacao(caminho: str, processos: int) -> float:
+    inicio = time.perf_counter()
+    if processos == 1:
+        with open(caminho, encoding="utf-8-sig", newline="") as f:
+            for linha in csv.DictReader(f):
+                validar_linha_csv(linha, DATA_EVENTO)
+    else:
+        campos, inicio_dados = ler_cabecalho(caminho)
+        quantidade = max(processos, -(-(os.path.getsize(caminho) - inicio_dados) // BYTES_POR_FAIXA_PARALELA))
+        faixas = dividir_em_faixas(caminho, inicio_dados, quantidade)
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn")) as executor:
+            for _ in validar_em_ordem(executor, caminho, faixas, campos, validar_linha_csv, DATA_EVENTO, 2 * processos):
+                pass
+    return time.perf_counter() - inicio
+
+
+def medir_importacao(caminho: str, processos: int, diretorio: str) -> float:
+    db = DatabaseManager(os.path.join(diretorio, f"bench_{processos}.db"))
+    db.setup_database()
+    gerenciador = GerenciadorDeCorrida(db, logging.getLogger("bench"))
+    inicio = time.perf_counter()
+    gerenciador.carregar_atletas_csv(caminho, DATA_EVENTO, processos=processos)
+    duracao = time.perf_counter() - inicio
+    db.fechar()
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--processos", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "atletas.csv")
+        gerar_csv(caminho, args.linhas)
+        print(f"{args.linhas} linhas, {os.path.getsize(caminho) / 1e6:.1f} MB, {os.cpu_count()} núcleo(s)")
+        print(f"{'processos':>9} {'validação (s)':>14} {'ganho':>6} {'importação (s)':>15} {'ganho':>6} {'linhas/s':>10}")
+
+        base_validacao = base_importacao = None
+        for processos in args.processos:
+            validacao = medir_validacao(caminho, processos)
+            importacao = medir_importacao(caminho, processos, diretorio)
+            base_validacao = base_validacao or validacao
+            base_importacao = base_importacao or importacao
+            print(f"{processos:>9} {validacao:>14.2f} {base_validacao / validacao:>5.1f}x "
+                  f"{importacao:>15.2f} {base_importacao / importacao:>5.1f}x {args.linhas / importacao:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 # Sistema de Cronometragem PRO v14.0 - Arquitetura Cliente-Servidor com Design Premium
 import logging
+import multiprocessing
+import os
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
 import queue
+from collections import OrderedDict
 from datetime import datetime, date, timedelta
 import socket
 from socket import timeout
@@ -12,10 +15,13 @@ import threading
 import time
 
 # IMPORTAÇÕES MODULARES
-from .database_manager import DatabaseManager
+from .database_manager import DatabaseManager, AlteracoesDB, ResumoSincronizacao
+from .db_backup import ServicoDeBackup
 from .business_logic import GerenciadorDeCorrida, Atleta
+from .columnar_io import eh_arquivo_colunar
+from .rfid_dedup import DeduplicadorLeituras, interpretar_leitura
 from .ui_states import PreparacaoState, EmCursoState, FinalizadoState, State
-from .custom_exceptions import AtletaNaoEncontradoError, ChegadaJaRegistradaError, VoltaInvalidaError, CabecalhoInvalidoError
+from .custom_exceptions import AtletaNaoEncontradoError, ChegadaJaRegistradaError, VoltaInvalidaError, CabecalhoInvalidoError, ImportacaoCanceladaError
 from .utils import formatar_timedelta
 from .design_system import COLORS, FONTS, FONT_SIZES, SPACING, BORDERS, get_theme_config
 
@@ -38,7 +44,13 @@ class TextLogHandler(logging.Handler):
 
 class AppCrono(ctk.CTk):
     """Sistema de Cronometragem Profissional com Design Premium"""
-    
+
+    # Deduplicação RFID: leituras da mesma tag a menos de JANELA_DEDUP_RFID
+    # segundos umas das outras formam uma única passagem. A política escolhe
+    # qual leitura da passagem vira chegada ("primeira", "ultima" ou "pico_rssi").
+    JANELA_DEDUP_RFID = 2.0
+    POLITICA_DEDUP_RFID = "primeira"
+
     def __init__(self):
         super().__init__()
 
@@ -51,15 +63,23 @@ class AppCrono(ctk.CTk):
         self._configurar_estilo_tabela()
 
         # Inicialização dos componentes de negócio
-        self.db = DatabaseManager("race_data.db")
+        # Notificações do banco são coalescidas em janelas de 50 ms.
+        self.db = DatabaseManager("race_data.db", janela_notificacao=0.05)
         self.db.attach(self)
+        # Chamadas vindas de outras threads (escritor, timer de notificações)
+        # entram nesta fila e são executadas pelo loop do Tk (ver agendar_na_ui).
+        self.fila_ui = queue.Queue()
         self.gerenciador = GerenciadorDeCorrida(self.db, self.logger)
+        # Cópias de segurança periódicas do banco durante a prova.
+        self.servico_backup = ServicoDeBackup(self.db.db_path, diretorio="backups")
         
         # --- NOVO: Componentes para a conexão com a Ponte RFID ---
         self.rfid_queue = queue.Queue()
         self.bridge_socket = None
         self.is_bridge_connected = False
         self.bridge_listener_thread = None
+        # Leituras repetidas do mesmo chip são descartadas antes do registro.
+        self.deduplicador_rfid = DeduplicadorLeituras(self.JANELA_DEDUP_RFID, self.POLITICA_DEDUP_RFID)
         
         self.data_do_evento = date.today()
         self.table_headers = ["Nº", "Nome", "Sexo", "Idade", "Categoria", "Modalidade", "Tempo Bruto"]
@@ -202,6 +222,15 @@ class AppCrono(ctk.CTk):
                                          font=(FONTS["primary"][0], FONT_SIZES["sm"], "bold"))
         self.btn_importar.pack(side="left", padx=(0, SPACING["sm"]))
 
+        self.btn_importar_tags = ctk.CTkButton(actions_frame,
+                                               text="📡 Chips RFID",
+                                               command=self._importar_tags_rfid,
+                                               fg_color=self.theme["accent"],
+                                               hover_color=COLORS["secondary"]["teal"],
+                                               corner_radius=BORDERS["radius"]["md"],
+                                               font=(FONTS["primary"][0], FONT_SIZES["sm"], "bold"))
+        self.btn_importar_tags.pack(side="left", padx=(0, SPACING["sm"]))
+
         # NOVO: Botão de Categorias sempre visível no cabeçalho
         self.btn_categorias = ctk.CTkButton(actions_frame,
                                             text="🏷️ Categorias",
@@ -574,52 +603,103 @@ class AppCrono(ctk.CTk):
         btn_categorias = ctk.CTkButton(frame, text="Gerenciar Categorias", fg_color=self.theme["accent"], command=self._abrir_modal_categorias)
         btn_categorias.grid(row=0, column=0, columnspan=3, pady=(0, 10))
 
-        ctk.CTkLabel(frame, text="Buscar Atleta (Nº):").grid(row=1, column=0, sticky="e")
+        ctk.CTkLabel(frame, text="Buscar Atleta (Nº ou nome):").grid(row=1, column=0, sticky="e")
         busca_var = tk.StringVar()
-        entry_busca = ctk.CTkEntry(frame, textvariable=busca_var, width=80)
+        entry_busca = ctk.CTkEntry(frame, textvariable=busca_var, width=200)
         entry_busca.grid(row=1, column=1, padx=5)
         btn_buscar = ctk.CTkButton(frame, text="Buscar", width=60)
         btn_buscar.grid(row=1, column=2, padx=5)
 
+        # Sugestões atualizadas enquanto se digita (busca por nome parcial).
+        sugestoes = ttk.Treeview(frame, columns=("num", "nome", "modalidade"), show="headings", height=6)
+        sugestoes.heading("num", text="Nº")
+        sugestoes.heading("nome", text="Nome")
+        sugestoes.heading("modalidade", text="Modalidade")
+        sugestoes.column("num", width=60, anchor="center")
+        sugestoes.column("nome", width=260)
+        sugestoes.column("modalidade", width=100)
+        sugestoes.grid(row=2, column=0, columnspan=3, sticky="ew", pady=(5, 10))
+
         # Campos de edição
         labels = ["Nome", "Sexo (M/F)", "Data Nascimento (dd/mm/aaaa)", "Categoria", "Modalidade"]
         edit_vars = [tk.StringVar() for _ in labels]
         for i, label in enumerate(labels):
-            ctk.CTkLabel(frame, text=label + ":").grid(row=i+1, column=0, sticky="e")
-            ctk.CTkEntry(frame, textvariable=edit_vars[i], width=200).grid(row=i+1, column=1, columnspan=2, sticky="w", pady=2)
+            ctk.CTkLabel(frame, text=label + ":").grid(row=i+3, column=0, sticky="e")
+            ctk.CTkEntry(frame, textvariable=edit_vars[i], width=200).grid(row=i+3, column=1, columnspan=2, sticky="w", pady=2)
 
         btn_salvar = ctk.CTkButton(frame, text="Salvar Alterações", fg_color=self.theme["success"])
-        btn_salvar.grid(row=len(labels)+1, column=0, columnspan=3, pady=10)
+        btn_salvar.grid(row=len(labels)+3, column=0, columnspan=3, pady=10)
 
         resultado_label = ctk.CTkLabel(frame, text="")
-        resultado_label.grid(row=len(labels)+2, column=0, columnspan=3)
+        resultado_label.grid(row=len(labels)+4, column=0, columnspan=3)
+
+        # Número do atleta carregado no formulário (None = nenhum).
+        selecionado = {"num": None, "busca_agendada": None}
+
+        def carregar(num):
+            atleta = self.db.obter_atleta_por_id(num)
+            if not atleta:
+                selecionado["num"] = None
+                resultado_label.configure(text="Atleta não encontrado.", text_color=self.THEME_COLORS["red"])
+                for v in edit_vars: v.set("")
+                return
+            selecionado["num"] = num
+            edit_vars[0].set(atleta["nome"])
+            edit_vars[1].set(atleta["sexo"])
+            edit_vars[2].set(atleta["data_nascimento"])
+            edit_vars[3].set(atleta["categoria"])
+            edit_vars[4].set(atleta["modalidade"])
+            resultado_label.configure(text=f"Atleta #{num} encontrado. Você pode editar os dados abaixo.", text_color=self.THEME_COLORS["green"])
+
+        def atualizar_sugestoes():
+            selecionado["busca_agendada"] = None
+            texto = busca_var.get().strip()
+            sugestoes.delete(*sugestoes.get_children())
+            if texto.isdigit():
+                atleta = self.db.obter_atleta_por_id(int(texto))
+                encontrados = [atleta] if atleta else []
+            else:
+                encontrados = self.db.buscar_atletas(texto, limite=50)
+            for atleta in encontrados:
+                sugestoes.insert("", "end", iid=str(atleta["num"]),
+                                 values=(atleta["num"], atleta["nome"], atleta["modalidade"]))
+
+        def ao_digitar(*_):
+            # Debounce: só consulta o banco quando a digitação dá uma pausa.
+            if selecionado["busca_agendada"] is not None:
+                self.after_cancel(selecionado["busca_agendada"])
+            selecionado["busca_agendada"] = self.after(150, atualizar_sugestoes)
+
+        def ao_selecionar_sugestao(_event=None):
+            selecao = sugestoes.selection()
+            if selecao:
+                carregar(int(selecao[0]))
 
         def buscar():
-            try:
-                num = int(busca_var.get())
-                atleta = self.db.obter_atleta_por_id(num)
-                if not atleta:
-                    resultado_label.configure(text="Atleta não encontrado.", text_color=self.THEME_COLORS["red"])
+            texto = busca_var.get().strip()
+            if texto and not texto.isdigit():
+                atualizar_sugestoes()
+                encontrados = sugestoes.get_children()
+                if encontrados:
+                    carregar(int(encontrados[0]))
+                else:
+                    resultado_label.configure(text="Nenhum atleta com esse nome.", text_color=self.THEME_COLORS["red"])
                     for v in edit_vars: v.set("")
-                    return
-                edit_vars[0].set(atleta["nome"])
-                edit_vars[1].set(atleta["sexo"])
-                edit_vars[2].set(atleta["data_nascimento"])
-                edit_vars[3].set(atleta["categoria"])
-                edit_vars[4].set(atleta["modalidade"])
-                resultado_label.configure(text="Atleta encontrado. Você pode editar os dados abaixo.", text_color=self.THEME_COLORS["green"])
+                return
+            try:
+                carregar(int(texto))
             except (ValueError, TypeError):
+                selecionado["num"] = None
                 resultado_label.configure(text="Número de busca inválido.", text_color=self.THEME_COLORS["red"])
                 for v in edit_vars: v.set("")
 
         def salvar():
             try:
-                num_str = busca_var.get()
-                if not num_str:
+                num = selecionado["num"]
+                if num is None:
                     resultado_label.configure(text="Busque um atleta primeiro para poder salvar.", text_color=self.THEME_COLORS["yellow"])
                     return
 
-                num = int(num_str)
                 nome, sexo, data_nasc, categoria, modalidade = [v.get().strip() for v in edit_vars]
                 
                 # Validação dos campos
@@ -631,29 +711,24 @@ class AppCrono(ctk.CTk):
                     return
                 # Adicionar validação de data se necessário (por enquanto, confiamos no formato)
 
-                with self.db._get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "UPDATE atletas SET nome=?, sexo=?, data_nascimento=?, categoria=?, modalidade=? WHERE num=?",
-                        (nome, sexo.upper(), data_nasc, categoria.upper(), modalidade, num)
-                    )
-                    conn.commit()
+                # A tabela é atualizada pela notificação do banco (padrão Observer).
+                self.db.atualizar_dados_atleta(num, nome, sexo, data_nasc, categoria, modalidade)
                 
                 self.logger.info(f"Dados do atleta #{num} atualizados pelo formulário de edição.")
                 resultado_label.configure(text=f"Atleta #{num} atualizado com sucesso!", text_color=self.THEME_COLORS["green"])
-                # CORREÇÃO: Chama o método centralizado para atualizar a tabela.
-                self._ordenar_tabela(self._coluna_ordenacao[0], manter_direcao=True)
 
                 # Limpa os campos para a próxima operação
+                selecionado["num"] = None
                 busca_var.set("")
                 for v in edit_vars: v.set("")
 
-            except ValueError:
-                resultado_label.configure(text="Número do atleta na busca é inválido.", text_color=self.THEME_COLORS["red"])
             except Exception as e:
-                self.logger.error(f"Erro ao salvar dados do atleta #{busca_var.get()}: {e}")
+                self.logger.error(f"Erro ao salvar dados do atleta #{selecionado['num']}: {e}")
                 resultado_label.configure(text=f"Erro ao salvar: {e}", text_color=self.THEME_COLORS["red"])
 
+        busca_var.trace_add("write", ao_digitar)
+        sugestoes.bind("<<TreeviewSelect>>", ao_selecionar_sugestao)
+        entry_busca.bind("<Return>", lambda _event: buscar())
         btn_buscar.configure(command=buscar)
         btn_salvar.configure(command=salvar)
 
@@ -687,15 +762,28 @@ class AppCrono(ctk.CTk):
         entry_desc = ctk.CTkEntry(modal, textvariable=desc_var, placeholder_text="Descrição (opcional)")
         entry_desc.pack(pady=2, padx=10, fill="x")
 
+        def apos_escrita(futuro, acao: str, limpar_campos: bool = False):
+            # O Future é resolvido na thread escritora; a UI só é tocada no loop do Tk.
+            erro = futuro.exception()
+            def aplicar():
+                if not modal.winfo_exists():
+                    return
+                if erro is not None:
+                    messagebox.showerror("Erro", f"Não foi possível {acao}: {erro}")
+                    return
+                atualizar_tree()
+                if limpar_campos:
+                    nome_var.set("")
+                    desc_var.set("")
+            self.agendar_na_ui(aplicar)
+
         def adicionar():
             if not nome_var.get().strip():
                 messagebox.showerror("Erro", "O nome da categoria é obrigatório.")
                 return
             try:
-                self.db.adicionar_categoria(nome_var.get(), desc_var.get())
-                atualizar_tree()
-                nome_var.set("")
-                desc_var.set("")
+                futuro = self.db.adicionar_categoria(nome_var.get(), desc_var.get())
+                futuro.add_done_callback(lambda f: apos_escrita(f, "adicionar", limpar_campos=True))
             except Exception as e:
                 messagebox.showerror("Erro", f"Não foi possível adicionar: {e}")
 
@@ -707,8 +795,8 @@ class AppCrono(ctk.CTk):
             item = tree.item(sel[0])
             cat_id = item['values'][0]
             try:
-                self.db.editar_categoria(cat_id, nome_var.get(), desc_var.get())
-                atualizar_tree()
+                futuro = self.db.editar_categoria(cat_id, nome_var.get(), desc_var.get())
+                futuro.add_done_callback(lambda f: apos_escrita(f, "editar"))
             except Exception as e:
                 messagebox.showerror("Erro", f"Não foi possível editar: {e}")
 
@@ -721,8 +809,8 @@ class AppCrono(ctk.CTk):
             cat_id = item['values'][0]
             if messagebox.askyesno("Confirmar", "Remover esta categoria?"):
                 try:
-                    self.db.remover_categoria(cat_id)
-                    atualizar_tree()
+                    futuro = self.db.remover_categoria(cat_id)
+                    futuro.add_done_callback(lambda f: apos_escrita(f, "remover"))
                 except Exception as e:
                     messagebox.showerror("Erro", f"Não foi possível remover: {e}")
 
@@ -776,6 +864,8 @@ class AppCrono(ctk.CTk):
         btn_filtrar.pack(side="left", padx=5)
         btn_pdf = ctk.CTkButton(button_frame, text="🏆 Gerar PDF Premium", width=180)
         btn_pdf.pack(side="left", padx=5)
+        btn_exportar = ctk.CTkButton(button_frame, text="Exportar Dados", width=130)
+        btn_exportar.pack(side="left", padx=5)
 
         # Frame rolável para exibir os pódios
         scroll_frame = CTkScrollableFrame(container, label_text="Relatório de Pódios da Prova")
@@ -785,75 +875,13 @@ class AppCrono(ctk.CTk):
         # --- LÓGICA ---
         self.dados_relatorio_agrupado = OrderedDict()
 
-        def _get_faixa_etaria_label(idade: int) -> str:
-            if idade <= 19: return "Até 19"
-            if idade >= 70: return "70+"
-            faixa_min = (idade // 5) * 5
-            faixa_max = faixa_min + 4
-            return f"{faixa_min}-{faixa_max}"
-
         def _gerar_dados_relatorio():
             self.logger.info("Gerando e agrupando dados para o relatório de resultados...")
             self.dados_relatorio_agrupado.clear()
-
-            atletas_com_tempo = [r for r in self.db.obter_todos_atletas_para_tabela("Tempo Líquido", False) if r["tempo_liquido"] is not None]
-            if not atletas_com_tempo:
+            self.dados_relatorio_agrupado.update(self._montar_grupos_relatorio())
+            if not self.dados_relatorio_agrupado:
                 self.logger.warning("Nenhum atleta com tempo finalizado para gerar relatório.")
                 return
-
-            # Estruturas para agrupar atletas
-            geral_masc, geral_fem = [], []
-            pcd_masc, pcd_fem = [], []
-            faixas_geral_m, faixas_geral_f = {}, {}
-            faixas_pcd_m, faixas_pcd_f = {}, {}
-
-            for row in atletas_com_tempo:
-                try:
-                    idade = Atleta._calcular_idade(row["data_nascimento"], self.data_do_evento)
-                    faixa_label = _get_faixa_etaria_label(idade)
-                    atleta_info = (row, idade)
-
-                    is_pcd = row['categoria'].upper() == 'PCD'
-                    is_male = row['sexo'] == 'M'
-
-                    if is_pcd:
-                        if is_male:
-                            pcd_masc.append(atleta_info)
-                            faixas_pcd_m.setdefault(faixa_label, []).append(atleta_info)
-                        else:
-                            pcd_fem.append(atleta_info)
-                            faixas_pcd_f.setdefault(faixa_label, []).append(atleta_info)
-                    else: # GERAL
-                        if is_male:
-                            geral_masc.append(atleta_info)
-                            faixas_geral_m.setdefault(faixa_label, []).append(atleta_info)
-                        else:
-                            geral_fem.append(atleta_info)
-                            faixas_geral_f.setdefault(faixa_label, []).append(atleta_info)
-                except Exception as e:
-                    self.logger.warning(f"Atleta #{row['num']} ignorado nos resultados devido a erro: {e}")
-
-            # Monta a estrutura de dados final (OrderedDict para manter a ordem)
-            self.dados_relatorio_agrupado["Pódio Geral Masculino (Top 5)"] = geral_masc[:5]
-            self.dados_relatorio_agrupado["Pódio Geral Feminino (Top 5)"] = geral_fem[:5]
-            if pcd_masc: self.dados_relatorio_agrupado["Pódio PCD Masculino (Geral)"] = pcd_masc
-            if pcd_fem: self.dados_relatorio_agrupado["Pódio PCD Feminino (Geral)"] = pcd_fem
-
-            ids_podio_geral = {a[0]['num'] for a in geral_masc[:5]} | {a[0]['num'] for a in geral_fem[:5]}
-
-            for faixa, atletas in sorted(faixas_geral_m.items()):
-                atletas_faixa = [a for a in atletas if a[0]['num'] not in ids_podio_geral]
-                if atletas_faixa: self.dados_relatorio_agrupado[f"GERAL Masculino {faixa}"] = atletas_faixa[:3]
-            
-            for faixa, atletas in sorted(faixas_geral_f.items()):
-                atletas_faixa = [a for a in atletas if a[0]['num'] not in ids_podio_geral]
-                if atletas_faixa: self.dados_relatorio_agrupado[f"GERAL Feminino {faixa}"] = atletas_faixa[:3]
-
-            for faixa, atletas in sorted(faixas_pcd_m.items()):
-                if atletas: self.dados_relatorio_agrupado[f"PCD Masculino {faixa}"] = atletas[:3]
-            for faixa, atletas in sorted(faixas_pcd_f.items()):
-                if atletas: self.dados_relatorio_agrupado[f"PCD Feminino {faixa}"] = atletas[:3]
-            
             self.logger.info("Dados do relatório gerados com sucesso.")
 
         def _atualizar_exibicao_relatorio():
@@ -1006,10 +1034,54 @@ class AppCrono(ctk.CTk):
 
         btn_filtrar.configure(command=_atualizar_exibicao_relatorio)
         btn_pdf.configure(command=gerar_pdf)
+        btn_exportar.configure(command=self._exportar_resultados_colunar)
         
         # Carrega os resultados iniciais ao construir a UI
         self.after(200, _executar_atualizacao_completa)
 
+    def _montar_grupos_relatorio(self) -> OrderedDict:
+        """
+        Grupos de pódio do relatório, lidos da classificação materializada no
+        banco: cada grupo é uma consulta indexada `posição <= N`, sem
+        reordenar os atletas em Python. Cada item é `(linha, idade)`.
+        """
+        grupos = OrderedDict()
+        combinacoes = self.db.obter_grupos_classificacao()
+        if not combinacoes:
+            return grupos
+
+        def com_idade(linhas):
+            return [(r, r["idade"] if r["idade"] is not None else "-") for r in linhas]
+
+        sexos = (("M", "Masculino"), ("F", "Feminino"))
+        categorias = ["GERAL"] + sorted({c for c, _, _ in combinacoes} - {"GERAL"})
+
+        ids_podio_geral = set()
+        for categoria in categorias:
+            for sexo, rotulo in sexos:
+                if categoria == "GERAL":
+                    podio = self.db.obter_podio(sexo, "GERAL", limite=5)
+                    grupos[f"Pódio Geral {rotulo} (Top 5)"] = com_idade(podio)
+                    ids_podio_geral.update(r["num"] for r in podio)
+                else:
+                    todos = self.db.obter_podio(sexo, categoria, limite=None)
+                    if todos:
+                        grupos[f"Pódio {categoria} {rotulo} (Geral)"] = com_idade(todos)
+
+        for categoria in categorias:
+            for sexo, rotulo in sexos:
+                faixas = sorted(f for c, s, f in combinacoes if c == categoria and s == sexo and f is not None)
+                for faixa in faixas:
+                    if categoria == "GERAL":
+                        # Quem já está no pódio geral não repete no pódio da faixa.
+                        candidatos = self.db.obter_podio(sexo, categoria, faixa, limite=3 + len(ids_podio_geral))
+                        atletas = [r for r in candidatos if r["num"] not in ids_podio_geral][:3]
+                    else:
+                        atletas = self.db.obter_podio(sexo, categoria, faixa, limite=3)
+                    if atletas:
+                        grupos[f"{categoria} {rotulo} {faixa}"] = com_idade(atletas)
+        return grupos
+
     def _popular_aba_logs(self, parent):
         parent.grid_columnconfigure(0, weight=1)
         parent.grid_rowconfigure(0, weight=1)
@@ -1032,6 +1104,10 @@ class AppCrono(ctk.CTk):
 
         try:
             self.db.init_db()
+            self.db.iniciar_escritor()
+            # Recalcula as idades pré-calculadas apenas se a data do evento mudou.
+            self.db.definir_data_evento(self.data_do_evento)
+            self.servico_backup.iniciar()
             self.logger.info("Banco de dados inicializado com sucesso.")
         except Exception as e:
             self.logger.critical(f"Falha CRÍTICA ao inicializar o banco de dados: {e}")
@@ -1042,26 +1118,32 @@ class AppCrono(ctk.CTk):
         self.current_state = PreparacaoState(self)
         self._ordenar_tabela(self._coluna_ordenacao[0], manter_direcao=True)
         self._processar_fila_rfid() # Inicia o processamento da fila
+        self._processar_fila_ui()
 
     def _on_closing(self):
         """Garante que tudo seja finalizado corretamente."""
         if self.is_bridge_connected:
             self.stop_bridge_connection()
+        self.servico_backup.parar()
+        self.db.fechar()
         self.destroy()
 
     def _processar_fila_rfid(self):
-        """Processa continuamente a fila de leituras RFID."""
+        """Processa continuamente a fila de leituras RFID, uma chegada por passagem de chip."""
         try:
             while not self.rfid_queue.empty():
-                leitura = self.rfid_queue.get_nowait()
-                self.logger.debug(f"Processando da fila: {leitura}")
-                # Formato esperado: "TAG_ID,ANTENA"
-                partes = leitura.strip().split(',')
-                if len(partes) == 2:
-                    tag_id, antena_str = partes
-                    self._ui_registrar_chegada_rfid(tag_id, int(antena_str))
-                else:
-                    self.logger.warning(f"Leitura RFID em formato inesperado ignorada: {leitura}")
+                linha = self.rfid_queue.get_nowait()
+                self.logger.debug(f"Processando da fila: {linha}")
+                # Formato esperado: "TAG_ID,ANTENA[,RSSI[,INSTANTE]]"
+                leitura = interpretar_leitura(linha)
+                if leitura is None:
+                    self.logger.warning(f"Leitura RFID em formato inesperado ignorada: {linha}")
+                    continue
+                for escolhida in self.deduplicador_rfid.registrar(leitura):
+                    self._ui_registrar_chegada_rfid(escolhida.tag, escolhida.antena, escolhida.instante)
+            # Passagens que se encerraram sem novas leituras (políticas "ultima" e "pico_rssi").
+            for escolhida in self.deduplicador_rfid.expirar():
+                self._ui_registrar_chegada_rfid(escolhida.tag, escolhida.antena, escolhida.instante)
 
         except queue.Empty:
             pass # Normal, a fila estava vazia
@@ -1069,14 +1151,16 @@ class AppCrono(ctk.CTk):
             # Reagenda a si mesmo para rodar novamente, criando um loop
             self.after(100, self._processar_fila_rfid)
 
-    def _ui_registrar_chegada_rfid(self, tag_id: str, antena: int):
-        """Lógica para registrar uma chegada vinda do leitor RFID."""
+    def _ui_registrar_chegada_rfid(self, tag_id: str, antena: int, instante: float | None = None):
+        """
+        Lógica para registrar uma chegada vinda do leitor RFID. `instante` é o
+        momento da passagem informado pela ponte (epoch, em segundos).
+        """
         if not isinstance(self.current_state, EmCursoState):
             self.logger.warning(f"Leitura RFID da tag {tag_id} ignorada (a corrida não está em curso).")
             return
         try:
-            # A lógica de negócio agora pode usar a informação da antena se necessário
-            atleta = self.gerenciador.registrar_chegada_por_rfid(tag_id)
+            atleta = self.gerenciador.registrar_chegada_por_rfid(tag_id, antena, instante)
             self.logger.info(f"[RFID Antena {antena}] Chegada registrada para o atleta #{atleta.num} ({atleta.nome}) com a tag {tag_id}.")
             # Opcional: Limpar o campo de entrada manual se a chegada for por RFID
             self.chegada_num_var.set("")
@@ -1088,21 +1172,82 @@ class AppCrono(ctk.CTk):
             self.logger.critical(f"[RFID Antena {antena}] Erro inesperado ao processar tag {tag_id}: {e}")
 
     # OBSERVER PATTERN: Este é o método chamado pelo 'Subject' (DatabaseManager).
-    def update(self, subject=None):
+    # Acima deste número de atletas alterados, reconstruir a tabela é mais barato.
+    LIMITE_ATUALIZACAO_PARCIAL = 200
+
+    def update(self, subject=None, alteracoes: AlteracoesDB | None = None):
         if isinstance(subject, DatabaseManager):
-            self.logger.info("Recebida notificação de atualização. Agendando atualização da UI.")
-            # CORREÇÃO: Usa self.after() para agendar a atualização da UI no loop principal do Tkinter.
-            # Isso evita conflitos e garante que a UI seja redesenhada de forma segura e eficiente,
-            # resolvendo o bug onde a tabela não atualizava após a importação.
-            # A chamada agora é para _ordenar_tabela, que centraliza a lógica.
-            self.after(50, lambda: self._ordenar_tabela(self._coluna_ordenacao[0], manter_direcao=True))
-            self.after(100, lambda: self.current_state.handle_ui_update(self)) # Reavalia o estado dos botões
+            if alteracoes is None:
+                alteracoes = AlteracoesDB(recarga_total=True)
+            self.logger.info(f"Recebida notificação de atualização ({len(alteracoes.atletas_alterados)} atleta(s) alterado(s)). Agendando atualização da UI.")
+            # A notificação chega na thread escritora ou no timer de coalescência;
+            # o Tk não é thread-safe, então só a fila é tocada aqui.
+            self.agendar_na_ui(self._aplicar_alteracoes_db, alteracoes)
+
+    def _aplicar_alteracoes_db(self, alteracoes: AlteracoesDB):
+        precisa_recarga = (alteracoes.recarga_total or alteracoes.atletas_inseridos or alteracoes.atletas_removidos
+                           or len(alteracoes.atletas_atualizados) > self.LIMITE_ATUALIZACAO_PARCIAL)
+        if precisa_recarga:
+            self._ordenar_tabela(self._coluna_ordenacao[0], manter_direcao=True)
+        elif alteracoes.atletas_atualizados:
+            self._aplicar_alteracoes_tabela(alteracoes.atletas_atualizados)
+        # Reavalia o estado dos botões apenas quando o conjunto de atletas ou o estado mudou.
+        if precisa_recarga or alteracoes.chaves_estado:
+            self.current_state.handle_ui_update(self)
+
+    def agendar_na_ui(self, funcao, *args):
+        """Agenda `funcao(*args)` no loop do Tk. Pode ser chamado de qualquer thread."""
+        self.fila_ui.put((funcao, args))
+
+    def _processar_fila_ui(self):
+        """Executa, na thread do Tk, as chamadas agendadas por outras threads."""
+        try:
+            while True:
+                funcao, args = self.fila_ui.get_nowait()
+                try:
+                    funcao(*args)
+                except Exception as e:
+                    self.logger.error(f"Erro ao atualizar a interface: {e}")
+        except queue.Empty:
+            pass
+        finally:
+            self.after(50, self._processar_fila_ui)
+
+    def _formatar_linha_tabela(self, r) -> list:
+        # A idade vem pré-calculada do banco; o cálculo local fica só como reserva.
+        idade = r['idade'] if 'idade' in r.keys() and r['idade'] is not None else Atleta._calcular_idade(r['data_nascimento'], self.data_do_evento)
+        tempo_bruto_str = formatar_timedelta(timedelta(seconds=r['tempo_liquido'])) if r['tempo_liquido'] is not None else "00:00:00.000"
+        return [r['num'], r['nome'], r['sexo'], idade, r['categoria'], r['modalidade'], tempo_bruto_str]
+
+    def _aplicar_alteracoes_tabela(self, nums: set):
+        """
+        Atualiza na tabela apenas as linhas dos atletas alterados, sem refazer
+        a consulta completa. Só a ordenação por número é imune a alterações de
+        dados; nas demais (ou se uma linha não estiver na tabela), recai na
+        reconstrução completa.
+        """
+        if self._coluna_ordenacao[0] != "Nº":
+            self._ordenar_tabela(self._coluna_ordenacao[0], manter_direcao=True)
+            return
+        if not (hasattr(self, 'tabela_atletas') and self.tabela_atletas.winfo_exists()):
+            return
+        for r in self.db.obter_atletas_por_numeros(nums):
+            iid = str(r['num'])
+            if not self.tabela_atletas.exists(iid):
+                self._ordenar_tabela(self._coluna_ordenacao[0], manter_direcao=True)
+                return
+            try:
+                self.tabela_atletas.item(iid, values=self._formatar_linha_tabela(r))
+            except Exception as e:
+                self.logger.warning(f"Erro ao atualizar atleta #{r['num']} na tabela: {e}")
+        self.logger.debug(f"{len(nums)} linha(s) da tabela atualizada(s) in loco.")
 
     def _atualizar_relogios(self):
         if isinstance(self.current_state, EmCursoState):
-            horario_largada_str = self.db.carregar_estado_corrida('horario_largada')
-            if isinstance(horario_largada_str, str) and horario_largada_str:
-                decorrido = datetime.now() - datetime.fromisoformat(horario_largada_str)
+            # Lido do cache em memória do DatabaseManager: o tick não acessa o disco.
+            horario_largada = self.db.carregar_estado_datetime('horario_largada')
+            if horario_largada is not None:
+                decorrido = datetime.now() - horario_largada
                 self.label_cronometro.configure(text=formatar_timedelta(decorrido))
         self.after(100, self._atualizar_relogios)
 
@@ -1117,27 +1262,142 @@ class AppCrono(ctk.CTk):
 
     def _executar_importacao_atletas(self):
         caminho = filedialog.askopenfilename(
-            title="Selecione o arquivo CSV",
+            title="Selecione o arquivo de atletas",
+            filetypes=[("CSV files", "*.csv"), ("Parquet/Arrow", "*.parquet *.arrow *.feather"), ("All files", "*.*")]
+        )
+        if not caminho: return
+        # Reimportação de uma lista atualizada: só o organizador sabe se o
+        # arquivo é a lista completa (remove quem saiu) ou um complemento.
+        remover_ausentes = False
+        if self.db.contar_atletas():
+            remover_ausentes = bool(messagebox.askyesno(
+                "Reimportação",
+                "Já existem atletas cadastrados. O arquivo é a lista completa de inscritos?\n\n"
+                "Sim: atletas que não estão no arquivo são removidos (exceto os que já chegaram).\n"
+                "Não: o arquivo apenas acrescenta ou atualiza atletas."))
+        # A importação roda fora da thread do Tk; progresso e resultado voltam
+        # pelo loop de eventos (self.after).
+        cancelamento = threading.Event()
+        self._janela_importacao = self._abrir_janela_progresso_importacao(cancelamento)
+        threading.Thread(target=self._importar_atletas_em_segundo_plano,
+                         args=(caminho, cancelamento, remover_ausentes), daemon=True).start()
+
+    def _importar_tags_rfid(self):
+        """Associa chips aos atletas a partir de um CSV 'tag,num' (um atleta pode ter vários chips)."""
+        caminho = filedialog.askopenfilename(
+            title="Selecione o arquivo de chips RFID",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
         )
         if not caminho: return
         try:
-            sucesso, erros = self.gerenciador.carregar_atletas_csv(caminho, self.data_do_evento)
+            associados, erros = self.gerenciador.carregar_tags_csv(caminho)
+        except CabecalhoInvalidoError as e:
+            messagebox.showerror("Erro de Formato", str(e))
+            return
+        except Exception as e:
+            self.logger.critical(f"Erro inesperado ao importar chips RFID: {e}")
+            messagebox.showerror("Erro Inesperado", f"Ocorreu um erro inesperado: {e}")
+            return
+        mensagem = f"{associados} chip(s) associado(s)."
+        if erros:
+            mensagem += f"\n\n{len(erros)} linha(s) ignorada(s):\n" + "\n".join(erros[:10])
+            messagebox.showwarning("Chips RFID", mensagem)
+        else:
+            messagebox.showinfo("Chips RFID", mensagem)
+
+    def _exportar_resultados_colunar(self):
+        caminho = filedialog.asksaveasfilename(
+            title="Exportar resultados",
+            defaultextension=".parquet",
+            filetypes=[("Parquet", "*.parquet"), ("Arrow", "*.arrow")]
+        )
+        if not caminho: return
+        try:
+            total = self.db.exportar_resultados_colunar(caminho)
+            messagebox.showinfo("Exportação Concluída", f"{total} atletas exportados para:\n{caminho}")
+        except ImportError as e:
+            self.logger.error(f"Exportação colunar indisponível: {e}")
+            messagebox.showerror("Erro de Importação", "Exportação indisponível.\nVerifique se o pyarrow está instalado.")
+        except Exception as e:
+            self.logger.error(f"Erro ao exportar resultados: {e}")
+            messagebox.showerror("Erro de Exportação", f"Não foi possível exportar os resultados:\n{e}")
+
+    def _abrir_janela_progresso_importacao(self, cancelamento: threading.Event):
+        janela = ctk.CTkToplevel(self)
+        janela.title("Importando Atletas")
+        janela.geometry("420x150")
+        janela.resizable(False, False)
+        janela.protocol("WM_DELETE_WINDOW", cancelamento.set)
+
+        janela.label_progresso = ctk.CTkLabel(janela, text="Lendo arquivo...")
+        janela.label_progresso.pack(pady=(15, 5), padx=15)
+        janela.barra = ctk.CTkProgressBar(janela, width=380)
+        janela.barra.set(0)
+        janela.barra.pack(pady=5, padx=15)
+
+        def cancelar():
+            cancelamento.set()
+            janela.label_progresso.configure(text="Cancelando...")
+            btn_cancelar.configure(state="disabled")
+
+        btn_cancelar = ctk.CTkButton(janela, text="Cancelar", command=cancelar)
+        btn_cancelar.pack(pady=10)
+        return janela
+
+    def _importar_atletas_em_segundo_plano(self, caminho: str, cancelamento: threading.Event,
+                                           remover_ausentes: bool = False):
+        def progresso(p):
+            self.agendar_na_ui(self._mostrar_progresso_importacao, p.percentual, p.linhas, p.linhas_por_segundo)
+
+        carregar = (self.gerenciador.carregar_atletas_colunar if eh_arquivo_colunar(caminho)
+                    else self.gerenciador.carregar_atletas_csv)
+        try:
+            resultado = carregar(caminho, self.data_do_evento, progresso=progresso, cancelamento=cancelamento,
+                                 remover_ausentes=remover_ausentes)
+        except Exception as e:
+            self.agendar_na_ui(self._concluir_importacao_atletas, None, e)
+        else:
+            self.agendar_na_ui(self._concluir_importacao_atletas, resultado, None)
+
+    def _mostrar_progresso_importacao(self, percentual: float, linhas: int, linhas_por_segundo: float):
+        janela = getattr(self, '_janela_importacao', None)
+        if janela is None:
+            return
+        janela.barra.set(percentual / 100)
+        janela.label_progresso.configure(
+            text=f"{percentual:.0f}% - {linhas} linhas ({linhas_por_segundo:.0f} linhas/s)")
+
+    def _concluir_importacao_atletas(self, resultado, erro: Exception | None):
+        janela = getattr(self, '_janela_importacao', None)
+        self._janela_importacao = None
+        if janela is not None:
+            janela.destroy()
+
+        if isinstance(erro, ImportacaoCanceladaError):
+            messagebox.showinfo("Importação Cancelada", "A importação foi cancelada. Nenhum atleta foi gravado.")
+        elif isinstance(erro, CabecalhoInvalidoError):
+            messagebox.showerror("Erro de Cabeçalho", f"O cabeçalho do arquivo CSV está inválido:\n{erro}")
+            self.logger.error(f"Erro de cabeçalho na importação de CSV: {erro}")
+        elif erro is not None:
+            messagebox.showerror("Erro Crítico na Importação", f"Não foi possível processar o arquivo:\n{erro}")
+            self.logger.critical(f"Falha total ao carregar CSV: {erro}")
+        else:
+            sucesso, erros = resultado
             msg_final = f"Sucesso: {sucesso} atletas carregados.\nErros: {len(erros)} linhas ignoradas."
+            resumo = self.gerenciador.ultima_sincronizacao
+            if isinstance(resumo, ResumoSincronizacao):
+                msg_final += (f"\n\nNovos: {len(resumo.inseridos)} | Alterados: {len(resumo.alterados)} | "
+                              f"Removidos: {len(resumo.removidos)} | Sem alteração: {resumo.inalterados}")
+                if resumo.preservados:
+                    msg_final += (f"\n{len(resumo.preservados)} atleta(s) ausente(s) do arquivo mantido(s) "
+                                  f"por já ter(em) chegada: {', '.join(map(str, resumo.preservados[:20]))}")
             if erros:
                 msg_final += "\n\nConsulte a aba 'Logs do Evento' para detalhes."
-                # CORREÇÃO: Adiciona a ação que faltava dentro do loop, que é logar o erro.
-                for erro in erros:
-                    self.logger.warning(f"Erro na importação de linha do CSV: {erro}")
+                for erro_linha in erros:
+                    self.logger.warning(f"Erro na importação de linha do CSV: {erro_linha}")
 
             messagebox.showinfo("Importação Concluída", msg_final)
             # A atualização da tabela agora é tratada de forma confiável pelo padrão Observer (método update)
-        except CabecalhoInvalidoError as e:
-            messagebox.showerror("Erro de Cabeçalho", f"O cabeçalho do arquivo CSV está inválido:\n{e}")
-            self.logger.error(f"Erro de cabeçalho na importação de CSV: {e}")
-        except Exception as e:
-            messagebox.showerror("Erro Crítico na Importação", f"Não foi possível processar o arquivo:\n{e}")
-            self.logger.critical(f"Falha total ao carregar CSV: {e}")
 
     def _ordenar_tabela(self, coluna: str, manter_direcao=False):
         """
@@ -1160,7 +1420,7 @@ class AppCrono(ctk.CTk):
             "Nº": "num",
             "Nome": "nome",
             "Sexo": "sexo",
-            "Idade": "data_nascimento", # A ordenação por idade é feita no código após a busca
+            "Idade": "idade",
             "Categoria": "categoria",
             "Modalidade": "modalidade",
             "Tempo Bruto": "tempo_liquido"
@@ -1175,23 +1435,10 @@ class AppCrono(ctk.CTk):
             self.dados_tabela = [self.table_headers]
             for r in dados_brutos:
                 try:
-                    idade = Atleta._calcular_idade(r['data_nascimento'], self.data_do_evento)
-                    tempo_bruto_str = formatar_timedelta(timedelta(seconds=r['tempo_liquido'])) if r['tempo_liquido'] is not None else "00:00:00.000"
-                    self.dados_tabela.append([
-                        r['num'], r['nome'], r['sexo'], idade, r['categoria'], r['modalidade'], tempo_bruto_str
-                    ])
+                    self.dados_tabela.append(self._formatar_linha_tabela(r))
                 except Exception as e:
                     self.logger.warning(f"Erro ao processar atleta #{r.get('num', 'N/A')} para a tabela: {e}")
-            
-            # Ordenação especial por idade, que não pode ser feita diretamente no SQL
-            if coluna == "Idade":
-                # Pega o índice da coluna "Idade"
-                idx_idade = self.table_headers.index("Idade")
-                # Separa o cabeçalho dos dados, ordena os dados pela idade, e junta novamente
-                header = self.dados_tabela[0]
-                data_rows = self.dados_tabela[1:]
-                data_rows.sort(key=lambda row: row[idx_idade], reverse=reverso)
-                self.dados_tabela = [header] + data_rows
+
 
             # 3. Atualiza o widget da tabela na UI
             # CORREÇÃO DEFINITIVA: A tabela (Treeview) agora é atualizada de forma eficiente,
@@ -1203,8 +1450,9 @@ class AppCrono(ctk.CTk):
                     self.tabela_atletas.delete(i)
                 
                 # 2. Insere as novas linhas (pulando o cabeçalho da nossa lista de dados)
+                # O iid é o número do atleta, para que alterações pontuais localizem a linha.
                 for row_data in self.dados_tabela[1:]:
-                    self.tabela_atletas.insert("", "end", values=row_data)
+                    self.tabela_atletas.insert("", "end", iid=str(row_data[0]), values=row_data)
 
                 self.logger.info(f"Tabela (Treeview) atualizada com {len(self.dados_tabela) - 1} registros.")
             else:
@@ -1216,11 +1464,17 @@ class AppCrono(ctk.CTk):
 
 # PONTO DE ENTRADA DA APLICAÇÃO
 if __name__ == "__main__":
+    # Necessário para a validação paralela de CSV em executáveis congelados (spawn).
+    multiprocessing.freeze_support()
     log_format = '%(asctime)s - %(levelname)s - %(message)s'
     logging.basicConfig(level=logging.INFO, format=log_format)
     
     try:
         app = AppCrono()
+        # Opt-in: CRONO_SQL_TRACE=1 mede as consultas, grava as lentas em
+        # 'consultas_lentas.log' e escreve um resumo no log ao sair.
+        if os.environ.get("CRONO_SQL_TRACE"):
+            app.db.ativar_instrumentacao(arquivo_lento="consultas_lentas.log", resumo_na_saida=True)
         app.mainloop()
     except Exception as e:
         logging.critical("Erro fatal ao iniciar a aplicação.", exc_info=True)
@@ -1,11 +1,24 @@
 # -*- coding: utf-8 -*-
 # # business_logic.py
 import csv
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, date, timedelta
 import logging
+from typing import Callable, Iterator, NamedTuple
 from .custom_exceptions import (
-    ErroFormatoInvalido, DadosObrigatoriosFaltando, CabecalhoInvalidoError, ErroDadosAtleta
+    ErroFormatoInvalido, DadosObrigatoriosFaltando, CabecalhoInvalidoError, ErroDadosAtleta, ImportacaoCanceladaError,
+    AtletaNaoEncontradoError, ChegadaJaRegistradaError, ErroLogicaCorrida
 )
+from .columnar_io import LeitorColunar
+from .parallel_csv import ResultadoLinha, dividir_em_faixas, ler_cabecalho, validar_em_ordem
+from .rfid_index import IndiceRFID
+from .utils import calcular_idade, converter_data_br, normalizar_tag
 
 logger = logging.getLogger(__name__)
 
@@ -53,13 +66,96 @@ class Atleta:
     @staticmethod
     def _calcular_idade(data_nascimento_str: str, data_evento: date) -> int:
         try:
-            nascimento = datetime.strptime(data_nascimento_str, '%d/%m/%Y').date()
+            nascimento = converter_data_br(data_nascimento_str)
             if nascimento > data_evento:
                 raise ValueError("Data de nascimento não pode ser posterior à data do evento.")
-            return data_evento.year - nascimento.year - ((data_evento.month, data_evento.day) < (nascimento.month, nascimento.day))
+            return calcular_idade(nascimento, data_evento)
         except (ValueError, TypeError):
             raise ErroFormatoInvalido(f"Formato de data de nascimento inválido: '{data_nascimento_str}'. Use dd/mm/aaaa.")
 
+# Linhas validadas e inseridas por vez na importação de CSV.
+TAMANHO_BLOCO_IMPORTACAO = 1000
+# A partir deste tamanho (~50 mil linhas) a validação é dividida entre processos.
+LIMIAR_IMPORTACAO_PARALELA = 4 * 1024 * 1024
+BYTES_POR_FAIXA_PARALELA = 1024 * 1024
+# O instante de uma passagem vem do relógio da ponte. Adiante do relógio local
+# (além da tolerância) ele é impossível e indica relógio adiantado; muito atrás,
+# pode ser uma fila acumulada na ponte ou relógio atrasado, e fica registrado.
+TOLERANCIA_RELOGIO_PONTE = 2.0
+ATRASO_MAXIMO_PONTE = 300.0
+
+
+def validar_campos_atleta(num_bruto, nome, sexo, data_nascimento, modalidade, categoria,
+                          data_evento: date) -> ResultadoLinha:
+    """
+    Valida os campos de um atleta importado. Retorna `(num, tupla, erro)`: o
+    número (quando legível, para a detecção de duplicados), a tupla pronta
+    para inserção ou a mensagem de erro. Roda também nos processos de
+    validação paralela, por isso fica no nível do módulo.
+    """
+    try:
+        if num_bruto is None or num_bruto == '':
+            raise ValueError("Número do atleta ausente.")
+        num = int(num_bruto)
+    except ValueError as e:
+        return None, None, f"Erro inesperado - {e}"
+
+    # Colunas tipadas (Parquet/Arrow) trazem a data como date.
+    if isinstance(data_nascimento, date):
+        data_nascimento = data_nascimento.strftime('%d/%m/%Y')
+
+    try:
+        atleta = Atleta(
+            num=num,
+            nome=nome,
+            sexo=sexo,
+            data_nascimento_str=data_nascimento,
+            modalidade=modalidade,
+            categoria=categoria, # Passa a categoria do arquivo
+            data_evento=data_evento
+        )
+    except ErroDadosAtleta as e:
+        return num, None, f"Atleta #{num_bruto if num_bruto is not None else 'N/A'} - {e}"
+    except Exception as e:
+        return num, None, f"Erro inesperado - {e}"
+
+    return num, (atleta.num, atleta.nome, atleta.sexo, atleta.data_nascimento_str,
+                 atleta.modalidade, atleta.categoria), None
+
+
+def validar_linha_csv(linha: dict, data_evento: date) -> ResultadoLinha:
+    """Valida uma linha do csv.DictReader (ver validar_campos_atleta)."""
+    return validar_campos_atleta(linha.get('num'), linha.get('nome'), linha.get('sexo'), linha.get('data_nascimento'),
+                                 linha.get('modalidade'), linha.get('categoria'), data_evento)
+
+
+@dataclass
+class ProgressoImportacao:
+    """Andamento de uma importação de CSV, reportado a cada bloco gravado."""
+    bytes_total: int
+    bytes_lidos: int = 0
+    linhas: int = 0
+    importados: int = 0
+    erros: int = 0
+    decorrido: float = 0.0
+
+    @property
+    def percentual(self) -> float:
+        return 100.0 if not self.bytes_total else min(100.0, 100.0 * self.bytes_lidos / self.bytes_total)
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.linhas / self.decorrido if self.decorrido > 0 else 0.0
+
+
+class ChegadaRFID(NamedTuple):
+    """Chegada registrada a partir da leitura de um chip."""
+    num: int
+    nome: str
+    tag: str
+    tempo_liquido: float
+
+
 class GerenciadorDeCorrida:
     """
     Classe de negócio refatorada. Contém a lógica de negócio principal,
@@ -68,19 +164,49 @@ class GerenciadorDeCorrida:
     def __init__(self, db_manager, logger_obj: logging.Logger):
         self.db = db_manager
         self.logger = logger_obj
+        # Delta (ResumoSincronizacao) da última importação de CSV concluída.
+        self.ultima_sincronizacao = None
+        # Chip -> atleta em memória, para resolver leituras RFID sem SQL.
+        self.indice_rfid = IndiceRFID(db_manager)
+
+    def carregar_atletas_csv(self, caminho_arquivo: str, data_evento: date,
+                             progresso: Callable[["ProgressoImportacao"], None] | None = None,
+                             cancelamento: threading.Event | None = None,
+                             tamanho_bloco: int = TAMANHO_BLOCO_IMPORTACAO,
+                             processos: int | None = None,
+                             remover_ausentes: bool = False) -> tuple[int, list[str]]:
+        """
+        Importa o CSV em streaming: as linhas são validadas nesta thread e
+        enviadas ao banco em blocos de `tamanho_bloco`, então a memória não
+        cresce com o tamanho do arquivo e as chegadas continuam sendo gravadas
+        durante a importação. `progresso` recebe um ProgressoImportacao a cada
+        bloco gravado; sinalizar `cancelamento` interrompe a importação sem
+        gravar nada (ImportacaoCanceladaError).
+
+        A gravação é diferencial (ver DatabaseManager.sincronizar_atletas_em_blocos):
+        reimportar uma lista atualizada só escreve os atletas novos ou
+        alterados e preserva os tempos já registrados. Com `remover_ausentes`,
+        atletas que saíram da lista são removidos (salvo os que já chegaram).
+        O delta fica em `self.ultima_sincronizacao`.
 
-    def carregar_atletas_csv(self, caminho_arquivo: str, data_evento: date) -> tuple[int, list[str]]:
+        Com `processos` > 1 a validação das linhas é dividida entre processos
+        (ver parallel_csv) e cada bloco é gravado assim que suas linhas chegam
+        validadas, na ordem do arquivo. Sem o argumento, arquivos a partir de
+        LIMIAR_IMPORTACAO_PARALELA usam todos os núcleos disponíveis.
+
+        Bloqueia até o fim da importação; a UI deve chamá-lo fora da thread do Tk.
+        """
         erros = []
-        sucesso = 0
-        atletas_para_banco = []
-        numeros_vistos = set()
+        estado = ProgressoImportacao(bytes_total=0)
 
         try:
-            # CORREÇÃO: Lógica de leitura de CSV simplificada e mais robusta
-            with open(caminho_arquivo, mode='r', encoding='utf-8-sig', newline='') as arquivo:
-                # Usamos o DictReader diretamente, que é o padrão para CSV com cabeçalho
+            # O arquivo é aberto em binário para que a posição em bytes (e o
+            # percentual) possa ser consultada durante a leitura.
+            with open(caminho_arquivo, mode='rb') as bruto:
+                estado.bytes_total = os.fstat(bruto.fileno()).st_size
+                arquivo = io.TextIOWrapper(bruto, encoding='utf-8-sig', newline='')
                 leitor_dict = csv.DictReader(arquivo)
-                
+
                 # Validação do cabeçalho
                 header = [h.lower().strip() for h in leitor_dict.fieldnames] if leitor_dict.fieldnames else []
                 obrigatorias = ['num', 'nome', 'sexo', 'data_nascimento', 'modalidade']
@@ -88,50 +214,259 @@ class GerenciadorDeCorrida:
                     colunas_faltantes = [c for c in obrigatorias if c not in header]
                     raise CabecalhoInvalidoError(f"Cabeçalho do CSV inválido. Colunas obrigatórias não encontradas: {colunas_faltantes}")
 
-                for i, linha in enumerate(leitor_dict, start=2):
+                if processos is None:
+                    processos = (os.cpu_count() or 1) if estado.bytes_total >= LIMIAR_IMPORTACAO_PARALELA else 1
+
+                importado = False
+                if processos > 1:
                     try:
-                        num_str = linha.get('num')
-                        if not num_str:
-                            raise ValueError("Número do atleta ausente.")
-                        num = int(num_str)
-                        if num in numeros_vistos:
-                            raise ValueError(f"Número de atleta duplicado no arquivo: {num}")
-                        
-                        atleta = Atleta(
-                            num=num,
-                            nome=linha.get('nome'),
-                            sexo=linha.get('sexo'),
-                            data_nascimento_str=linha.get('data_nascimento'),
-                            modalidade=linha.get('modalidade'),
-                            categoria=linha.get('categoria'), # Passa a categoria do CSV
-                            data_evento=data_evento
-                        )
-                        
-                        # Adiciona a tupla completa para inserção no banco
-                        atletas_para_banco.append((
-                            atleta.num,
-                            atleta.nome,
-                            atleta.sexo,
-                            atleta.data_nascimento_str,
-                            atleta.modalidade,
-                            atleta.categoria
-                        ))
-                        numeros_vistos.add(num)
-                        sucesso += 1
-                    except ErroDadosAtleta as e:
-                        erros.append(f"Linha {i}: Atleta #{linha.get('num', 'N/A')} - {e}")
-                    except Exception as e:
-                        erros.append(f"Linha {i}: Erro inesperado - {e}")
-
-            if atletas_para_banco:
-                self.db.adicionar_atletas_em_lote(atletas_para_banco)
+                        resultados, posicao = self._validar_em_processos(caminho_arquivo, data_evento, processos)
+                        # Os blocos são consumidos nesta thread: cada um é gravado na
+                        # tabela de preparação enquanto o pool valida as faixas seguintes,
+                        # sem que o escritor fique à espera dos processos.
+                        blocos = self._blocos_validados(resultados, posicao, tamanho_bloco, estado, erros, progresso)
+                        resumo = self.db.sincronizar_atletas_em_blocos(blocos, cancelamento, remover_ausentes).result()
+                        importado = True
+                    except csv.Error as e:
+                        # Campo entre aspas com quebra de linha: a divisão por
+                        # faixas não se aplica. Os blocos já preparados saem com a
+                        # tabela temporária; nada chegou a 'atletas'.
+                        self.logger.warning(f"Validação paralela indisponível para '{caminho_arquivo}' ({e}); lendo sequencialmente.")
+                        erros.clear()
+                        estado = ProgressoImportacao(bytes_total=estado.bytes_total)
+
+                if not importado:
+                    resultados = (validar_linha_csv(linha, data_evento) for linha in leitor_dict)
+                    blocos = self._blocos_validados(resultados, bruto.tell, tamanho_bloco, estado, erros, progresso)
+                    resumo = self.db.sincronizar_atletas_em_blocos(blocos, cancelamento, remover_ausentes).result()
 
         except FileNotFoundError:
             raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
         except UnicodeDecodeError:
             raise Exception("Erro de codificação. Salve o arquivo CSV com codificação UTF-8.")
+        except ImportacaoCanceladaError:
+            self.logger.warning(f"Importação de '{caminho_arquivo}' cancelada após {estado.linhas} linha(s).")
+            raise
         except Exception as e:
             self.logger.critical(f"Erro crítico ao processar o arquivo CSV: {e}")
             raise
 
-        return sucesso, erros
\ No newline at end of file
+        self.ultima_sincronizacao = resumo
+        self.logger.info(f"Importação concluída: {estado.importados} atleta(s) em {estado.decorrido:.1f}s "
+                         f"({estado.linhas_por_segundo:.0f} linhas/s); {resumo.descricao()}.")
+        return estado.importados, erros
+
+    def carregar_atletas_colunar(self, caminho_arquivo: str, data_evento: date,
+                                 progresso: Callable[["ProgressoImportacao"], None] | None = None,
+                                 cancelamento: threading.Event | None = None,
+                                 tamanho_bloco: int = TAMANHO_BLOCO_IMPORTACAO,
+                                 remover_ausentes: bool = False) -> tuple[int, list[str]]:
+        """
+        Equivalente a `carregar_atletas_csv` para arquivos Parquet ou Arrow
+        (requer pyarrow). Os lotes do arquivo são percorridos coluna a coluna,
+        sem um dicionário por linha; números e datas podem vir tipados. A
+        validação, a gravação diferencial, o progresso (proporcional às linhas
+        lidas) e o cancelamento são os mesmos da importação de CSV.
+        """
+        erros = []
+        estado = ProgressoImportacao(bytes_total=0)
+
+        try:
+            leitor = LeitorColunar(caminho_arquivo, tamanho_bloco)
+            if leitor.faltantes:
+                raise CabecalhoInvalidoError(f"Colunas obrigatórias não encontradas no arquivo: {leitor.faltantes}")
+            estado.bytes_total = os.path.getsize(caminho_arquivo)
+            resultados = (validar_campos_atleta(*campos, data_evento)
+                          for colunas in leitor.lotes() for campos in zip(*colunas))
+
+            def posicao():
+                # Sem posição em bytes num arquivo colunar: proporção das linhas lidas.
+                return estado.bytes_total * estado.linhas // max(leitor.total_linhas, 1)
+
+            blocos = self._blocos_validados(resultados, posicao, tamanho_bloco, estado, erros, progresso)
+            resumo = self.db.sincronizar_atletas_em_blocos(blocos, cancelamento, remover_ausentes).result()
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
+        except ImportacaoCanceladaError:
+            self.logger.warning(f"Importação de '{caminho_arquivo}' cancelada após {estado.linhas} linha(s).")
+            raise
+        except Exception as e:
+            self.logger.critical(f"Erro crítico ao processar o arquivo {caminho_arquivo}: {e}")
+            raise
+
+        self.ultima_sincronizacao = resumo
+        self.logger.info(f"Importação concluída: {estado.importados} atleta(s) em {estado.decorrido:.1f}s "
+                         f"({estado.linhas_por_segundo:.0f} linhas/s); {resumo.descricao()}.")
+        return estado.importados, erros
+
+    def _validar_em_processos(self, caminho_arquivo: str, data_evento: date,
+                              processos: int) -> tuple[Iterator[ResultadoLinha], Callable[[], int]]:
+        """
+        Valida o arquivo em faixas de bytes num ProcessPoolExecutor. Os
+        resultados são entregues na ordem do arquivo, com no máximo
+        2 * `processos` faixas em andamento para manter a memória limitada.
+        Retorna o iterador de resultados e a posição (em bytes) já consumida.
+        """
+        campos, inicio_dados = ler_cabecalho(caminho_arquivo)
+        tamanho_dados = os.path.getsize(caminho_arquivo) - inicio_dados
+        quantidade = max(processos, -(-tamanho_dados // BYTES_POR_FAIXA_PARALELA))
+        faixas = dividir_em_faixas(caminho_arquivo, inicio_dados, quantidade)
+        consumido = [inicio_dados]
+
+        def resultados():
+            # spawn: o processo principal tem threads (Tk, escritor), fork não é seguro.
+            executor = ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn'))
+            try:
+                for faixa, linhas in validar_em_ordem(executor, caminho_arquivo, faixas, campos,
+                                                      validar_linha_csv, data_evento, 2 * processos):
+                    consumido[0] = faixa.fim
+                    yield from linhas
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        self.logger.info(f"Validando '{caminho_arquivo}' em {len(faixas)} faixa(s) com {processos} processo(s).")
+        return resultados(), lambda: consumido[0]
+
+    def _blocos_validados(self, resultados: Iterator[ResultadoLinha], posicao: Callable[[], int], tamanho_bloco: int,
+                          estado: "ProgressoImportacao", erros: list,
+                          progresso: Callable[["ProgressoImportacao"], None] | None) -> Iterator[list]:
+        """
+        Agrupa as linhas validadas (na ordem do arquivo) em blocos, detectando
+        números duplicados. Quando o consumidor pede o bloco seguinte, o
+        anterior já foi gravado: é o momento de reportar o progresso.
+        """
+        numeros_vistos = set()
+        bloco = []
+
+        def reportar():
+            estado.bytes_lidos = posicao()
+            estado.decorrido = time.perf_counter() - inicio
+            if progresso:
+                progresso(estado)
+
+        inicio = time.perf_counter()
+        for i, (num, atleta, erro) in enumerate(resultados, start=2):
+            estado.linhas += 1
+            if num is not None and num in numeros_vistos:
+                erros.append(f"Linha {i}: Erro inesperado - Número de atleta duplicado no arquivo: {num}")
+            elif erro is not None:
+                erros.append(f"Linha {i}: {erro}")
+            else:
+                # Adiciona a tupla completa para inserção no banco
+                bloco.append(atleta)
+                numeros_vistos.add(num)
+            estado.erros = len(erros)
+
+            if len(bloco) >= tamanho_bloco:
+                yield bloco
+                estado.importados += len(bloco)
+                bloco = []
+                reportar()
+
+        if bloco:
+            yield bloco
+            estado.importados += len(bloco)
+        reportar()
+
+    def carregar_tags_csv(self, caminho_arquivo: str) -> tuple[int, list[str]]:
+        """
+        Associa chips a atletas a partir de um CSV com as colunas 'tag' (o
+        EPC) e 'num'. Um atleta pode aparecer em várias linhas, uma por chip;
+        um chip repetido no arquivo ou de um atleta não inscrito é rejeitado.
+        """
+        erros = []
+        pares = {}
+        with open(caminho_arquivo, mode='r', encoding='utf-8-sig', newline='') as f:
+            leitor = csv.DictReader(f)
+            cabecalho = {c.lower().strip(): c for c in leitor.fieldnames or []}
+            faltantes = [c for c in ('tag', 'num') if c not in cabecalho]
+            if faltantes:
+                raise CabecalhoInvalidoError(f"Colunas obrigatórias não encontradas no CSV: {faltantes}")
+
+            for i, linha in enumerate(leitor, start=2):
+                tag = normalizar_tag(linha.get(cabecalho['tag']) or '')
+                num_bruto = (linha.get(cabecalho['num']) or '').strip()
+                if not tag:
+                    erros.append(f"Linha {i}: Tag vazia.")
+                elif not num_bruto.isdigit():
+                    erros.append(f"Linha {i}: Número de atleta inválido: '{num_bruto}'")
+                elif tag in pares:
+                    erros.append(f"Linha {i}: Tag duplicada no arquivo: {tag}")
+                else:
+                    pares[tag] = (i, int(num_bruto))
+
+        inscritos = {linha[0] for linha in self.db.obter_situacao_atletas({num for _, num in pares.values()})}
+        validos = []
+        for tag, (i, num) in pares.items():
+            if num in inscritos:
+                validos.append((tag, num))
+            else:
+                erros.append(f"Linha {i}: Atleta #{num} não está inscrito.")
+
+        if validos:
+            self.db.associar_tags(validos).result()
+        self.logger.info(f"{len(validos)} chip(s) associado(s) a partir de '{caminho_arquivo}'.")
+        return len(validos), erros
+
+    def preparar_indice_rfid(self):
+        """Carrega o índice de chips; chamado na largada, antes das primeiras leituras."""
+        self.indice_rfid.carregar()
+
+    def registrar_chegada_por_rfid(self, tag_id: str, antena: int | None = None,
+                                   instante: float | None = None) -> ChegadaRFID:
+        """
+        Registra a chegada do atleta dono do chip `tag_id`. O chip, o nome e
+        a situação do atleta vêm do índice em memória; o banco só é acessado
+        para gravar a chegada.
+
+        `instante` (epoch, em segundos) é o momento da passagem estimado pela
+        ponte; sem ele, vale o momento do registro. Um `instante` adiante do
+        relógio local (ver TOLERANCIA_RELOGIO_PONTE) é descartado em favor do
+        momento do registro, com um aviso no log.
+        """
+        tag = normalizar_tag(tag_id)
+        num = self.indice_rfid.num_por_tag(tag)
+        if num is None:
+            raise AtletaNaoEncontradoError(f"Nenhum atleta associado à tag {tag}.")
+        if self.indice_rfid.ja_chegou(num):
+            raise ChegadaJaRegistradaError(f"Atleta #{num} já tem chegada registrada (tag {tag}).")
+        nome = self.indice_rfid.nome(num)
+        if nome is None:
+            raise AtletaNaoEncontradoError(f"A tag {tag} pertence ao atleta #{num}, que não está inscrito.")
+
+        horario_largada = self.db.carregar_estado_datetime('horario_largada')
+        if not horario_largada:
+            raise ErroLogicaCorrida("Horário de largada não definido.")
+        momento = self._momento_da_passagem(tag, instante)
+        tempo_liquido = (momento - horario_largada).total_seconds()
+        if tempo_liquido < 0:
+            raise ErroLogicaCorrida("Leitura anterior ao horário de largada.")
+
+        # Marcar antes de gravar faz a leitura seguinte do mesmo chip (ou do
+        # outro chip do atleta) ser recusada mesmo antes do commit.
+        if not self.indice_rfid.marcar_chegada(num):
+            raise ChegadaJaRegistradaError(f"Atleta #{num} já tem chegada registrada (tag {tag}).")
+        try:
+            futuro = self.db.registrar_chegada(num, momento.isoformat(), tempo_liquido,
+                                               origem="RFID", tag=tag, antena=antena)
+        except Exception:
+            self.indice_rfid.desmarcar_chegada(num)
+            raise
+        futuro.add_done_callback(lambda f: f.exception() and self.indice_rfid.desmarcar_chegada(num))
+        return ChegadaRFID(num, nome, tag, tempo_liquido)
+
+    def _momento_da_passagem(self, tag: str, instante: float | None) -> datetime:
+        """Confere o instante informado pela ponte contra o relógio local."""
+        agora = time.time()
+        if instante is None:
+            return datetime.fromtimestamp(agora)
+        diferenca = instante - agora
+        if diferenca > TOLERANCIA_RELOGIO_PONTE:
+            self.logger.warning(f"Passagem da tag {tag} informada {diferenca:.1f}s à frente do relógio local; "
+                                f"relógio da ponte adiantado? Usando o momento do registro.")
+            return datetime.fromtimestamp(agora)
+        if -diferenca > ATRASO_MAXIMO_PONTE:
+            self.logger.warning(f"Passagem da tag {tag} informada {-diferenca:.0f}s antes do registro; "
+                                f"verifique o relógio da ponte.")
+        return datetime.fromtimestamp(instante)
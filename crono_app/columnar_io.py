@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# columnar_io.py
+
+"""
+Importação e exportação de atletas em formatos colunares (Parquet e Arrow IPC/Feather).
+
+Os arquivos são lidos e escritos em lotes (RecordBatch): a importação
+percorre as colunas de cada lote diretamente, sem montar um dicionário por
+linha como o csv.DictReader, e a exportação gera colunas tipadas (inteiros,
+datas, tempos em segundos) prontas para ferramentas de análise.
+
+O pyarrow é uma dependência opcional, importada apenas quando um desses
+formatos é usado; sem ele, as funções levantam ImportError com instruções
+de instalação.
+"""
+
+import os
+from typing import Any, Iterator, List, Sequence
+
+EXTENSOES_PARQUET = (".parquet", ".pq")
+EXTENSOES_ARROW = (".arrow", ".feather", ".ipc")
+
+COLUNAS_OBRIGATORIAS = ("num", "nome", "sexo", "data_nascimento", "modalidade")
+COLUNAS_ATLETA = COLUNAS_OBRIGATORIAS + ("categoria",)
+
+
+def importar_pyarrow():
+    """Importa o pyarrow sob demanda."""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401 (registra o submódulo)
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"pyarrow não encontrado ({e}). Instale com: pip install pyarrow") from e
+    return pyarrow
+
+
+def eh_arquivo_colunar(caminho: str) -> bool:
+    return os.path.splitext(caminho)[1].lower() in EXTENSOES_PARQUET + EXTENSOES_ARROW
+
+
+def _eh_parquet(caminho: str) -> bool:
+    return os.path.splitext(caminho)[1].lower() in EXTENSOES_PARQUET
+
+
+class LeitorColunar:
+    """
+    Lê um arquivo Parquet ou Arrow em lotes de até `tamanho_lote` linhas.
+
+    `colunas` mapeia os nomes canônicos (num, nome, ...) para os nomes do
+    arquivo, que são comparados sem diferenciar maiúsculas e espaços, como o
+    cabeçalho do CSV. Colunas obrigatórias ausentes ficam em `faltantes`.
+    """
+    def __init__(self, caminho: str, tamanho_lote: int):
+        pa = importar_pyarrow()
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        if _eh_parquet(caminho):
+            self._parquet = pa.parquet.ParquetFile(caminho)
+            self._ipc = None
+            nomes = self._parquet.schema_arrow.names
+            self.total_linhas = self._parquet.metadata.num_rows
+        else:
+            self._parquet = None
+            self._ipc = pa.ipc.open_file(pa.memory_map(caminho, "r"))
+            nomes = self._ipc.schema.names
+            self.total_linhas = sum(self._ipc.get_batch(i).num_rows for i in range(self._ipc.num_record_batches))
+
+        por_nome = {nome.lower().strip(): nome for nome in nomes}
+        self.colunas = {c: por_nome[c] for c in COLUNAS_ATLETA if c in por_nome}
+        self.faltantes = [c for c in COLUNAS_OBRIGATORIAS if c not in self.colunas]
+
+    def lotes(self) -> Iterator[List[Sequence[Any]]]:
+        """
+        Cada lote é a lista das colunas de COLUNAS_ATLETA, já convertidas para
+        listas Python (uma conversão por coluna, não por célula). Uma coluna
+        'categoria' ausente vira uma coluna de None.
+        """
+        if self._parquet is not None:
+            lotes = self._parquet.iter_batches(batch_size=self.tamanho_lote, columns=list(self.colunas.values()))
+        else:
+            lotes = (self._ipc.get_batch(i) for i in range(self._ipc.num_record_batches))
+
+        for lote in lotes:
+            indices = [lote.schema.get_field_index(self.colunas[c]) if c in self.colunas else None
+                       for c in COLUNAS_ATLETA]
+            # Lotes IPC têm o tamanho com que foram gravados; são fatiados aqui.
+            for inicio in range(0, lote.num_rows, self.tamanho_lote):
+                fatia = lote.slice(inicio, self.tamanho_lote)
+                yield [fatia.column(i).to_pylist() if i is not None else [None] * fatia.num_rows
+                       for i in indices]
+
+
+# Colunas da exportação de resultados e seus tipos Arrow.
+CAMPOS_EXPORTACAO = (
+    ("num", "int32"),
+    ("nome", "string"),
+    ("sexo", "string"),
+    ("data_nascimento", "date32"),
+    ("idade", "int16"),
+    ("faixa_etaria", "string"),
+    ("categoria", "string"),
+    ("modalidade", "string"),
+    ("tempo_liquido", "float64"),
+    ("tempo_absoluto_chegada", "string"),
+    ("pos_geral", "int32"),
+    ("pos_sexo", "int32"),
+    ("pos_categoria", "int32"),
+    ("pos_faixa", "int32"),
+)
+
+
+def esquema_exportacao():
+    pa = importar_pyarrow()
+    tipos = {"int16": pa.int16(), "int32": pa.int32(), "float64": pa.float64(),
+             "string": pa.string(), "date32": pa.date32()}
+    return pa.schema([(nome, tipos[tipo]) for nome, tipo in CAMPOS_EXPORTACAO])
+
+
+class EscritorColunar:
+    """
+    Grava lotes de linhas (tuplas na ordem de CAMPOS_EXPORTACAO) em Parquet
+    ou Arrow IPC, conforme a extensão do arquivo. As datas chegam em ISO
+    (data_nascimento_iso) e são convertidas para date32 pelo próprio Arrow.
+    """
+    def __init__(self, caminho: str):
+        self._pa = importar_pyarrow()
+        self.esquema = esquema_exportacao()
+        if _eh_parquet(caminho):
+            self._escritor = self._pa.parquet.ParquetWriter(caminho, self.esquema, compression="zstd")
+        else:
+            self._escritor = self._pa.ipc.new_file(caminho, self.esquema)
+
+    def escrever(self, linhas: List[tuple]):
+        pa = self._pa
+        colunas = list(zip(*linhas))
+        arrays = []
+        for campo, valores in zip(self.esquema, colunas):
+            if campo.type == pa.date32():
+                arrays.append(pa.array(valores, pa.string()).cast(pa.date32()))
+            else:
+                arrays.append(pa.array(valores, campo.type))
+        self._escritor.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.esquema))
+
+    def fechar(self):
+        self._escritor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
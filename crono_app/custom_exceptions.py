@@ -34,6 +34,10 @@ class CabecalhoInvalidoError(ErroImportacaoCSV):
     """Lançada quando o cabeçalho do CSV não contém as colunas obrigatórias."""
     pass
 
+class ImportacaoCanceladaError(ErroImportacaoCSV):
+    """Lançada quando o usuário cancela uma importação em andamento (nada é gravado)."""
+    pass
+
 class ErroLogicaCorrida(ErroCronometragem):
     """Lançada para erros de lógica de negócio (ex: chegada antes da largada)."""
     pass
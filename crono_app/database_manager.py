@@ -1,13 +1,145 @@
 # -*- coding: utf-8 -*-
+import itertools
+import re
 import sqlite3
 import logging
-from typing import List, Any
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Set
+
+from .columnar_io import EscritorColunar
+from .custom_exceptions import ImportacaoCanceladaError
+from .db_writer import EscritorDeBanco
+from .db_migrations import aplicar_migracoes
+from .db_tracing import InstrumentacaoSQL
+from .utils import derivar_campos_idade, hash_cadastro, normalizar_tag
 
 logger = logging.getLogger(__name__)
 
+
+class GerenciadorDeConexoes:
+    """
+    Mantém uma conexão SQLite aberta por thread durante toda a vida do processo.
+
+    Abrir uma conexão a cada operação custava setup, parsing do schema e um
+    fsync completo no modo rollback-journal. Aqui cada thread reutiliza a sua
+    conexão, e o banco opera em modo WAL com `synchronous=NORMAL`, permitindo
+    que leitores (tabela, relatórios) consultem enquanto o escritor faz commit.
+    """
+    def __init__(self, db_path: str, synchronous: str = "NORMAL", busy_timeout: float = 5.0):
+        self.db_path = db_path
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conexoes: List[sqlite3.Connection] = []
+        # Um banco ':memory:' é privado de cada conexão, então todas as threads
+        # precisam compartilhar a mesma para enxergar os mesmos dados.
+        self._compartilhada = db_path == ":memory:"
+
+    def _abrir(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               check_same_thread=not self._compartilhada)
+        conn.row_factory = sqlite3.Row
+        if not self._compartilhada:
+            modo = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if str(modo).lower() != "wal":
+                logger.warning(f"Não foi possível ativar o modo WAL (modo atual: {modo}).")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        with self._lock:
+            self._conexoes.append(conn)
+        logger.debug(f"Nova conexão SQLite aberta para '{self.db_path}' na thread {threading.current_thread().name}.")
+        return conn
+
+    def obter(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual, abrindo-a na primeira chamada."""
+        if self._compartilhada:
+            with self._lock:
+                if self._conexoes:
+                    return self._conexoes[0]
+            return self._abrir()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._abrir()
+            self._local.conn = conn
+        return conn
+
+    def fechar_todas(self):
+        """Fecha todas as conexões abertas (chamado no encerramento da aplicação)."""
+        with self._lock:
+            conexoes, self._conexoes = self._conexoes, []
+        for conn in conexoes:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao fechar conexão SQLite: {e}")
+        self._local = threading.local()
+        logger.info(f"{len(conexoes)} conexão(ões) SQLite fechada(s).")
+
+
+@dataclass
+class AlteracoesDB:
+    """
+    Evento de mudança entregue aos observadores: quais atletas foram inseridos,
+    atualizados ou removidos, quais chaves de estado mudaram e se as categorias
+    mudaram. Permite que um observador aplique apenas o que mudou.
+    """
+    atletas_inseridos: Set[int] = field(default_factory=set)
+    atletas_atualizados: Set[int] = field(default_factory=set)
+    atletas_removidos: Set[int] = field(default_factory=set)
+    chaves_estado: Set[str] = field(default_factory=set)
+    categorias: bool = False
+    # Associação de chips RFID alterada.
+    tags_rfid: bool = False
+    # Mudança ampla demais para ser enumerada (ex.: reinício da prova).
+    recarga_total: bool = False
+
+    def mesclar(self, outra: "AlteracoesDB") -> "AlteracoesDB":
+        """Acumula outra alteração nesta (usado para coalescer notificações)."""
+        self.atletas_inseridos |= outra.atletas_inseridos
+        self.atletas_atualizados |= outra.atletas_atualizados
+        self.atletas_removidos |= outra.atletas_removidos
+        self.chaves_estado |= outra.chaves_estado
+        self.categorias = self.categorias or outra.categorias
+        self.tags_rfid = self.tags_rfid or outra.tags_rfid
+        self.recarga_total = self.recarga_total or outra.recarga_total
+        return self
+
+    @property
+    def atletas_alterados(self) -> Set[int]:
+        return self.atletas_inseridos | self.atletas_atualizados | self.atletas_removidos
+
+
+@dataclass
+class ResumoSincronizacao:
+    """Resultado de uma reimportação diferencial, em números de atleta."""
+    inseridos: List[int] = field(default_factory=list)
+    alterados: List[int] = field(default_factory=list)
+    removidos: List[int] = field(default_factory=list)
+    # Ausentes do arquivo, mas mantidos por já terem chegada registrada.
+    preservados: List[int] = field(default_factory=list)
+    inalterados: int = 0
+
+    @property
+    def total_escritos(self) -> int:
+        return len(self.inseridos) + len(self.alterados) + len(self.removidos)
+
+    def descricao(self) -> str:
+        texto = (f"{len(self.inseridos)} novo(s), {len(self.alterados)} alterado(s), "
+                 f"{len(self.removidos)} removido(s), {self.inalterados} sem alteração")
+        if self.preservados:
+            texto += f", {len(self.preservados)} ausente(s) mantido(s) por já terem chegada"
+        return texto
+
+
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, janela_notificacao: float = 0.0, evento_id: int = 1):
         self.db_path = db_path
+        # Evento (prova) ao qual todas as leituras e escritas desta instância
+        # se referem. Vários eventos convivem no mesmo arquivo.
+        self.evento_id = evento_id
         # CORREÇÃO: A lista de observadores deve ser inicializada como uma lista vazia.
         self._observers: List[Any] = []
         # Configura a base de dados ao inicializar o gerenciador
@@ -16,6 +148,27 @@ class DatabaseManager:
             raise ValueError("O caminho do banco de dados não pode ser vazio.")
         if not isinstance(db_path, str):
             raise TypeError("O caminho do banco de dados deve ser uma string.")
+        self._conexoes = GerenciadorDeConexoes(db_path)
+        self._escritor: EscritorDeBanco | None = None
+        # Espelho write-through de 'estado_corrida' (carregado sob demanda) e
+        # valores já convertidos para datetime, para o relógio e as chegadas.
+        self._cache_estado: dict | None = None
+        self._cache_datetimes: dict = {}
+        self._lock_cache = threading.Lock()
+        # Data do evento, base das idades pré-calculadas (ver definir_data_evento).
+        self._data_evento: date | None = None
+        # Notificações que chegam dentro de 'janela_notificacao' segundos são
+        # coalescidas num único evento (0 = entrega imediata).
+        self.janela_notificacao = janela_notificacao
+        self._alteracoes_pendentes: AlteracoesDB | None = None
+        self._timer_notificacao: threading.Timer | None = None
+        self._lock_notificacao = threading.Lock()
+        # Se o índice FTS5 de nomes existe (descoberto na primeira busca).
+        self._busca_fts: bool | None = None
+        # Sufixo das tabelas temporárias de importação (ver sincronizar_atletas_em_blocos).
+        self._sequencia_importacao = itertools.count(1)
+        # Instrumentação das consultas (ver ativar_instrumentacao); None = desligada.
+        self.instrumentacao: InstrumentacaoSQL | None = None
         # A chamada para setup_database() foi removida daqui.
         # A inicialização do banco de dados agora é de responsabilidade exclusiva
         # do método _inicializacao_pos_ui na classe AppCrono, garantindo que
@@ -33,189 +186,1122 @@ class DatabaseManager:
             pass
 
     # OBSERVER PATTERN: O ponto central de notificação.
-    # Chamado após qualquer operação que altere os dados.
-    def _notify(self):
+    # Chamado após qualquer operação que altere os dados, com um AlteracoesDB
+    # descrevendo a mudança. Observadores recebem update(subject, alteracoes).
+    def _notify(self, alteracoes: AlteracoesDB):
+        if self.janela_notificacao <= 0:
+            self._despachar(alteracoes)
+            return
+        with self._lock_notificacao:
+            if self._alteracoes_pendentes is None:
+                self._alteracoes_pendentes = AlteracoesDB()
+            self._alteracoes_pendentes.mesclar(alteracoes)
+            if self._timer_notificacao is None:
+                self._timer_notificacao = threading.Timer(self.janela_notificacao, self.descarregar_notificacoes)
+                self._timer_notificacao.daemon = True
+                self._timer_notificacao.start()
+
+    def descarregar_notificacoes(self):
+        """Entrega imediatamente as alterações coalescidas ainda pendentes."""
+        with self._lock_notificacao:
+            alteracoes, self._alteracoes_pendentes = self._alteracoes_pendentes, None
+            if self._timer_notificacao is not None:
+                self._timer_notificacao.cancel()
+                self._timer_notificacao = None
+        if alteracoes is not None:
+            self._despachar(alteracoes)
+
+    def _despachar(self, alteracoes: AlteracoesDB):
         logger.debug(f"Notificando {len(self._observers)} observador(es)...")
         for observer in self._observers:
-            observer.update(self)
+            observer.update(self, alteracoes)
 
     def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Adicione esta linha!
+        # A conexão é reutilizada por thread; o 'with conn:' dos chamadores
+        # apenas faz commit/rollback, sem fechá-la.
+        conn = self._conexoes.obter()
+        if self.instrumentacao is not None:
+            return self.instrumentacao.envolver(conn)
         return conn
 
+    def ativar_instrumentacao(self, limite_lento: float = 0.05, arquivo_lento: str | None = None,
+                              resumo_na_saida: bool = False) -> InstrumentacaoSQL:
+        """
+        Passa a medir todos os comandos SQL (contagem, p50/p95/p99, linhas) e
+        a registrar os que levarem mais de `limite_lento` segundos.
+        """
+        self.desativar_instrumentacao()
+        instrumentacao = InstrumentacaoSQL(limite_lento, arquivo_lento)
+        if resumo_na_saida:
+            instrumentacao.registrar_resumo_na_saida()
+        self.instrumentacao = instrumentacao
+        logger.info(f"Instrumentação SQL ativada (consultas lentas: >= {limite_lento * 1000:.0f} ms).")
+        return instrumentacao
+
+    def desativar_instrumentacao(self):
+        if self.instrumentacao is not None:
+            self.instrumentacao.encerrar()
+            self.instrumentacao = None
+
+    def fechar(self):
+        """Drena as escritas pendentes e fecha as conexões mantidas abertas."""
+        self.parar_escritor()
+        self.descarregar_notificacoes()
+        if self._escritor is not None and self._escritor.ativo:
+            logger.warning("Escritor ainda ativo; as conexões SQLite ficam abertas até o fim do processo.")
+            return
+        self._conexoes.fechar_todas()
+
+    # --- Pipeline de escrita ---
+    def iniciar_escritor(self):
+        """
+        Passa a executar todas as mutações numa thread escritora dedicada.
+        A partir daqui os métodos de escrita retornam imediatamente um Future.
+        """
+        if self._escritor is None:
+            self._escritor = EscritorDeBanco(self._get_connection, self._ao_confirmar_grupo)
+        self._escritor.iniciar()
+
+    def parar_escritor(self):
+        if self._escritor is not None:
+            self._escritor.parar()
+
+    def _ao_confirmar_grupo(self, operacoes):
+        # Um único evento por grupo confirmado, não por operação.
+        alteracoes = None
+        for op in operacoes:
+            if op.alteracoes is not None:
+                alteracoes = (alteracoes or AlteracoesDB()).mesclar(op.alteracoes)
+        if alteracoes is not None:
+            self._notify(alteracoes)
+
+    def _executar_escrita(self, funcao: Callable[[sqlite3.Cursor], Any], descricao: str,
+                          alteracoes: AlteracoesDB | None = None, propagar_erro: bool = True) -> Future:
+        """
+        Executa uma mutação. Com o escritor ativo ela é enfileirada e o Future
+        é resolvido após o commit do grupo; sem ele (testes, scripts), roda de
+        forma síncrona na thread atual, mantendo o comportamento anterior.
+        Os observadores são notificados com `alteracoes` após o commit.
+        """
+        if self._escritor is not None and self._escritor.ativo:
+            return self._escritor.submeter(funcao, descricao, alteracoes)
+
+        futuro: Future = Future()
+        try:
+            with self._get_connection() as conn:
+                resultado = funcao(conn.cursor())
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao {descricao}: {e}")
+            futuro.set_exception(e)
+            if propagar_erro:
+                raise
+            return futuro
+        futuro.set_result(resultado)
+        if alteracoes is not None:
+            self._notify(alteracoes)
+        return futuro
+
     def setup_database(self):
+        """
+        Leva o schema à versão atual. Com o banco em dia, custa apenas a
+        leitura de `PRAGMA user_version` (ver db_migrations).
+        """
+        self._invalidar_cache_estado()
+        self._busca_fts = None
         with self._get_connection() as conn:
-            cursor = conn.cursor()
+            aplicar_migracoes(conn)
 
-            # 1. Garantir que as tabelas principais existam
-            sql_criar_tabela_atletas = """
-            CREATE TABLE IF NOT EXISTS atletas (
-                num INTEGER PRIMARY KEY, nome TEXT NOT NULL, sexo TEXT NOT NULL CHECK(sexo IN ('M', 'F')),
-                data_nascimento TEXT NOT NULL, modalidade TEXT NOT NULL,
-                tempo_absoluto_chegada TEXT, tempo_liquido REAL, categoria TEXT NOT NULL DEFAULT 'GERAL'
-            );"""
-            sql_criar_tabela_estado = "CREATE TABLE IF NOT EXISTS estado_corrida (chave TEXT PRIMARY KEY, valor TEXT);"
-            sql_criar_tabela_categorias = """
-            CREATE TABLE IF NOT EXISTS categorias (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL UNIQUE,
-                descricao TEXT
-            );"""
-            cursor.execute(sql_criar_tabela_atletas)
-            cursor.execute(sql_criar_tabela_estado)
-            cursor.execute(sql_criar_tabela_categorias)
-
-            # 2. Adicionar a coluna 'categoria' se ela não existir (operação de migração)
-            try:
-                # Esta consulta falhará se a coluna já existir, caindo no bloco except
-                cursor.execute("ALTER TABLE atletas ADD COLUMN categoria TEXT NOT NULL DEFAULT 'GERAL'")
-                logger.info("Coluna 'categoria' adicionada à tabela 'atletas'.")
-            except sqlite3.OperationalError as e:
-                # Ignora o erro apenas se for 'duplicate column name', caso contrário, lança a exceção
-                if "duplicate column name" not in str(e):
-                    logger.error(f"Erro inesperado ao tentar alterar a tabela 'atletas': {e}")
-                    raise
-                # Se a coluna já existe, o erro é esperado e ignorado.
-                pass
-            
-            conn.commit()
+    def obter_data_evento(self) -> date | None:
+        """Data do evento usada no cálculo das idades (estado 'data_evento')."""
+        if self._data_evento is not None:
+            return self._data_evento
+        valor = self.carregar_estado_corrida('data_evento')
+        try:
+            self._data_evento = date.fromisoformat(valor) if valor else None
+        except ValueError:
+            logger.error(f"Data do evento inválida no estado da corrida: {valor!r}")
+        return self._data_evento
 
-    def adicionar_atletas_em_lote(self, atletas_data: List):
+    def definir_data_evento(self, data_evento: date) -> Future | None:
+        """
+        Define a data do evento. As idades e faixas etárias de todos os atletas
+        são recalculadas apenas quando a data realmente muda; retorna o Future
+        do recálculo ou None se nada mudou.
+        """
+        if self.obter_data_evento() == data_evento:
+            return None
+        self._data_evento = data_evento
+        self.salvar_estado_corrida('data_evento', data_evento.isoformat())
+
+        evento_id = self.evento_id
+        def operacao(cursor):
+            cursor.execute("SELECT num, data_nascimento FROM atletas WHERE evento_id = ?", (evento_id,))
+            linhas = [(*derivar_campos_idade(data_nasc, data_evento), evento_id, num)
+                      for num, data_nasc in cursor.fetchall()]
+            cursor.executemany(
+                "UPDATE atletas SET data_nascimento_iso = ?, idade = ?, faixa_etaria = ? WHERE evento_id = ? AND num = ?",
+                linhas)
+            self._recalcular_classificacao(cursor, evento_id)
+            logger.info(f"Idades recalculadas para {len(linhas)} atleta(s) com a data do evento {data_evento}.")
+            return len(linhas)
+
+        return self._executar_escrita(operacao, "recalcular idades para a nova data do evento",
+                                      AlteracoesDB(recarga_total=True))
+
+    _SQL_INSERIR_ATLETA = (
+        "INSERT OR REPLACE INTO atletas (evento_id, num, nome, sexo, data_nascimento, modalidade, categoria, "
+        "data_nascimento_iso, idade, faixa_etaria, hash_cadastro) VALUES (?,?,?,?,?,?,?,?,?,?,?);"
+    )
+
+    def adicionar_atletas_em_lote(self, atletas_data: List) -> Future:
         # O número de '?' deve corresponder ao número de colunas na tabela
-        # A coluna 'categoria' foi adicionada
-        sql = "INSERT OR REPLACE INTO atletas (num, nome, sexo, data_nascimento, modalidade, categoria) VALUES (?,?,?,?,?,?);"
+        # A coluna 'categoria' foi adicionada; as colunas de idade são derivadas aqui.
+        sql = self._SQL_INSERIR_ATLETA
+        data_evento = self.obter_data_evento()
+        linhas = [(self.evento_id, *linha, *derivar_campos_idade(linha[3], data_evento), hash_cadastro(*linha))
+                  for linha in atletas_data]
+        evento_id = self.evento_id
+
+        def operacao(cursor):
+            cursor.executemany(sql, linhas)
+            # A substituição pode ter mudado sexo/categoria ou zerado tempos de
+            # atletas já classificados.
+            self._atualizar_classificacao(cursor, evento_id, {linha[0] for linha in atletas_data})
+            logger.info(f"{len(atletas_data)} atletas inseridos/atualizados em lote.")
+
+        # 'inseridos' aqui tem semântica de upsert: a linha inteira foi (re)escrita.
+        alteracoes = AlteracoesDB(atletas_inseridos={linha[0] for linha in atletas_data})
+        return self._executar_escrita(operacao, "inserir atletas em lote", alteracoes)
+
+    # Acima deste número de atletas afetados, a reimportação notifica uma
+    # recarga total em vez de enumerar os números.
+    _LIMITE_NOTIFICACAO_SINCRONIZACAO = 500
+
+    def sincronizar_atletas_em_blocos(self, blocos: Iterable[List[tuple]],
+                                      cancelamento: threading.Event | None = None,
+                                      remover_ausentes: bool = False) -> Future:
+        """
+        Importação diferencial em streaming. Os blocos de tuplas `(num, nome,
+        sexo, data_nascimento, modalidade, categoria)` são consumidos na thread
+        chamadora (leitura, validação, idades e hashes ficam fora do escritor)
+        e cada um vai para uma tabela temporária numa escrita curta, sem que o
+        arquivo inteiro precise estar em memória. Chegadas registradas durante
+        a importação são confirmadas entre um bloco e outro.
+
+        Ao final, uma única operação compara o hash de cada linha ao
+        `hash_cadastro` gravado e escreve só os atletas novos ou alterados.
+        Atletas alterados são atualizados no lugar, preservando tempos e
+        chegadas. Com `remover_ausentes`, atletas do evento que não estão no
+        arquivo são removidos, exceto os que já têm chegada registrada
+        (preservados).
+
+        Se `cancelamento` for sinalizado entre dois blocos, a importação falha
+        com ImportacaoCanceladaError e nada é gravado em 'atletas'. Bloqueia
+        até o último bloco ser preparado; o Future resolve com um
+        ResumoSincronizacao.
+        """
+        data_evento = self.obter_data_evento()
+        evento_id = self.evento_id
+        # Uma tabela por importação: duas importações simultâneas não se misturam.
+        tabela = f"temp.importacao_atletas_{next(self._sequencia_importacao)}"
+        # Preenchida dentro da operação; os observadores só a recebem após o commit.
+        alteracoes = AlteracoesDB()
+
+        def criar_tabela(cursor):
+            cursor.execute(f"""
+                CREATE TABLE {tabela} (
+                    num INTEGER PRIMARY KEY, nome TEXT, sexo TEXT, data_nascimento TEXT, modalidade TEXT,
+                    categoria TEXT, data_nascimento_iso TEXT, idade INTEGER, faixa_etaria TEXT, hash_cadastro TEXT)""")
+
+        def descartar_tabela(cursor):
+            cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+
+        def verificar_cancelamento(total: int):
+            if cancelamento is not None and cancelamento.is_set():
+                raise ImportacaoCanceladaError(f"Importação cancelada após {total} atleta(s); nada foi gravado.")
+
+        total = 0
+        self._executar_escrita(criar_tabela, "preparar tabela de importação").result()
+        try:
+            for bloco in blocos:
+                verificar_cancelamento(total)
+                linhas = [(*linha, *derivar_campos_idade(linha[3], data_evento), hash_cadastro(*linha))
+                          for linha in bloco]
+                self._executar_escrita(
+                    lambda cursor, linhas=linhas: cursor.executemany(
+                        f"INSERT OR REPLACE INTO {tabela} VALUES (?,?,?,?,?,?,?,?,?,?)", linhas),
+                    "preparar bloco de importação").result()
+                total += len(bloco)
+            verificar_cancelamento(total)
+        except BaseException:
+            self._executar_escrita(descartar_tabela, "descartar tabela de importação", propagar_erro=False)
+            raise
+
+        def operacao(cursor):
+            cursor.execute(f"""
+                SELECT i.num, i.nome, i.sexo, i.data_nascimento, i.modalidade, i.categoria,
+                       i.data_nascimento_iso, i.idade, i.faixa_etaria, i.hash_cadastro
+                FROM {tabela} i JOIN atletas a ON a.evento_id = ? AND a.num = i.num
+                WHERE a.hash_cadastro IS NOT i.hash_cadastro""", (evento_id,))
+            alterados = cursor.fetchall()
+            cursor.execute(f"""
+                SELECT num FROM {tabela} i
+                WHERE NOT EXISTS (SELECT 1 FROM atletas a WHERE a.evento_id = ? AND a.num = i.num)""", (evento_id,))
+            inseridos = [linha[0] for linha in cursor.fetchall()]
+            removidos, preservados = [], []
+            if remover_ausentes:
+                cursor.execute(f"""
+                    SELECT a.num, a.tempo_absoluto_chegada IS NOT NULL
+                                  OR EXISTS (SELECT 1 FROM chegadas c WHERE c.evento_id = a.evento_id AND c.num = a.num)
+                    FROM atletas a
+                    WHERE a.evento_id = ? AND NOT EXISTS (SELECT 1 FROM {tabela} i WHERE i.num = a.num)""",
+                    (evento_id,))
+                for num, tem_chegada in cursor.fetchall():
+                    (preservados if tem_chegada else removidos).append(num)
+
+            cursor.executemany(
+                "UPDATE atletas SET nome = ?, sexo = ?, data_nascimento = ?, modalidade = ?, categoria = ?, "
+                "data_nascimento_iso = ?, idade = ?, faixa_etaria = ?, hash_cadastro = ? WHERE evento_id = ? AND num = ?",
+                [(*linha[1:], evento_id, linha[0]) for linha in alterados])
+            cursor.execute(f"""
+                INSERT INTO atletas (evento_id, num, nome, sexo, data_nascimento, modalidade, categoria,
+                                     data_nascimento_iso, idade, faixa_etaria, hash_cadastro)
+                SELECT ?, i.* FROM {tabela} i
+                WHERE NOT EXISTS (SELECT 1 FROM atletas a WHERE a.evento_id = ? AND a.num = i.num)""",
+                (evento_id, evento_id))
+            cursor.executemany("DELETE FROM atletas WHERE evento_id = ? AND num = ?",
+                               [(evento_id, num) for num in removidos])
+            cursor.executemany("DELETE FROM tags_rfid WHERE evento_id = ? AND num = ?",
+                               [(evento_id, num) for num in removidos])
+            descartar_tabela(cursor)
+
+            # Novos e removidos não têm tempo; só os alterados podem mudar de grupo.
+            self._atualizar_classificacao(cursor, evento_id, {linha[0] for linha in alterados})
+
+            resumo = ResumoSincronizacao(
+                inseridos=inseridos, alterados=[linha[0] for linha in alterados], removidos=removidos,
+                preservados=preservados, inalterados=total - len(inseridos) - len(alterados))
+            if resumo.total_escritos > self._LIMITE_NOTIFICACAO_SINCRONIZACAO:
+                alteracoes.recarga_total = True
+            else:
+                alteracoes.atletas_inseridos.update(inseridos)
+                alteracoes.atletas_atualizados.update(resumo.alterados)
+                alteracoes.atletas_removidos.update(removidos)
+            alteracoes.tags_rfid = bool(removidos)
+            logger.info(f"Importação diferencial: {resumo.descricao()}.")
+            return resumo
+
+        try:
+            futuro = self._executar_escrita(operacao, "sincronizar atletas importados", alteracoes)
+        except BaseException:
+            self._executar_escrita(descartar_tabela, "descartar tabela de importação", propagar_erro=False)
+            raise
+        # Numa falha a operação é desfeita por inteiro, inclusive o descarte da tabela.
+        futuro.add_done_callback(lambda f: f.exception() is not None and self._executar_escrita(
+            descartar_tabela, "descartar tabela de importação", propagar_erro=False))
+        return futuro
+
+    def atualizar_tempo_atleta(self, num: int, tempo_chegada_iso: str, tempo_liquido_seg: float) -> Future:
+        """Compatibilidade: registra uma chegada manual no journal."""
+        return self.registrar_chegada(num, tempo_chegada_iso, tempo_liquido_seg)
+
+    # --- Journal de chegadas ---
+    _SQL_INSERIR_CHEGADA = (
+        "INSERT INTO chegadas (evento_id, num, tag, tempo_absoluto_chegada, tempo_liquido, origem, antena) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+    _SQL_DERIVAR_RESULTADO = "UPDATE atletas SET tempo_absoluto_chegada =?, tempo_liquido =? WHERE evento_id =? AND num =?"
+
+    def registrar_chegada(self, num: int, tempo_chegada_iso: str, tempo_liquido_seg: float,
+                          origem: str = "MANUAL", tag: str = None, antena: int = None) -> Future:
+        """
+        Acrescenta a leitura ao journal 'chegadas' e deriva o resultado do atleta
+        na mesma transação. Com o escritor ativo, várias chegadas compartilham
+        um único commit.
+        """
+        evento_id = self.evento_id
+        def operacao(cursor):
+            cursor.execute(self._SQL_INSERIR_CHEGADA,
+                           (evento_id, num, tag, tempo_chegada_iso, tempo_liquido_seg, origem, antena))
+            cursor.execute(self._SQL_DERIVAR_RESULTADO, (tempo_chegada_iso, tempo_liquido_seg, evento_id, num))
+            self._reclassificar_atleta(cursor, evento_id, num)
+            logger.info(f"Tempo do atleta #{num} atualizado na base de dados.")
+            return cursor.lastrowid
+
+        return self._executar_escrita(operacao, f"atualizar tempo do atleta #{num}",
+                                      AlteracoesDB(atletas_atualizados={num}))
+
+    def atualizar_tempos_em_lote(self, chegadas: Iterable[tuple], origem: str = "MANUAL") -> Future:
+        """
+        Contraparte de `adicionar_atletas_em_lote` para resultados: aplica N
+        chegadas numa única transação com `executemany` e emite uma única
+        notificação com o conjunto de números alterados.
+
+        Cada item é `(num, tempo_chegada_iso, tempo_liquido_seg[, tag[, antena]])`.
+        """
+        linhas_journal = []
+        linhas_resultado = []
+        for chegada in chegadas:
+            num, tempo_chegada_iso, tempo_liquido_seg, *extra = chegada
+            tag = extra[0] if len(extra) > 0 else None
+            antena = extra[1] if len(extra) > 1 else None
+            linhas_journal.append((self.evento_id, num, tag, tempo_chegada_iso, tempo_liquido_seg, origem, antena))
+            linhas_resultado.append((tempo_chegada_iso, tempo_liquido_seg, self.evento_id, num))
+        alteracoes = AlteracoesDB(atletas_atualizados={linha[3] for linha in linhas_resultado})
+        evento_id = self.evento_id
+
+        def operacao(cursor):
+            cursor.executemany(self._SQL_INSERIR_CHEGADA, linhas_journal)
+            cursor.executemany(self._SQL_DERIVAR_RESULTADO, linhas_resultado)
+            self._atualizar_classificacao(cursor, evento_id, alteracoes.atletas_atualizados)
+            logger.info(f"{len(linhas_resultado)} chegada(s) registrada(s) em lote.")
+            return len(linhas_resultado)
+
+        return self._executar_escrita(operacao, "registrar chegadas em lote", alteracoes)
+
+    def reconstruir_resultados_do_journal(self) -> Future:
+        """
+        Recalcula as colunas de resultado de 'atletas' reaplicando o journal:
+        vale a última chegada registrada de cada atleta. Usado na recuperação
+        após falhas ou após uma reimportação que tenha apagado os tempos.
+        """
+        evento_id = self.evento_id
+        def operacao(cursor):
+            cursor.execute("UPDATE atletas SET tempo_absoluto_chegada = NULL, tempo_liquido = NULL WHERE evento_id = ?",
+                           (evento_id,))
+            cursor.execute("""
+                UPDATE atletas SET (tempo_absoluto_chegada, tempo_liquido) = (
+                    SELECT c.tempo_absoluto_chegada, c.tempo_liquido FROM chegadas c
+                    WHERE c.evento_id = atletas.evento_id AND c.num = atletas.num ORDER BY c.seq DESC LIMIT 1
+                )
+                WHERE evento_id = :evento AND num IN (SELECT num FROM chegadas WHERE evento_id = :evento)
+            """, {"evento": evento_id})
+            reconstruidos = cursor.rowcount
+            self._recalcular_classificacao(cursor, evento_id)
+            logger.info(f"Resultados reconstruídos a partir do journal para {reconstruidos} atleta(s).")
+            return reconstruidos
+
+        return self._executar_escrita(operacao, "reconstruir resultados a partir do journal",
+                                      AlteracoesDB(recarga_total=True))
+
+    # --- Classificação materializada ---
+    # (coluna de posição, colunas que definem o grupo). A ordem dentro de cada
+    # grupo é sempre (tempo_liquido, num), a mesma da tabela e dos pódios.
+    _GRUPOS_CLASSIFICACAO = (
+        ("pos_geral", ()),
+        ("pos_sexo", ("sexo",)),
+        ("pos_categoria", ("categoria", "sexo")),
+        ("pos_faixa", ("categoria", "sexo", "faixa_etaria")),
+    )
+    # Acima deste número de atletas alterados de uma vez, recalcular o evento
+    # inteiro com funções de janela sai mais barato que N inserções pontuais.
+    _LIMITE_RECLASSIFICACAO_PONTUAL = 64
+
+    @staticmethod
+    def _filtro_grupo(colunas: tuple) -> str:
+        # 'IS' porque a faixa etária pode ser NULL (atleta sem data válida).
+        return "".join(f" AND {coluna} IS ?" for coluna in colunas)
+
+    def _remover_da_classificacao(self, cursor, evento_id: int, num: int):
+        cursor.execute("SELECT tempo_liquido, sexo, categoria, faixa_etaria FROM classificacao "
+                       "WHERE evento_id = ? AND num = ?", (evento_id, num))
+        linha = cursor.fetchone()
+        if linha is None:
+            return
+        valores = dict(zip(("tempo_liquido", "sexo", "categoria", "faixa_etaria"), linha))
+        for coluna_pos, grupo in self._GRUPOS_CLASSIFICACAO:
+            cursor.execute(
+                f"UPDATE classificacao SET {coluna_pos} = {coluna_pos} - 1 WHERE evento_id = ?"
+                f"{self._filtro_grupo(grupo)} AND (tempo_liquido, num) > (?, ?)",
+                (evento_id, *(valores[c] for c in grupo), valores["tempo_liquido"], num))
+        cursor.execute("DELETE FROM classificacao WHERE evento_id = ? AND num = ?", (evento_id, num))
+
+    def _inserir_na_classificacao(self, cursor, evento_id: int, num: int):
+        cursor.execute("SELECT tempo_liquido, sexo, categoria, faixa_etaria FROM atletas "
+                       "WHERE evento_id = ? AND num = ?", (evento_id, num))
+        linha = cursor.fetchone()
+        if linha is None or linha[0] is None:
+            return
+        valores = dict(zip(("tempo_liquido", "sexo", "categoria", "faixa_etaria"), linha))
+        posicoes = []
+        for coluna_pos, grupo in self._GRUPOS_CLASSIFICACAO:
+            params = (evento_id, *(valores[c] for c in grupo), valores["tempo_liquido"], num)
+            filtro = self._filtro_grupo(grupo)
+            # A posição é a do atleta imediatamente à frente + 1; quem vem
+            # atrás desce uma posição (nada a deslocar se chegou em ordem).
+            cursor.execute(
+                f"SELECT {coluna_pos} FROM classificacao WHERE evento_id = ?{filtro} "
+                "AND (tempo_liquido, num) < (?, ?) ORDER BY tempo_liquido DESC, num DESC LIMIT 1", params)
+            anterior = cursor.fetchone()
+            posicoes.append((anterior[0] if anterior else 0) + 1)
+            cursor.execute(
+                f"UPDATE classificacao SET {coluna_pos} = {coluna_pos} + 1 WHERE evento_id = ?{filtro} "
+                "AND (tempo_liquido, num) > (?, ?)", params)
+        cursor.execute(
+            "INSERT INTO classificacao (evento_id, num, tempo_liquido, sexo, categoria, faixa_etaria, "
+            "pos_geral, pos_sexo, pos_categoria, pos_faixa) VALUES (?,?,?,?,?,?,?,?,?,?)",
+            (evento_id, num, valores["tempo_liquido"], valores["sexo"], valores["categoria"],
+             valores["faixa_etaria"], *posicoes))
+
+    def _reclassificar_atleta(self, cursor, evento_id: int, num: int):
+        """Atualiza as posições após mudar tempo, sexo, categoria ou faixa de um atleta."""
+        self._remover_da_classificacao(cursor, evento_id, num)
+        self._inserir_na_classificacao(cursor, evento_id, num)
+
+    def _recalcular_classificacao(self, cursor, evento_id: int):
+        """Refaz a classificação inteira do evento (operações em massa)."""
+        cursor.execute("DELETE FROM classificacao WHERE evento_id = ?", (evento_id,))
+        cursor.execute("""
+            INSERT INTO classificacao (evento_id, num, tempo_liquido, sexo, categoria, faixa_etaria,
+                                       pos_geral, pos_sexo, pos_categoria, pos_faixa)
+            SELECT evento_id, num, tempo_liquido, sexo, categoria, faixa_etaria,
+                   ROW_NUMBER() OVER (ORDER BY tempo_liquido, num),
+                   ROW_NUMBER() OVER (PARTITION BY sexo ORDER BY tempo_liquido, num),
+                   ROW_NUMBER() OVER (PARTITION BY categoria, sexo ORDER BY tempo_liquido, num),
+                   ROW_NUMBER() OVER (PARTITION BY categoria, sexo, faixa_etaria ORDER BY tempo_liquido, num)
+            FROM atletas WHERE evento_id = ? AND tempo_liquido IS NOT NULL""", (evento_id,))
+
+    def _atualizar_classificacao(self, cursor, evento_id: int, nums: Set[int]):
+        if len(nums) > self._LIMITE_RECLASSIFICACAO_PONTUAL:
+            self._recalcular_classificacao(cursor, evento_id)
+            return
+        for num in nums:
+            self._reclassificar_atleta(cursor, evento_id, num)
+
+    def obter_posicao(self, num: int) -> sqlite3.Row | None:
+        """Posições do atleta (geral, sexo, categoria e faixa etária), ou None se ainda sem tempo."""
+        sql = ("SELECT num, tempo_liquido, sexo, categoria, faixa_etaria, pos_geral, pos_sexo, pos_categoria, pos_faixa "
+               "FROM classificacao WHERE evento_id = ? AND num = ?")
         try:
             with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                cursor.executemany(sql, atletas_data)
-                conn.commit()
-            logging.info(f"{len(atletas_data)} atletas inseridos/atualizados em lote.")
-            self._notify() # Notifica a UI sobre a mudança
+                cursor.execute(sql, (self.evento_id, num))
+                return cursor.fetchone()
         except sqlite3.Error as e:
-            logging.error(f"Erro ao inserir atletas em lote: {e}")
-            raise
+            logging.error(f"Erro ao obter a posição do atleta #{num}: {e}")
+            return None
+
+    _FAIXA_QUALQUER = object()
 
-    def atualizar_tempo_atleta(self, num: int, tempo_chegada_iso: str, tempo_liquido_seg: float):
-        sql = "UPDATE atletas SET tempo_absoluto_chegada =?, tempo_liquido =? WHERE num =?"
+    def obter_podio(self, sexo: str = None, categoria: str = None, faixa_etaria=_FAIXA_QUALQUER,
+                    limite: int | None = 3) -> List:
+        """
+        Os `limite` primeiros de um grupo, já com a coluna 'posicao'. O grupo
+        é o mais específico informado: geral (nada), sexo, categoria + sexo
+        ou categoria + sexo + faixa etária (None = atletas sem faixa).
+        `limite=None` devolve o grupo inteiro.
+        """
+        if sexo is None:
+            coluna_pos, filtros, params = "pos_geral", "", []
+        elif categoria is None:
+            coluna_pos, filtros, params = "pos_sexo", " AND c.sexo = ?", [sexo.upper()]
+        elif faixa_etaria is self._FAIXA_QUALQUER:
+            coluna_pos, filtros, params = "pos_categoria", " AND c.categoria = ? AND c.sexo = ?", [categoria.upper(), sexo.upper()]
+        else:
+            coluna_pos = "pos_faixa"
+            filtros = " AND c.categoria = ? AND c.sexo = ? AND c.faixa_etaria IS ?"
+            params = [categoria.upper(), sexo.upper(), faixa_etaria]
+        sql = (
+            "SELECT a.num, a.nome, a.sexo, a.data_nascimento, a.idade, a.faixa_etaria, a.categoria, a.modalidade, "
+            f"a.tempo_liquido, c.{coluna_pos} AS posicao FROM classificacao c "
+            "JOIN atletas a ON a.evento_id = c.evento_id AND a.num = c.num "
+            f"WHERE c.evento_id = ?{filtros}"
+        )
+        params.insert(0, self.evento_id)
+        if limite is not None:
+            sql += f" AND c.{coluna_pos} <= ?"
+            params.append(limite)
+        sql += f" ORDER BY c.{coluna_pos}"
         try:
             with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                cursor.execute(sql, (tempo_chegada_iso, tempo_liquido_seg, num))
-                conn.commit()
-            logging.info(f"Tempo do atleta #{num} atualizado na base de dados.")
-            self._notify() # Notifica a UI sobre a mudança
+                cursor.execute(sql, params)
+                return cursor.fetchall()
         except sqlite3.Error as e:
-            logging.error(f"Erro ao atualizar tempo do atleta #{num}: {e}")
-            raise
+            logging.error(f"Erro ao obter pódio ({sexo}/{categoria}/{faixa_etaria}): {e}")
+            return []
+
+    def obter_grupos_classificacao(self) -> List[tuple]:
+        """Combinações (categoria, sexo, faixa_etaria) com pelo menos um atleta classificado."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT DISTINCT categoria, sexo, faixa_etaria FROM classificacao WHERE evento_id = ? "
+                               "ORDER BY categoria, sexo, faixa_etaria", (self.evento_id,))
+                return [tuple(linha) for linha in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao obter os grupos da classificação: {e}")
+            return []
+
+    def obter_chegadas(self, num: int = None) -> List:
+        """Retorna o journal de chegadas (trilha de auditoria), opcionalmente de um atleta."""
+        sql = "SELECT * FROM chegadas WHERE evento_id =?"
+        params = (self.evento_id,)
+        if num is not None:
+            sql += " AND num =?"
+            params += (num,)
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute(sql + " ORDER BY seq", params)
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao obter o journal de chegadas: {e}")
+            return []
+
+    def contar_atletas(self) -> int:
+        """Número de atletas inscritos no evento atual."""
+        try:
+            with self._get_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM atletas WHERE evento_id = ?", (self.evento_id,)).fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao contar atletas: {e}")
+            return 0
 
     def obter_atleta_por_id(self, num: int) -> sqlite3.Row | None:
-        sql = "SELECT * FROM atletas WHERE num =?"
+        sql = "SELECT * FROM atletas WHERE evento_id =? AND num =?"
         try:
             with self._get_connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                cursor.execute(sql, (num,))
+                cursor.execute(sql, (self.evento_id, num))
                 return cursor.fetchone()
         except sqlite3.Error as e:
             logging.error(f"Erro ao obter atleta #{num}: {e}")
             return None
             
-    def obter_todos_atletas_para_tabela(self, coluna_ordem: str, reverso: bool) -> List:
-        mapa_colunas = {
-            'Nº': 'num',
-            'Nome': 'nome',
-            'Sexo': 'sexo',
-            'Idade': 'data_nascimento',
-            'Categoria': 'categoria',
-            'Modalidade': 'modalidade',
-            'Tempo Bruto': 'tempo_liquido' # Alinhado com a UI
-        }
-        coluna_sql = mapa_colunas.get(coluna_ordem, 'num')
+    def obter_atletas_por_numeros(self, nums: Iterable[int]) -> List:
+        """Busca apenas os atletas indicados (usado para aplicar alterações pontuais)."""
+        nums = list(nums)
+        if not nums:
+            return []
+        marcadores = ",".join("?" * len(nums))
+        sql = f"SELECT num, nome, sexo, data_nascimento, idade, faixa_etaria, categoria, modalidade, tempo_liquido FROM atletas WHERE evento_id =? AND num IN ({marcadores})"
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute(sql, [self.evento_id, *nums])
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao obter atletas {nums}: {e}")
+            return []
+
+    def buscar_atletas(self, texto: str, limite: int = 20) -> List:
+        """
+        Atletas cujo nome contém palavras começando por cada termo de `texto`
+        ("jose sil" encontra "José da Silva"), sem diferenciar acentos nem
+        maiúsculas, do mais relevante ao menos relevante. Usa o índice FTS5
+        'atletas_busca'; sem ele, cai para LIKE por substring.
+        """
+        termos = re.findall(r"\w+", texto or "")
+        if not termos:
+            return []
+        colunas = "a.num, a.nome, a.sexo, a.data_nascimento, a.idade, a.faixa_etaria, a.categoria, a.modalidade, a.tempo_liquido"
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                if self._busca_fts is None:
+                    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'atletas_busca'")
+                    self._busca_fts = cursor.fetchone() is not None
+                if self._busca_fts:
+                    consulta = " ".join(f'"{termo}"*' for termo in termos)
+                    cursor.execute(
+                        f"SELECT {colunas} FROM atletas_busca b "
+                        "JOIN atletas a ON a.evento_id = b.evento_id AND a.num = b.num "
+                        "WHERE atletas_busca MATCH ? AND b.evento_id = ? ORDER BY b.rank, a.nome LIMIT ?",
+                        (consulta, self.evento_id, limite))
+                else:
+                    filtros = " AND ".join("a.nome LIKE ?" for _ in termos)
+                    cursor.execute(
+                        f"SELECT {colunas} FROM atletas a WHERE a.evento_id = ? AND {filtros} ORDER BY a.nome, a.num LIMIT ?",
+                        (self.evento_id, *(f"%{termo}%" for termo in termos), limite))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao buscar atletas por '{texto}': {e}")
+            return []
+
+    def versao_atual(self) -> int:
+        """Última versão atribuída a uma linha de 'atletas' (0 = banco vazio)."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT valor FROM versao_atletas WHERE id = 1")
+                linha = cursor.fetchone()
+                return linha[0] if linha else 0
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao obter a versão atual dos atletas: {e}")
+            return 0
+
+    def obter_atletas_alterados_desde(self, versao: int) -> tuple[List, List[int], int]:
+        """
+        Consulta incremental: retorna `(alterados, removidos, nova_versao)`, com
+        os atletas inseridos/alterados e os números removidos depois de `versao`.
+        O leitor guarda `nova_versao` e a usa na próxima chamada; `versao=0`
+        devolve todos os atletas.
+        """
+        sql_alterados = (
+            "SELECT num, nome, sexo, data_nascimento, idade, faixa_etaria, categoria, modalidade, "
+            "tempo_absoluto_chegada, tempo_liquido, versao FROM atletas WHERE evento_id = ? AND versao > ? ORDER BY versao"
+        )
+        sql_removidos = "SELECT num FROM atletas_removidos WHERE evento_id = ? AND versao > ? ORDER BY versao"
+        # A versão é lida antes das linhas: uma escrita concorrente pode fazer
+        # uma linha aparecer de novo na próxima chamada, mas nunca ser perdida.
+        nova_versao = self.versao_atual()
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute(sql_alterados, (self.evento_id, versao))
+                alterados = cursor.fetchall()
+                cursor.execute(sql_removidos, (self.evento_id, versao))
+                removidos = [linha[0] for linha in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao obter atletas alterados desde a versão {versao}: {e}")
+            return [], [], versao
+        return alterados, removidos, max(nova_versao, versao)
+
+    def atualizar_dados_atleta(self, num: int, nome: str, sexo: str, data_nascimento: str,
+                               categoria: str, modalidade: str) -> Future:
+        """Atualiza os dados cadastrais de um atleta, preservando seus tempos."""
+        sql = (
+            "UPDATE atletas SET nome=?, sexo=?, data_nascimento=?, categoria=?, modalidade=?, "
+            "data_nascimento_iso=?, idade=?, faixa_etaria=? WHERE evento_id=? AND num=?"
+        )
+        campos_idade = derivar_campos_idade(data_nascimento, self.obter_data_evento())
+
+        evento_id = self.evento_id
+        def operacao(cursor):
+            cursor.execute(sql, (nome, sexo.upper(), data_nascimento, categoria.upper(), modalidade, *campos_idade,
+                                 evento_id, num))
+            self._reclassificar_atleta(cursor, evento_id, num)
+            logger.info(f"Dados do atleta #{num} atualizados.")
+
+        return self._executar_escrita(operacao, f"atualizar dados do atleta #{num}",
+                                      AlteracoesDB(atletas_atualizados={num}))
+
+    # Aceita tanto o rótulo da coluna na UI quanto o nome da coluna no banco.
+    _COLUNAS_ORDENACAO = {
+        'Nº': 'num',
+        'Nome': 'nome',
+        'Sexo': 'sexo',
+        'Idade': 'idade',
+        'Categoria': 'categoria',
+        'Modalidade': 'modalidade',
+        'Tempo Bruto': 'tempo_liquido', # Alinhado com a UI
+        'Tempo Líquido': 'tempo_liquido',
+    }
+
+    # Colunas de ordenação que podem ser nulas (além de 'tempo_liquido', que
+    # tem ordem própria): a paginação trata o bloco de nulos separadamente.
+    _COLUNAS_ANULAVEIS = frozenset({'idade'})
+
+    @classmethod
+    def _coluna_ordenacao_sql(cls, coluna_ordem: str) -> str:
+        if coluna_ordem in cls._COLUNAS_ORDENACAO.values():
+            return coluna_ordem
+        return cls._COLUNAS_ORDENACAO.get(coluna_ordem, 'num')
+
+    @classmethod
+    def _clausula_ordem(cls, coluna_ordem: str, reverso: bool) -> str:
+        """
+        Monta um ORDER BY que os índices conseguem atender sem ordenação em
+        memória: 'num' desempata e, por tempo, quem não chegou fica no final.
+        """
+        coluna_sql = cls._coluna_ordenacao_sql(coluna_ordem)
         direcao = "DESC" if reverso else "ASC"
-        clausula_ordem = f"CASE WHEN tempo_liquido IS NULL THEN 1 ELSE 0 END, tempo_liquido {direcao}" if coluna_sql == 'tempo_liquido' else f"{coluna_sql} {direcao}"
-        sql = f"SELECT num, nome, sexo, data_nascimento, categoria, modalidade, tempo_liquido FROM atletas ORDER BY {clausula_ordem}"
+        if coluna_sql == 'tempo_liquido':
+            # Cada direção percorre um índice de expressão diferente
+            # (idx_atletas_tempo_asc / idx_atletas_tempo_desc).
+            if reverso:
+                return "tempo_liquido IS NOT NULL DESC, tempo_liquido DESC, num DESC"
+            return "tempo_liquido IS NULL, tempo_liquido, num"
+        if coluna_sql == 'num':
+            return f"num {direcao}"
+        return f"{coluna_sql} {direcao}, num {direcao}"
+
+    def obter_todos_atletas_para_tabela(self, coluna_ordem: str, reverso: bool) -> List:
+        clausula_ordem = self._clausula_ordem(coluna_ordem, reverso)
+        sql = f"SELECT num, nome, sexo, data_nascimento, idade, faixa_etaria, categoria, modalidade, tempo_liquido FROM atletas WHERE evento_id = ? ORDER BY {clausula_ordem}"
         try:
             with self._get_connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                cursor.execute(sql)
+                cursor.execute(sql, (self.evento_id,))
                 return cursor.fetchall()
         except sqlite3.Error as e:
             logging.error(f"Erro ao obter todos os atletas: {e}")
             return [] # CORREÇÃO: Retorna lista vazia para evitar TypeError.
 
-    def reiniciar_prova(self):
-        """Apaga TODOS os dados das tabelas 'atletas' e 'estado_corrida'."""
-        sql_delete_atletas = "DELETE FROM atletas;"
-        sql_delete_estado = "DELETE FROM estado_corrida;"
+    @classmethod
+    def _trechos_pagina(cls, coluna_ordem: str, reverso: bool, apos) -> List[tuple]:
+        """
+        Consultas `(predicado, parametros, ordem)` que, executadas em sequência,
+        retomam a ordenação de `_clausula_ordem` logo depois da linha `apos`
+        fazendo busca direta nos índices (sem varrer as linhas já entregues).
+        """
+        if apos is None:
+            return [(None, (), cls._clausula_ordem(coluna_ordem, reverso))]
+        coluna_sql = cls._coluna_ordenacao_sql(coluna_ordem)
+        op = "<" if reverso else ">"
+        direcao = "DESC" if reverso else "ASC"
+        if coluna_sql == 'num':
+            return [(f"num {op} ?", (apos['num'],), f"num {direcao}")]
+        if coluna_sql in cls._COLUNAS_ANULAVEIS:
+            return cls._trechos_coluna_anulavel(coluna_sql, reverso, apos)
+        if coluna_sql != 'tempo_liquido':
+            return [(f"({coluna_sql}, num) {op} (?, ?)", (apos[coluna_sql], apos['num']),
+                     f"{coluna_sql} {direcao}, num {direcao}")]
+        # Por tempo a ordem tem dois blocos: quem tem tempo e, depois, quem não tem.
+        # O bloco sem tempo repete a expressão do índice e 'tempo_liquido IS NULL'
+        # para que a busca por 'num' continue dentro do mesmo índice.
+        com_tempo, sem_tempo = (("(tempo_liquido IS NOT NULL) = 1", "(tempo_liquido IS NOT NULL) = 0") if reverso
+                                else ("(tempo_liquido IS NULL) = 0", "(tempo_liquido IS NULL) = 1"))
+        sem_tempo += " AND tempo_liquido IS NULL"
+        if apos['tempo_liquido'] is None:
+            return [(f"{sem_tempo} AND num {op} ?", (apos['num'],), f"num {direcao}")]
+        return [
+            (f"{com_tempo} AND (tempo_liquido, num) {op} (?, ?)", (apos['tempo_liquido'], apos['num']),
+             f"tempo_liquido {direcao}, num {direcao}"),
+            (sem_tempo, (), f"num {direcao}"),
+        ]
+
+    @staticmethod
+    def _trechos_coluna_anulavel(coluna_sql: str, reverso: bool, apos) -> List[tuple]:
+        """
+        Retomada por uma coluna que aceita NULL. Comparar `(coluna, num)` com
+        uma linha nula dá NULL e descartaria linhas, então o bloco de nulos
+        (primeiro na ordem crescente do SQLite, último na decrescente) é
+        percorrido à parte, só por 'num'.
+        """
+        valor = apos[coluna_sql]
+        if reverso:
+            if valor is None:
+                return [(f"{coluna_sql} IS NULL AND num < ?", (apos['num'],), "num DESC")]
+            return [
+                (f"({coluna_sql}, num) < (?, ?)", (valor, apos['num']), f"{coluna_sql} DESC, num DESC"),
+                (f"{coluna_sql} IS NULL", (), "num DESC"),
+            ]
+        if valor is None:
+            return [
+                (f"{coluna_sql} IS NULL AND num > ?", (apos['num'],), "num ASC"),
+                (f"{coluna_sql} IS NOT NULL", (), f"{coluna_sql} ASC, num ASC"),
+            ]
+        return [(f"({coluna_sql}, num) > (?, ?)", (valor, apos['num']), f"{coluna_sql} ASC, num ASC")]
+
+    def obter_pagina_atletas(self, coluna_ordem: str, reverso: bool, limite: int = 500, apos=None) -> List:
+        """
+        Uma página da tabela de atletas, na mesma ordem de
+        `obter_todos_atletas_para_tabela`. Para a página seguinte, passe a
+        última linha recebida em `apos` (paginação por keyset: o custo de cada
+        página não cresce com a posição, ao contrário de OFFSET).
+        """
+        sql_base = ("SELECT num, nome, sexo, data_nascimento, idade, faixa_etaria, categoria, modalidade, tempo_liquido "
+                    "FROM atletas WHERE evento_id = ?")
+        pagina: List = []
         try:
             with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                # CORREÇÃO: A tabela de atletas também precisa ser limpa.
-                cursor.execute(sql_delete_atletas)
-                cursor.execute(sql_delete_estado)
-                conn.commit()
-            logger.warning("Prova reiniciada: todos os atletas e estados foram apagados.")
-            self._notify()
+                for predicado, params, ordem in self._trechos_pagina(coluna_ordem, reverso, apos):
+                    sql = sql_base + (f" AND {predicado}" if predicado else "") + f" ORDER BY {ordem} LIMIT ?"
+                    cursor.execute(sql, (self.evento_id, *params, limite - len(pagina)))
+                    pagina.extend(cursor.fetchall())
+                    if len(pagina) >= limite:
+                        break
         except sqlite3.Error as e:
-            logger.error(f"Erro ao reiniciar a prova no banco de dados: {e}")
+            logger.error(f"Erro ao obter página de atletas: {e}")
+            return []
+        return pagina
 
-    def salvar_estado_corrida(self, chave: str, valor: Any):
-        sql = "INSERT OR REPLACE INTO estado_corrida (chave, valor) VALUES (?, ?);"
+    def iterar_paginas_atletas(self, coluna_ordem: str, reverso: bool, tamanho_pagina: int = 500) -> Iterator[List]:
+        """Percorre todos os atletas em páginas, mantendo em memória uma página por vez."""
+        apos = None
+        while True:
+            pagina = self.obter_pagina_atletas(coluna_ordem, reverso, tamanho_pagina, apos)
+            if not pagina:
+                return
+            yield pagina
+            if len(pagina) < tamanho_pagina:
+                return
+            apos = pagina[-1]
+
+    def obter_classificados(self, sexo: str, categoria: str, limite: int = None, faixa_etaria: str = None) -> List:
+        """
+        Atletas com tempo de um sexo e categoria (e opcionalmente de uma faixa
+        etária), do mais rápido ao mais lento. A filtragem e a ordenação saem
+        prontas de idx_atletas_categoria_sexo_tempo / idx_atletas_categoria_sexo_faixa_tempo.
+        """
+        filtro_faixa = " AND faixa_etaria = ?" if faixa_etaria is not None else ""
+        sql = (
+            "SELECT num, nome, sexo, data_nascimento, idade, faixa_etaria, categoria, modalidade, tempo_liquido FROM atletas "
+            f"WHERE evento_id = ? AND categoria = ? AND sexo = ?{filtro_faixa} AND tempo_liquido IS NOT NULL "
+            "ORDER BY tempo_liquido, num"
+        )
+        params = [self.evento_id, categoria.upper(), sexo.upper()]
+        if faixa_etaria is not None:
+            params.append(faixa_etaria)
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(limite)
         try:
             with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
-                cursor.execute(sql, (chave, str(valor) if valor is not None else None))
-                conn.commit()
+                cursor.execute(sql, params)
+                return cursor.fetchall()
         except sqlite3.Error as e:
-            logging.error(f"Erro ao salvar estado '{chave}': {e}")
+            logger.error(f"Erro ao obter classificados ({sexo}/{categoria}): {e}")
+            return []
 
-    def carregar_estado_corrida(self, chave: str, default: Any = None) -> Any:
-        sql = "SELECT valor FROM estado_corrida WHERE chave =?"
-        try:
+    def exportar_resultados_colunar(self, caminho: str, tamanho_lote: int = 10000) -> int:
+        """
+        Exporta atletas, tempos e posições do evento para Parquet ou Arrow
+        (conforme a extensão; requer pyarrow), em lotes colunares tipados de
+        até `tamanho_lote` linhas, sem carregar o evento inteiro em memória.
+        Classificados vêm primeiro, na ordem geral. Retorna o total exportado.
+        """
+        sql = (
+            "SELECT a.num, a.nome, a.sexo, a.data_nascimento_iso, a.idade, a.faixa_etaria, a.categoria, a.modalidade, "
+            "a.tempo_liquido, a.tempo_absoluto_chegada, c.pos_geral, c.pos_sexo, c.pos_categoria, c.pos_faixa "
+            "FROM atletas a LEFT JOIN classificacao c ON c.evento_id = a.evento_id AND c.num = a.num "
+            "WHERE a.evento_id = ? ORDER BY c.pos_geral IS NULL, c.pos_geral, a.num"
+        )
+        total = 0
+        with EscritorColunar(caminho) as escritor:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(sql, (chave,))
-                resultado = cursor.fetchone()
-                if resultado and resultado[0] is not None:
-                    return resultado[0]
-                return default
+                cursor.execute(sql, (self.evento_id,))
+                while True:
+                    linhas = cursor.fetchmany(tamanho_lote)
+                    if not linhas:
+                        break
+                    escritor.escrever(linhas)
+                    total += len(linhas)
+        logger.info(f"{total} atleta(s) exportado(s) para '{caminho}'.")
+        return total
+
+    def reiniciar_prova(self) -> Future:
+        """Apaga os atletas, o estado e as chegadas do evento desta instância (os demais eventos ficam intactos)."""
+        sql_delete_atletas = "DELETE FROM atletas WHERE evento_id = ?;"
+        sql_delete_estado = "DELETE FROM estado_corrida WHERE evento_id = ?;"
+        sql_delete_chegadas = "DELETE FROM chegadas WHERE evento_id = ?;"
+
+        evento_id = self.evento_id
+        def operacao(cursor):
+            # CORREÇÃO: A tabela de atletas também precisa ser limpa.
+            cursor.execute(sql_delete_atletas, (evento_id,))
+            cursor.execute(sql_delete_estado, (evento_id,))
+            # O journal também é descartado; caso contrário uma reconstrução
+            # ressuscitaria os tempos da prova anterior.
+            cursor.execute(sql_delete_chegadas, (evento_id,))
+            cursor.execute("DELETE FROM classificacao WHERE evento_id = ?", (evento_id,))
+            cursor.execute("DELETE FROM tags_rfid WHERE evento_id = ?", (evento_id,))
+            logger.warning("Prova reiniciada: todos os atletas e estados foram apagados.")
+
+        self._invalidar_cache_estado(vazio=True)
+        # A data do evento sai junto com o estado; as próximas importações
+        # continuam usando a que está em memória até uma nova definição.
+        futuro = self._executar_escrita(operacao, "reiniciar a prova no banco de dados",
+                                        AlteracoesDB(recarga_total=True), propagar_erro=False)
+        futuro.add_done_callback(self._recarregar_cache_se_falhou)
+        return futuro
+
+    def salvar_estado_corrida(self, chave: str, valor: Any) -> Future:
+        sql = "INSERT OR REPLACE INTO estado_corrida (evento_id, chave, valor) VALUES (?, ?, ?);"
+        valor_str = str(valor) if valor is not None else None
+        # Write-through: o cache reflete o novo valor antes mesmo do commit,
+        # para que o relógio e as chegadas já usem o valor salvo.
+        with self._lock_cache:
+            if self._cache_estado is not None:
+                self._cache_estado[chave] = valor_str
+            self._cache_datetimes.pop(chave, None)
+
+        evento_id = self.evento_id
+        def operacao(cursor):
+            cursor.execute(sql, (evento_id, chave, valor_str))
+
+        futuro = self._executar_escrita(operacao, f"salvar estado '{chave}'",
+                                        AlteracoesDB(chaves_estado={chave}), propagar_erro=False)
+        futuro.add_done_callback(self._recarregar_cache_se_falhou)
+        return futuro
+
+    def _invalidar_cache_estado(self, vazio: bool = False):
+        with self._lock_cache:
+            self._cache_estado = {} if vazio else None
+            self._cache_datetimes = {}
+
+    def _recarregar_cache_se_falhou(self, futuro: Future):
+        # Se a escrita não chegou ao disco, o cache volta a ser lido do banco.
+        if futuro.exception() is not None:
+            self._invalidar_cache_estado()
+
+    def _obter_cache_estado(self) -> dict:
+        with self._lock_cache:
+            if self._cache_estado is not None:
+                return self._cache_estado
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT chave, valor FROM estado_corrida WHERE evento_id = ?", (self.evento_id,))
+            estado = {chave: valor for chave, valor in cursor.fetchall()}
+        with self._lock_cache:
+            if self._cache_estado is None:
+                self._cache_estado = estado
+            return self._cache_estado
+
+    def carregar_estado_corrida(self, chave: str, default: Any = None) -> Any:
+        try:
+            valor = self._obter_cache_estado().get(chave)
         except sqlite3.Error as e:
             logging.error(f"Erro ao carregar estado '{chave}': {e}")
             return default
+        return valor if valor is not None else default
+
+    def carregar_estado_datetime(self, chave: str) -> datetime | None:
+        """
+        Retorna um estado ISO 8601 já convertido para datetime, sem acessar o
+        disco nem refazer o parsing após a primeira leitura.
+        """
+        with self._lock_cache:
+            if chave in self._cache_datetimes:
+                return self._cache_datetimes[chave]
+        valor = self.carregar_estado_corrida(chave)
+        try:
+            convertido = datetime.fromisoformat(valor) if isinstance(valor, str) and valor else None
+        except ValueError:
+            logger.error(f"Estado '{chave}' não está em formato ISO 8601: {valor!r}")
+            convertido = None
+        with self._lock_cache:
+            self._cache_datetimes[chave] = convertido
+        return convertido
 
     def init_db(self):
         """Compatibilidade: chama setup_database (usado pelo AppCrono)."""
         self.setup_database()
 
-    # CRUD de Categorias
-    def adicionar_categoria(self, nome: str, descricao: str = None):
+    # Eventos
+    def criar_evento(self, nome: str) -> Future:
+        """Cadastra um novo evento no arquivo. O Future resolve com o id gerado."""
+        def operacao(cursor):
+            cursor.execute("INSERT INTO eventos (nome) VALUES (?)", (nome.strip(),))
+            return cursor.lastrowid
+        return self._executar_escrita(operacao, f"criar evento '{nome}'")
+
+    def listar_eventos(self):
         with self._get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("SELECT id, nome, criado_em FROM eventos ORDER BY id ASC")
+            return cursor.fetchall()
+
+    def selecionar_evento(self, evento_id: int):
+        """
+        Passa a ler e escrever no evento `evento_id`. Os observadores recebem
+        uma recarga total, já que nada do que exibiam continua válido.
+        """
+        if evento_id == self.evento_id:
+            return
+        self.evento_id = evento_id
+        self._data_evento = None
+        self._invalidar_cache_estado()
+        self._notify(AlteracoesDB(recarga_total=True))
+
+    # --- Chips RFID ---
+    def associar_tags(self, pares: Iterable[tuple]) -> Future:
+        """
+        Associa chips a atletas; cada item é `(tag, num)`. Um chip já
+        associado passa para o novo atleta; os demais chips do atleta são
+        mantidos, já que ele pode usar mais de um.
+        """
+        evento_id = self.evento_id
+        linhas = [(evento_id, normalizar_tag(tag), num) for tag, num in pares]
+
+        def operacao(cursor):
+            cursor.executemany("INSERT OR REPLACE INTO tags_rfid (evento_id, tag, num) VALUES (?, ?, ?)", linhas)
+            logger.info(f"{len(linhas)} chip(s) RFID associado(s).")
+            return len(linhas)
+
+        return self._executar_escrita(operacao, "associar chips RFID", AlteracoesDB(tags_rfid=True))
+
+    def remover_tags(self, tags: Iterable[str]) -> Future:
+        evento_id = self.evento_id
+        linhas = [(evento_id, normalizar_tag(tag)) for tag in tags]
+
+        def operacao(cursor):
+            cursor.executemany("DELETE FROM tags_rfid WHERE evento_id = ? AND tag = ?", linhas)
+            return cursor.rowcount
+
+        return self._executar_escrita(operacao, "remover chips RFID", AlteracoesDB(tags_rfid=True))
+
+    def obter_tags_rfid(self) -> Dict[str, int]:
+        """Todas as associações do evento, como `{tag: num}`."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT tag, num FROM tags_rfid WHERE evento_id = ?", (self.evento_id,))
+                return {tag: num for tag, num in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao obter os chips RFID: {e}")
+            return {}
+
+    def obter_tags_do_atleta(self, num: int) -> List[str]:
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT tag FROM tags_rfid WHERE evento_id = ? AND num = ? ORDER BY tag",
+                               (self.evento_id, num))
+                return [linha[0] for linha in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao obter os chips do atleta #{num}: {e}")
+            return []
+
+    def obter_situacao_atletas(self, nums: Iterable[int] = None) -> List[tuple]:
+        """
+        `(num, nome, tem_chegada)` dos atletas do evento (ou só de `nums`):
+        o mínimo de que o índice RFID precisa para resolver uma leitura.
+        """
+        sql = "SELECT num, nome, tempo_absoluto_chegada IS NOT NULL FROM atletas WHERE evento_id = ?"
+        parametros = [self.evento_id]
+        if nums is not None:
+            nums = list(nums)
+            if not nums:
+                return []
+            sql += f" AND num IN ({','.join('?' * len(nums))})"
+            parametros += nums
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, parametros)
+                return [tuple(linha) for linha in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao obter a situação dos atletas: {e}")
+            return []
+
+    # CRUD de Categorias
+    def adicionar_categoria(self, nome: str, descricao: str = None) -> Future:
+        def operacao(cursor):
             cursor.execute(
                 "INSERT INTO categorias (nome, descricao) VALUES (?, ?)",
                 (nome.strip().upper(), descricao)
             )
-            conn.commit()
-            self._notify()
+        return self._executar_escrita(operacao, f"adicionar categoria '{nome}'", AlteracoesDB(categorias=True))
 
-    def editar_categoria(self, categoria_id: int, novo_nome: str, nova_descricao: str = None):
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+    def editar_categoria(self, categoria_id: int, novo_nome: str, nova_descricao: str = None) -> Future:
+        def operacao(cursor):
             cursor.execute(
                 "UPDATE categorias SET nome = ?, descricao = ? WHERE id = ?",
                 (novo_nome.strip().upper(), nova_descricao, categoria_id)
             )
-            conn.commit()
-            self._notify()
+        return self._executar_escrita(operacao, f"editar categoria #{categoria_id}", AlteracoesDB(categorias=True))
 
-    def remover_categoria(self, categoria_id: int):
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+    def remover_categoria(self, categoria_id: int) -> Future:
+        def operacao(cursor):
             cursor.execute("DELETE FROM categorias WHERE id = ?", (categoria_id,))
-            conn.commit()
-            self._notify()
+        return self._executar_escrita(operacao, f"remover categoria #{categoria_id}", AlteracoesDB(categorias=True))
 
     def listar_categorias(self):
         with self._get_connection() as conn:
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# db_backup.py
+
+"""
+Cópias de segurança do banco da corrida feitas com a prova em andamento.
+
+Copiar o arquivo enquanto o DatabaseManager escreve pode gerar uma cópia
+corrompida. Aqui a cópia usa a API de backup online do SQLite, em passos de
+poucas páginas com uma pausa entre eles, numa thread própria. Com o banco em
+modo WAL o backup é apenas um leitor: nunca segura o lock de escrita, então
+o commit de uma chegada não espera por ele.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RelatorioBackup:
+    """Resultado de uma cópia: onde foi gravada, quanto tempo levou e o tamanho."""
+    caminho: Path
+    duracao: float
+    bytes: int
+    paginas: int
+    passos: int
+
+
+class ServicoDeBackup:
+    """
+    Gera cópias periódicas do banco e mantém apenas as mais recentes.
+
+    Args:
+        db_path: Caminho do banco de origem.
+        diretorio: Pasta onde as cópias são gravadas.
+        intervalo: Segundos entre duas cópias.
+        retencao: Quantidade de cópias mantidas (as mais antigas são apagadas).
+        paginas_por_passo: Páginas copiadas a cada passo da API de backup.
+        pausa_entre_passos: Segundos de pausa entre passos, liberando o banco.
+        ao_concluir: Chamada (na thread do serviço) com o RelatorioBackup de cada cópia.
+    """
+    def __init__(self, db_path: str, diretorio: str = "backups", intervalo: float = 300.0, retencao: int = 12,
+                 paginas_por_passo: int = 256, pausa_entre_passos: float = 0.005,
+                 ao_concluir: Callable[[RelatorioBackup], None] | None = None):
+        if retencao < 1:
+            raise ValueError("A retenção de backups deve ser de pelo menos uma cópia.")
+        self.db_path = db_path
+        self.diretorio = Path(diretorio)
+        self.intervalo = intervalo
+        self.retencao = retencao
+        self.paginas_por_passo = paginas_por_passo
+        self.pausa_entre_passos = pausa_entre_passos
+        self.ao_concluir = ao_concluir
+        self.ultimo_relatorio: RelatorioBackup | None = None
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock_backup = threading.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self):
+        if self.ativo:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="ServicoDeBackup", daemon=True)
+        self._thread.start()
+        logger.info(f"Backup automático iniciado: a cada {self.intervalo:.0f}s em '{self.diretorio}', mantendo {self.retencao} cópia(s).")
+
+    def parar(self, timeout: float = 10.0):
+        if not self.ativo:
+            return
+        self._parar.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Backup automático finalizado.")
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.executar_backup()
+            except (sqlite3.Error, OSError) as e:
+                # Uma cópia que falhou não pode derrubar o serviço nem a prova.
+                logger.error(f"Falha no backup automático do banco: {e}")
+
+    def executar_backup(self) -> RelatorioBackup:
+        """Faz uma cópia agora (também usado pelo loop periódico)."""
+        with self._lock_backup:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            carimbo = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            destino = self.diretorio / f"{Path(self.db_path).stem}_{carimbo}.db"
+            temporario = destino.with_suffix(".db.tmp")
+            passos = 0
+
+            def progresso(_status, _restantes, _total):
+                nonlocal passos
+                passos += 1
+
+            inicio = time.perf_counter()
+            origem = sqlite3.connect(self.db_path)
+            copia = sqlite3.connect(temporario)
+            try:
+                origem.backup(copia, pages=self.paginas_por_passo, progress=progresso,
+                              sleep=self.pausa_entre_passos)
+                paginas = copia.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                copia.close()
+                origem.close()
+            # Só uma cópia completa recebe o nome final.
+            os.replace(temporario, destino)
+            duracao = time.perf_counter() - inicio
+
+            relatorio = RelatorioBackup(destino, duracao, destino.stat().st_size, paginas, passos)
+            self.ultimo_relatorio = relatorio
+            logger.info(f"Backup gravado em '{destino.name}': {relatorio.bytes / 1024:.1f} KiB em {duracao * 1000:.1f} ms ({passos} passo(s)).")
+            self._aplicar_retencao()
+        if self.ao_concluir:
+            self.ao_concluir(relatorio)
+        return relatorio
+
+    def listar_backups(self) -> List[Path]:
+        """Cópias existentes, da mais antiga para a mais recente."""
+        if not self.diretorio.exists():
+            return []
+        return sorted(self.diretorio.glob(f"{Path(self.db_path).stem}_*.db"))
+
+    def _aplicar_retencao(self):
+        excedentes = self.listar_backups()[:-self.retencao]
+        for caminho in excedentes:
+            try:
+                caminho.unlink()
+                logger.debug(f"Backup antigo removido: '{caminho.name}'.")
+            except OSError as e:
+                logger.warning(f"Não foi possível remover o backup antigo '{caminho.name}': {e}")
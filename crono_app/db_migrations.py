@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+# db_migrations.py
+
+"""
+Migrações de schema do banco de dados da corrida.
+
+A versão do schema fica em `PRAGMA user_version`. Na inicialização,
+`aplicar_migracoes` compara esse inteiro com a última migração conhecida e,
+no caso comum (banco em dia), não faz mais nada. Cada migração pendente roda
+uma única vez, na sua própria transação, junto com a atualização da versão.
+
+Os passos são idempotentes: bancos criados antes deste mecanismo (versão 0,
+mas com parte do schema já presente) passam por todos eles sem erro.
+"""
+
+import logging
+import sqlite3
+import time
+from datetime import date
+from typing import Callable, List, NamedTuple
+
+from .utils import derivar_campos_idade, hash_cadastro
+
+logger = logging.getLogger(__name__)
+
+
+class Migracao(NamedTuple):
+    versao: int
+    descricao: str
+    aplicar: Callable[[sqlite3.Cursor], None]
+
+
+def _colunas(cursor: sqlite3.Cursor, tabela: str) -> set:
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    return {linha[1] for linha in cursor.fetchall()}
+
+
+def _adicionar_coluna(cursor: sqlite3.Cursor, tabela: str, coluna: str, definicao: str) -> bool:
+    """Adiciona a coluna se ela ainda não existir. Retorna True se adicionou."""
+    if coluna in _colunas(cursor, tabela):
+        return False
+    cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+    logger.info(f"Coluna '{coluna}' adicionada à tabela '{tabela}'.")
+    return True
+
+
+def _m001_tabelas_base(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS atletas (
+            num INTEGER PRIMARY KEY, nome TEXT NOT NULL, sexo TEXT NOT NULL CHECK(sexo IN ('M', 'F')),
+            data_nascimento TEXT NOT NULL, modalidade TEXT NOT NULL,
+            tempo_absoluto_chegada TEXT, tempo_liquido REAL, categoria TEXT NOT NULL DEFAULT 'GERAL'
+        );""")
+    cursor.execute("CREATE TABLE IF NOT EXISTS estado_corrida (chave TEXT PRIMARY KEY, valor TEXT);")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categorias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL UNIQUE,
+            descricao TEXT
+        );""")
+    # Bancos anteriores à coluna 'categoria'.
+    _adicionar_coluna(cursor, "atletas", "categoria", "TEXT NOT NULL DEFAULT 'GERAL'")
+
+
+def _m002_journal_chegadas(cursor: sqlite3.Cursor):
+    # Journal append-only das chegadas: as colunas de resultado de 'atletas'
+    # são derivadas dele e podem ser reconstruídas a qualquer momento.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chegadas (
+            seq INTEGER PRIMARY KEY,
+            num INTEGER NOT NULL,
+            tag TEXT,
+            tempo_absoluto_chegada TEXT NOT NULL,
+            tempo_liquido REAL,
+            origem TEXT NOT NULL DEFAULT 'MANUAL',
+            antena INTEGER,
+            registrado_em TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+        );""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chegadas_num ON chegadas (num, seq);")
+
+
+def _m003_colunas_idade(cursor: sqlite3.Cursor):
+    # Data de nascimento ordenável e idade/faixa etária pré-calculadas.
+    _adicionar_coluna(cursor, "atletas", "data_nascimento_iso", "TEXT")
+    _adicionar_coluna(cursor, "atletas", "idade", "INTEGER")
+    _adicionar_coluna(cursor, "atletas", "faixa_etaria", "TEXT")
+
+    cursor.execute("SELECT num, data_nascimento FROM atletas WHERE data_nascimento_iso IS NULL")
+    pendentes = cursor.fetchall()
+    if not pendentes:
+        return
+    cursor.execute("SELECT valor FROM estado_corrida WHERE chave = 'data_evento'")
+    linha = cursor.fetchone()
+    try:
+        data_evento = date.fromisoformat(linha[0]) if linha and linha[0] else None
+    except ValueError:
+        data_evento = None
+    cursor.executemany(
+        "UPDATE atletas SET data_nascimento_iso = ?, idade = ?, faixa_etaria = ? WHERE num = ?",
+        [(*derivar_campos_idade(data_nasc, data_evento), num) for num, data_nasc in pendentes])
+    logger.info(f"Idade pré-calculada para {len(pendentes)} atleta(s) existente(s).")
+
+
+def _m004_versionamento_atletas(cursor: sqlite3.Cursor):
+    """
+    Coluna 'versao' de 'atletas', contador global e tombstones de remoção. Os
+    triggers carimbam cada linha inserida/alterada com um novo valor do
+    contador, então quem guardar a última versão lida só precisa buscar o
+    que mudou depois dela (`obter_atletas_alterados_desde`).
+    """
+    if _adicionar_coluna(cursor, "atletas", "versao", "INTEGER NOT NULL DEFAULT 0"):
+        # As linhas existentes entram como versão 1, para que um leitor
+        # começando do zero as receba.
+        cursor.execute("UPDATE atletas SET versao = 1")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_versao ON atletas (versao);")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS versao_atletas (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            valor INTEGER NOT NULL
+        );""")
+    cursor.execute("INSERT OR IGNORE INTO versao_atletas (id, valor) SELECT 1, COALESCE(MAX(versao), 0) FROM atletas;")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS atletas_removidos (
+            num INTEGER PRIMARY KEY,
+            versao INTEGER NOT NULL
+        );""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_removidos_versao ON atletas_removidos (versao);")
+
+    proxima_versao = "UPDATE versao_atletas SET valor = valor + 1 WHERE id = 1;"
+    versao_corrente = "(SELECT valor FROM versao_atletas WHERE id = 1)"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_atletas_versao_insert AFTER INSERT ON atletas
+        BEGIN
+            {proxima_versao}
+            UPDATE atletas SET versao = {versao_corrente} WHERE num = NEW.num;
+            DELETE FROM atletas_removidos WHERE num = NEW.num;
+        END;""")
+    # 'UPDATE OF' exclui a própria coluna 'versao', evitando que o carimbo
+    # dispare o trigger de novo. Recriado para acompanhar a lista de colunas.
+    cursor.execute("DROP TRIGGER IF EXISTS trg_atletas_versao_update;")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_atletas_versao_update
+        AFTER UPDATE OF nome, sexo, data_nascimento, modalidade, tempo_absoluto_chegada, tempo_liquido, categoria,
+                        idade, faixa_etaria
+        ON atletas
+        BEGIN
+            {proxima_versao}
+            UPDATE atletas SET versao = {versao_corrente} WHERE num = NEW.num;
+        END;""")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_atletas_versao_delete AFTER DELETE ON atletas
+        BEGIN
+            {proxima_versao}
+            INSERT OR REPLACE INTO atletas_removidos (num, versao) VALUES (OLD.num, {versao_corrente});
+        END;""")
+
+
+def _m005_indices_consultas(cursor: sqlite3.Cursor):
+    # Índices das consultas da tabela e dos resultados. Todos terminam
+    # implicitamente em 'num' (rowid), que serve de critério de desempate.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_categoria_sexo_tempo ON atletas (categoria, sexo, tempo_liquido);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_nome ON atletas (nome);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_modalidade ON atletas (modalidade);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_idade ON atletas (idade);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_categoria_sexo_faixa_tempo ON atletas (categoria, sexo, faixa_etaria, tempo_liquido);")
+    # Ordenação por tempo com os atletas sem tempo sempre no final, nas duas direções.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_tempo_asc ON atletas (tempo_liquido IS NULL, tempo_liquido);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_tempo_desc ON atletas (tempo_liquido IS NOT NULL, tempo_liquido);")
+
+
+def _m006_particionamento_por_evento(cursor: sqlite3.Cursor):
+    """
+    Acrescenta a dimensão 'evento_id' a atletas, estado_corrida, chegadas e
+    tombstones, permitindo várias provas (simultâneas ou arquivadas) no mesmo
+    arquivo. Os dados existentes passam a pertencer ao evento 1.
+
+    'atletas' e 'estado_corrida' são reconstruídas, já que a chave primária
+    muda; triggers e índices são recriados com 'evento_id' à frente, para que
+    as consultas de um evento nunca varram os demais.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            criado_em TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime'))
+        );""")
+    cursor.execute("INSERT OR IGNORE INTO eventos (id, nome) VALUES (1, 'Evento padrão');")
+
+    if "evento_id" not in _colunas(cursor, "atletas"):
+        cursor.execute("""
+            CREATE TABLE atletas_por_evento (
+                evento_id INTEGER NOT NULL DEFAULT 1,
+                num INTEGER NOT NULL, nome TEXT NOT NULL, sexo TEXT NOT NULL CHECK(sexo IN ('M', 'F')),
+                data_nascimento TEXT NOT NULL, modalidade TEXT NOT NULL,
+                tempo_absoluto_chegada TEXT, tempo_liquido REAL, categoria TEXT NOT NULL DEFAULT 'GERAL',
+                data_nascimento_iso TEXT, idade INTEGER, faixa_etaria TEXT,
+                versao INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (evento_id, num)
+            );""")
+        cursor.execute("""
+            INSERT INTO atletas_por_evento (evento_id, num, nome, sexo, data_nascimento, modalidade,
+                tempo_absoluto_chegada, tempo_liquido, categoria, data_nascimento_iso, idade, faixa_etaria, versao)
+            SELECT 1, num, nome, sexo, data_nascimento, modalidade,
+                tempo_absoluto_chegada, tempo_liquido, categoria, data_nascimento_iso, idade, faixa_etaria, versao
+            FROM atletas;""")
+        # Remove junto os índices e triggers antigos, que são recriados abaixo.
+        cursor.execute("DROP TABLE atletas;")
+        cursor.execute("ALTER TABLE atletas_por_evento RENAME TO atletas;")
+
+    if "evento_id" not in _colunas(cursor, "estado_corrida"):
+        cursor.execute("""
+            CREATE TABLE estado_por_evento (
+                evento_id INTEGER NOT NULL DEFAULT 1,
+                chave TEXT NOT NULL,
+                valor TEXT,
+                PRIMARY KEY (evento_id, chave)
+            );""")
+        cursor.execute("INSERT INTO estado_por_evento (evento_id, chave, valor) SELECT 1, chave, valor FROM estado_corrida;")
+        cursor.execute("DROP TABLE estado_corrida;")
+        cursor.execute("ALTER TABLE estado_por_evento RENAME TO estado_corrida;")
+
+    if "evento_id" not in _colunas(cursor, "atletas_removidos"):
+        cursor.execute("DROP TABLE atletas_removidos;")
+        cursor.execute("""
+            CREATE TABLE atletas_removidos (
+                evento_id INTEGER NOT NULL,
+                num INTEGER NOT NULL,
+                versao INTEGER NOT NULL,
+                PRIMARY KEY (evento_id, num)
+            );""")
+
+    _adicionar_coluna(cursor, "chegadas", "evento_id", "INTEGER NOT NULL DEFAULT 1")
+    cursor.execute("DROP INDEX IF EXISTS idx_chegadas_num;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chegadas_evento_num ON chegadas (evento_id, num, seq);")
+
+    cursor.execute("DROP INDEX IF EXISTS idx_atletas_removidos_versao;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_removidos_evento_versao ON atletas_removidos (evento_id, versao);")
+
+    # Triggers de versionamento, agora localizando a linha pelo rowid.
+    for nome in ("trg_atletas_versao_insert", "trg_atletas_versao_update", "trg_atletas_versao_delete"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome};")
+    proxima_versao = "UPDATE versao_atletas SET valor = valor + 1 WHERE id = 1;"
+    versao_corrente = "(SELECT valor FROM versao_atletas WHERE id = 1)"
+    cursor.execute(f"""
+        CREATE TRIGGER trg_atletas_versao_insert AFTER INSERT ON atletas
+        BEGIN
+            {proxima_versao}
+            UPDATE atletas SET versao = {versao_corrente} WHERE rowid = NEW.rowid;
+            DELETE FROM atletas_removidos WHERE evento_id = NEW.evento_id AND num = NEW.num;
+        END;""")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_atletas_versao_update
+        AFTER UPDATE OF nome, sexo, data_nascimento, modalidade, tempo_absoluto_chegada, tempo_liquido, categoria,
+                        idade, faixa_etaria
+        ON atletas
+        BEGIN
+            {proxima_versao}
+            UPDATE atletas SET versao = {versao_corrente} WHERE rowid = NEW.rowid;
+        END;""")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_atletas_versao_delete AFTER DELETE ON atletas
+        BEGIN
+            {proxima_versao}
+            INSERT OR REPLACE INTO atletas_removidos (evento_id, num, versao)
+            VALUES (OLD.evento_id, OLD.num, {versao_corrente});
+        END;""")
+
+    # Índices compostos: 'evento_id' primeiro e 'num' explícito no fim como
+    # desempate ('num' deixou de ser o rowid).
+    for nome in ("idx_atletas_versao", "idx_atletas_categoria_sexo_tempo", "idx_atletas_nome", "idx_atletas_modalidade",
+                 "idx_atletas_idade", "idx_atletas_categoria_sexo_faixa_tempo", "idx_atletas_tempo_asc",
+                 "idx_atletas_tempo_desc"):
+        cursor.execute(f"DROP INDEX IF EXISTS {nome};")
+    cursor.execute("CREATE INDEX idx_atletas_versao ON atletas (evento_id, versao);")
+    cursor.execute("CREATE INDEX idx_atletas_categoria_sexo_tempo ON atletas (evento_id, categoria, sexo, tempo_liquido, num);")
+    cursor.execute("CREATE INDEX idx_atletas_nome ON atletas (evento_id, nome, num);")
+    cursor.execute("CREATE INDEX idx_atletas_modalidade ON atletas (evento_id, modalidade, num);")
+    cursor.execute("CREATE INDEX idx_atletas_idade ON atletas (evento_id, idade, num);")
+    cursor.execute("CREATE INDEX idx_atletas_categoria_sexo_faixa_tempo ON atletas (evento_id, categoria, sexo, faixa_etaria, tempo_liquido, num);")
+    cursor.execute("CREATE INDEX idx_atletas_tempo_asc ON atletas (evento_id, tempo_liquido IS NULL, tempo_liquido, num);")
+    cursor.execute("CREATE INDEX idx_atletas_tempo_desc ON atletas (evento_id, tempo_liquido IS NOT NULL, tempo_liquido, num);")
+
+
+def _m007_busca_por_nome(cursor: sqlite3.Cursor):
+    """
+    Índice FTS5 sobre 'nome' para a busca por nome parcial. É uma tabela FTS
+    comum (com cópia do nome) cujo rowid acompanha o rowid de 'atletas';
+    'evento_id' e 'num' vão junto, sem indexação, para o join de volta.
+
+    O BEFORE INSERT remove a entrada de um atleta que vai ser substituído
+    por INSERT OR REPLACE: a exclusão implícita do REPLACE não dispara o
+    trigger de DELETE (sem recursive_triggers).
+
+    Sem FTS5 no SQLite disponível, nada é criado e buscar_atletas usa LIKE.
+    """
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS atletas_busca USING fts5(
+                nome, evento_id UNINDEXED, num UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            );""")
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 indisponível ({e}); a busca por nome usará LIKE.")
+        return
+    cursor.execute("DELETE FROM atletas_busca;")
+    cursor.execute("INSERT INTO atletas_busca (rowid, nome, evento_id, num) SELECT rowid, nome, evento_id, num FROM atletas;")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_atletas_busca_substituir BEFORE INSERT ON atletas
+        BEGIN
+            DELETE FROM atletas_busca WHERE rowid =
+                (SELECT rowid FROM atletas WHERE evento_id = NEW.evento_id AND num = NEW.num);
+        END;""")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_atletas_busca_insert AFTER INSERT ON atletas
+        BEGIN
+            INSERT INTO atletas_busca (rowid, nome, evento_id, num) VALUES (NEW.rowid, NEW.nome, NEW.evento_id, NEW.num);
+        END;""")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_atletas_busca_update AFTER UPDATE OF nome ON atletas
+        BEGIN
+            UPDATE atletas_busca SET nome = NEW.nome WHERE rowid = NEW.rowid;
+        END;""")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_atletas_busca_delete AFTER DELETE ON atletas
+        BEGIN
+            DELETE FROM atletas_busca WHERE rowid = OLD.rowid;
+        END;""")
+
+
+def _m008_classificacao(cursor: sqlite3.Cursor):
+    """
+    Tabela 'classificacao': uma linha por atleta com tempo, com as posições
+    geral, por sexo, por categoria (categoria + sexo) e por faixa etária
+    (categoria + sexo + faixa). O DatabaseManager a mantém a cada chegada;
+    os índices por posição atendem pódios (`WHERE pos_... <= 3`) e os por
+    tempo localizam o vizinho e o trecho a deslocar numa chegada fora de ordem.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS classificacao (
+            evento_id INTEGER NOT NULL,
+            num INTEGER NOT NULL,
+            tempo_liquido REAL NOT NULL,
+            sexo TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            faixa_etaria TEXT,
+            pos_geral INTEGER NOT NULL,
+            pos_sexo INTEGER NOT NULL,
+            pos_categoria INTEGER NOT NULL,
+            pos_faixa INTEGER NOT NULL,
+            PRIMARY KEY (evento_id, num)
+        ) WITHOUT ROWID;""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_geral ON classificacao (evento_id, pos_geral);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_sexo ON classificacao (evento_id, sexo, pos_sexo);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_categoria ON classificacao (evento_id, categoria, sexo, pos_categoria);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_faixa ON classificacao (evento_id, categoria, sexo, faixa_etaria, pos_faixa);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_tempo ON classificacao (evento_id, tempo_liquido, num);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_sexo_tempo ON classificacao (evento_id, sexo, tempo_liquido, num);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_categoria_tempo ON classificacao (evento_id, categoria, sexo, tempo_liquido, num);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_classificacao_faixa_tempo ON classificacao (evento_id, categoria, sexo, faixa_etaria, tempo_liquido, num);")
+    cursor.execute("DELETE FROM classificacao;")
+    cursor.execute("""
+        INSERT INTO classificacao (evento_id, num, tempo_liquido, sexo, categoria, faixa_etaria,
+                                   pos_geral, pos_sexo, pos_categoria, pos_faixa)
+        SELECT evento_id, num, tempo_liquido, sexo, categoria, faixa_etaria,
+               ROW_NUMBER() OVER (PARTITION BY evento_id ORDER BY tempo_liquido, num),
+               ROW_NUMBER() OVER (PARTITION BY evento_id, sexo ORDER BY tempo_liquido, num),
+               ROW_NUMBER() OVER (PARTITION BY evento_id, categoria, sexo ORDER BY tempo_liquido, num),
+               ROW_NUMBER() OVER (PARTITION BY evento_id, categoria, sexo, faixa_etaria ORDER BY tempo_liquido, num)
+        FROM atletas WHERE tempo_liquido IS NOT NULL;""")
+
+
+def _m009_hash_cadastro(cursor: sqlite3.Cursor):
+    """
+    Hash dos dados cadastrais da última importação de cada atleta, usado pela
+    reimportação diferencial. Edições manuais não o alteram, de modo que
+    reimportar uma linha que não mudou no arquivo não desfaz a correção.
+    """
+    _adicionar_coluna(cursor, "atletas", "hash_cadastro", "TEXT")
+    cursor.execute("SELECT rowid, num, nome, sexo, data_nascimento, modalidade, categoria "
+                   "FROM atletas WHERE hash_cadastro IS NULL")
+    pendentes = cursor.fetchall()
+    if pendentes:
+        cursor.executemany("UPDATE atletas SET hash_cadastro = ? WHERE rowid = ?",
+                           [(hash_cadastro(*linha[1:]), linha[0]) for linha in pendentes])
+        logger.info(f"Hash de cadastro calculado para {len(pendentes)} atleta(s) existente(s).")
+
+
+def _m010_tags_rfid(cursor: sqlite3.Cursor):
+    """
+    Tabela 'tags_rfid': associa o EPC de cada chip ao número do atleta. Um
+    atleta pode ter vários chips (tênis e peito, chip reserva); cada chip
+    pertence a um único atleta por evento.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tags_rfid (
+            evento_id INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            num INTEGER NOT NULL,
+            PRIMARY KEY (evento_id, tag)
+        ) WITHOUT ROWID;""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tags_rfid_num ON tags_rfid (evento_id, num);")
+
+
+def _m011_indices_sexo_categoria(cursor: sqlite3.Cursor):
+    """
+    Índices para ordenar a tabela por sexo ou por categoria. Os índices de
+    categoria existentes têm 'sexo' e o tempo no meio e não atendem
+    `ORDER BY categoria, num`, que caía numa ordenação em memória.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_sexo ON atletas (evento_id, sexo, num);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_atletas_categoria ON atletas (evento_id, categoria, num);")
+
+
+# Ordem de aplicação. Novas migrações entram sempre no final, com a versão
+# seguinte; uma migração já publicada nunca deve ser alterada.
+MIGRACOES: List[Migracao] = [
+    Migracao(1, "tabelas base (atletas, estado_corrida, categorias)", _m001_tabelas_base),
+    Migracao(2, "journal de chegadas", _m002_journal_chegadas),
+    Migracao(3, "idade e faixa etária pré-calculadas", _m003_colunas_idade),
+    Migracao(4, "versionamento de linhas de atletas", _m004_versionamento_atletas),
+    Migracao(5, "índices da tabela e dos resultados", _m005_indices_consultas),
+    Migracao(6, "particionamento por evento", _m006_particionamento_por_evento),
+    Migracao(7, "busca por nome (FTS5)", _m007_busca_por_nome),
+    Migracao(8, "classificação materializada", _m008_classificacao),
+    Migracao(9, "hash cadastral para reimportação diferencial", _m009_hash_cadastro),
+    Migracao(10, "associação de chips RFID aos atletas", _m010_tags_rfid),
+    Migracao(11, "índices de ordenação por sexo e categoria", _m011_indices_sexo_categoria),
+]
+
+VERSAO_SCHEMA = MIGRACOES[-1].versao
+
+
+def versao_schema(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes(conn: sqlite3.Connection, migracoes: List[Migracao] = None) -> int:
+    """
+    Aplica, em ordem, as migrações com versão acima de `PRAGMA user_version`.
+    Retorna a versão final do schema.
+    """
+    migracoes = MIGRACOES if migracoes is None else migracoes
+    versao_atual = versao_schema(conn)
+    pendentes = [m for m in migracoes if m.versao > versao_atual]
+    if not pendentes:
+        logger.debug(f"Schema do banco já está na versão {versao_atual}.")
+        return versao_atual
+
+    logger.info(f"Atualizando schema do banco da versão {versao_atual} para {pendentes[-1].versao}...")
+    if conn.in_transaction:
+        conn.commit()
+    for migracao in pendentes:
+        inicio = time.perf_counter()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            migracao.aplicar(cursor)
+            # user_version faz parte do cabeçalho do banco e é gravado na
+            # mesma transação: ou a migração inteira entra, ou nada entra.
+            cursor.execute(f"PRAGMA user_version = {int(migracao.versao)}")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Falha na migração {migracao.versao} ({migracao.descricao}): {e}")
+            raise
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        logger.info(f"Migração {migracao.versao} ({migracao.descricao}) aplicada em {duracao_ms:.1f} ms.")
+    return pendentes[-1].versao
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# db_tracing.py
+
+"""
+Instrumentação opcional das consultas SQL do DatabaseManager.
+
+Quando ativada, as conexões entregues pelo DatabaseManager passam a ser
+embrulhadas por `ConexaoInstrumentada`, cujos cursores medem cada comando
+(execute + leitura das linhas) e acumulam, por comando, o número de
+execuções, as latências (p50/p95/p99) e as linhas retornadas ou afetadas.
+Comandos acima de `limite_lento` vão para o log de consultas lentas.
+
+Desativada, nada disto é carregado no caminho das consultas: o
+DatabaseManager apenas testa se há uma instrumentação configurada.
+"""
+
+import atexit
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+logger_lento = logging.getLogger(f"{__name__}.lento")
+
+# Listas de marcadores de tamanho variável (IN (?, ?, ...)) viram um único
+# comando nas estatísticas.
+_RE_MARCADORES = re.compile(r"\?(\s*,\s*\?)+")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql: str) -> str:
+    return _RE_MARCADORES.sub("?, ...", _RE_ESPACOS.sub(" ", sql).strip())
+
+
+def _percentil(amostras_ordenadas: List[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo."""
+    if not amostras_ordenadas:
+        return 0.0
+    posto = math.ceil(p / 100 * len(amostras_ordenadas))
+    return amostras_ordenadas[max(posto, 1) - 1]
+
+
+@dataclass
+class EstatisticaConsulta:
+    """Resumo de um comando SQL. Tempos em segundos."""
+    sql: str
+    execucoes: int
+    linhas: int
+    tempo_total: float
+    p50: float
+    p95: float
+    p99: float
+
+
+class _Acumulador:
+    __slots__ = ("execucoes", "linhas", "tempo_total", "amostras")
+
+    def __init__(self, max_amostras: int):
+        self.execucoes = 0
+        self.linhas = 0
+        self.tempo_total = 0.0
+        self.amostras = deque(maxlen=max_amostras)
+
+
+class InstrumentacaoSQL:
+    """
+    Coleta as estatísticas por comando e escreve o log de consultas lentas.
+
+    Args:
+        limite_lento: Duração (s) a partir da qual um comando é registrado como lento.
+        arquivo_lento: Se informado, o log de consultas lentas também é gravado neste arquivo.
+        max_amostras: Latências guardadas por comando para os percentis (as mais recentes).
+    """
+    def __init__(self, limite_lento: float = 0.05, arquivo_lento: str | None = None, max_amostras: int = 10000):
+        self.limite_lento = limite_lento
+        self.max_amostras = max_amostras
+        self._lock = threading.Lock()
+        self._acumuladores: Dict[str, _Acumulador] = {}
+        self._handler_arquivo: logging.Handler | None = None
+        if arquivo_lento:
+            self._handler_arquivo = logging.FileHandler(arquivo_lento, encoding="utf-8")
+            self._handler_arquivo.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+            logger_lento.addHandler(self._handler_arquivo)
+
+    def envolver(self, conexao) -> "ConexaoInstrumentada":
+        return ConexaoInstrumentada(conexao, self)
+
+    def registrar(self, sql: str, duracao: float, linhas: int, parametros: Any = None):
+        chave = normalizar_sql(sql)
+        with self._lock:
+            acumulador = self._acumuladores.get(chave)
+            if acumulador is None:
+                acumulador = self._acumuladores[chave] = _Acumulador(self.max_amostras)
+            acumulador.execucoes += 1
+            acumulador.linhas += linhas
+            acumulador.tempo_total += duracao
+            acumulador.amostras.append(duracao)
+        if duracao >= self.limite_lento:
+            logger_lento.warning(f"{duracao * 1000:.1f} ms | {linhas} linha(s) | {chave} | parâmetros={parametros!r}")
+
+    def resumo(self) -> List[EstatisticaConsulta]:
+        """Estatísticas por comando, do maior para o menor tempo total."""
+        with self._lock:
+            itens = [(sql, a.execucoes, a.linhas, a.tempo_total, sorted(a.amostras))
+                     for sql, a in self._acumuladores.items()]
+        estatisticas = [
+            EstatisticaConsulta(sql, execucoes, linhas, total,
+                                _percentil(amostras, 50), _percentil(amostras, 95), _percentil(amostras, 99))
+            for sql, execucoes, linhas, total, amostras in itens
+        ]
+        return sorted(estatisticas, key=lambda e: e.tempo_total, reverse=True)
+
+    def limpar(self):
+        with self._lock:
+            self._acumuladores.clear()
+
+    def registrar_resumo(self, limite: int = 20):
+        """Escreve no log os `limite` comandos que mais consumiram tempo."""
+        estatisticas = self.resumo()
+        if not estatisticas:
+            logger.info("Instrumentação SQL: nenhum comando registrado.")
+            return
+        linhas = [f"Instrumentação SQL: {len(estatisticas)} comando(s) distinto(s), "
+                  f"{sum(e.execucoes for e in estatisticas)} execução(ões)."]
+        for e in estatisticas[:limite]:
+            linhas.append(
+                f"  {e.execucoes:>7}x  total {e.tempo_total * 1000:9.1f} ms  p50 {e.p50 * 1000:7.2f}  "
+                f"p95 {e.p95 * 1000:7.2f}  p99 {e.p99 * 1000:7.2f} ms  {e.linhas:>8} linha(s)  {e.sql[:120]}")
+        logger.info("\n".join(linhas))
+
+    def registrar_resumo_na_saida(self):
+        atexit.register(self.registrar_resumo)
+
+    def encerrar(self):
+        atexit.unregister(self.registrar_resumo)
+        if self._handler_arquivo is not None:
+            logger_lento.removeHandler(self._handler_arquivo)
+            self._handler_arquivo.close()
+            self._handler_arquivo = None
+
+
+class CursorInstrumentado:
+    """
+    Cursor que mede cada comando. A medição de um SELECT inclui a leitura das
+    linhas e termina quando o resultado é esgotado, quando o cursor executa
+    outro comando ou quando a transação da conexão termina.
+    """
+    def __init__(self, cursor, instrumentacao: InstrumentacaoSQL):
+        self._cursor = cursor
+        self._instrumentacao = instrumentacao
+        self._pendente: list | None = None  # [sql, parâmetros, duração, linhas]
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _finalizar(self):
+        if self._pendente is not None:
+            sql, parametros, duracao, linhas = self._pendente
+            self._pendente = None
+            self._instrumentacao.registrar(sql, duracao, linhas, parametros)
+
+    def _medir_comando(self, metodo, sql: str, parametros, parametros_log):
+        self._finalizar()
+        inicio = time.perf_counter()
+        metodo(sql, parametros)
+        duracao = time.perf_counter() - inicio
+        # rowcount é -1 para SELECT; as linhas lidas são somadas nos fetch*.
+        self._pendente = [sql, parametros_log, duracao, max(self._cursor.rowcount, 0)]
+        return self
+
+    def execute(self, sql: str, parametros=()):
+        return self._medir_comando(self._cursor.execute, sql, parametros, parametros)
+
+    def executemany(self, sql: str, parametros):
+        # Os lotes podem ter milhares de linhas; o log lento não os reproduz.
+        return self._medir_comando(self._cursor.executemany, sql, parametros, "<lote>")
+
+    def _medir_leitura(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        if self._pendente is not None:
+            self._pendente[2] += time.perf_counter() - inicio
+        return resultado
+
+    def fetchone(self):
+        linha = self._medir_leitura(self._cursor.fetchone)
+        if self._pendente is not None:
+            if linha is None:
+                self._finalizar()
+            else:
+                self._pendente[3] += 1
+        return linha
+
+    def fetchmany(self, size: int | None = None):
+        linhas = self._medir_leitura(self._cursor.fetchmany, size if size is not None else self._cursor.arraysize)
+        if self._pendente is not None:
+            self._pendente[3] += len(linhas)
+            if not linhas:
+                self._finalizar()
+        return linhas
+
+    def fetchall(self):
+        linhas = self._medir_leitura(self._cursor.fetchall)
+        if self._pendente is not None:
+            self._pendente[3] += len(linhas)
+            self._finalizar()
+        return linhas
+
+    def close(self):
+        self._finalizar()
+        self._cursor.close()
+
+
+class ConexaoInstrumentada:
+    """Embrulha uma sqlite3.Connection entregando cursores instrumentados."""
+    def __init__(self, conexao, instrumentacao: InstrumentacaoSQL):
+        self._conexao = conexao
+        self._instrumentacao = instrumentacao
+        self._cursores: List[CursorInstrumentado] = []
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+    @property
+    def row_factory(self):
+        return self._conexao.row_factory
+
+    @row_factory.setter
+    def row_factory(self, valor):
+        self._conexao.row_factory = valor
+
+    def cursor(self) -> CursorInstrumentado:
+        cursor = CursorInstrumentado(self._conexao.cursor(), self._instrumentacao)
+        self._cursores.append(cursor)
+        return cursor
+
+    def execute(self, sql: str, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql: str, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+    def _finalizar_cursores(self):
+        cursores, self._cursores = self._cursores, []
+        for cursor in cursores:
+            cursor._finalizar()
+
+    def commit(self):
+        self._finalizar_cursores()
+        self._conexao.commit()
+
+    def rollback(self):
+        self._finalizar_cursores()
+        self._conexao.rollback()
+
+    def __enter__(self):
+        self._conexao.__enter__()
+        return self
+
+    def __exit__(self, *excecao):
+        self._finalizar_cursores()
+        return self._conexao.__exit__(*excecao)
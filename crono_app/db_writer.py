@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# db_writer.py
+
+"""
+Thread escritora dedicada do banco de dados.
+
+Todas as mutações do DatabaseManager podem ser enfileiradas aqui: uma única
+thread drena a fila, executa as operações pendentes numa mesma transação
+(group commit) e resolve um `Future` para cada chamador. Assim a thread da
+UI nunca espera por um fsync.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+_PARAR = object()
+
+
+class OperacaoEscrita:
+    """Uma mutação enfileirada: a função a executar e o Future do chamador."""
+    __slots__ = ("funcao", "descricao", "alteracoes", "futuro")
+
+    def __init__(self, funcao: Callable[[sqlite3.Cursor], Any], descricao: str, alteracoes: Any = None):
+        self.funcao = funcao
+        self.descricao = descricao
+        # Descrição do que a operação altera, repassada aos observadores após
+        # o commit (None = operação que não gera notificação).
+        self.alteracoes = alteracoes
+        self.futuro: Future = Future()
+
+
+class EscritorDeBanco:
+    """
+    Executa as operações de escrita numa thread própria, em grupos.
+
+    Args:
+        obter_conexao: Função que devolve a conexão da thread atual.
+        ao_confirmar_grupo: Chamada após cada commit com as operações confirmadas.
+        tamanho_max_grupo: Número máximo de operações por transação.
+    """
+    def __init__(self, obter_conexao: Callable[[], sqlite3.Connection],
+                 ao_confirmar_grupo: Callable[[List[OperacaoEscrita]], None] | None = None,
+                 tamanho_max_grupo: int = 256):
+        self._obter_conexao = obter_conexao
+        self._ao_confirmar_grupo = ao_confirmar_grupo
+        self.tamanho_max_grupo = tamanho_max_grupo
+        self._fila: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self):
+        if self.ativo:
+            return
+        self._thread = threading.Thread(target=self._loop, name="EscritorDeBanco", daemon=True)
+        self._thread.start()
+        logger.info("Thread escritora do banco de dados iniciada.")
+
+    def parar(self, timeout: float = 5.0):
+        """Drena as operações pendentes e encerra a thread."""
+        if not self.ativo:
+            return
+        self._fila.put(_PARAR)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Ainda drenando: continua ativa para que as conexões não sejam fechadas por baixo dela.
+            logger.warning(f"Thread escritora do banco de dados não terminou em {timeout:.1f}s; ainda há escritas pendentes.")
+            return
+        self._thread = None
+        logger.info("Thread escritora do banco de dados finalizada.")
+
+    def submeter(self, funcao: Callable[[sqlite3.Cursor], Any], descricao: str, alteracoes: Any = None) -> Future:
+        operacao = OperacaoEscrita(funcao, descricao, alteracoes)
+        self._fila.put(operacao)
+        return operacao.futuro
+
+    def _loop(self):
+        parar = False
+        while not parar:
+            item = self._fila.get()
+            if item is _PARAR:
+                break
+            grupo = [item]
+            # Agrupa tudo o que já estiver na fila, sem esperar por novas operações.
+            while len(grupo) < self.tamanho_max_grupo:
+                try:
+                    item = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _PARAR:
+                    parar = True
+                    break
+                grupo.append(item)
+            self._executar_grupo(grupo)
+
+    def _executar_grupo(self, grupo: List[OperacaoEscrita]):
+        resultados = []
+        conn = None
+        try:
+            conn = self._obter_conexao()
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            for operacao in grupo:
+                # Cada operação roda num SAVEPOINT para que uma falha isolada
+                # não desfaça as demais operações do grupo.
+                cursor.execute("SAVEPOINT operacao")
+                try:
+                    resultados.append((operacao, operacao.funcao(cursor), None))
+                    cursor.execute("RELEASE operacao")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO operacao")
+                    cursor.execute("RELEASE operacao")
+                    logger.error(f"Erro ao {operacao.descricao}: {e}")
+                    resultados.append((operacao, None, e))
+            conn.commit()
+        except Exception as e:
+            # Qualquer falha fora das operações (conexão, BEGIN, commit) derruba
+            # o grupo inteiro, mas nunca a thread: todos os Futures são resolvidos.
+            logger.error(f"Falha no commit de um grupo de {len(grupo)} escrita(s): {e}")
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            for operacao in grupo:
+                operacao.futuro.set_exception(e)
+            return
+
+        logger.debug(f"Grupo de {len(grupo)} escrita(s) confirmado.")
+        confirmadas = []
+        for operacao, resultado, erro in resultados:
+            if erro is not None:
+                operacao.futuro.set_exception(erro)
+            else:
+                operacao.futuro.set_result(resultado)
+                confirmadas.append(operacao)
+        if confirmadas and self._ao_confirmar_grupo:
+            try:
+                self._ao_confirmar_grupo(confirmadas)
+            except Exception:
+                logger.exception("Erro ao notificar a confirmação de um grupo de escritas.")
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# parallel_csv.py
+
+"""
+Validação de arquivos CSV grandes em vários processos.
+
+O arquivo é dividido em faixas de bytes alinhadas ao início de uma linha;
+cada faixa é lida e validada num processo do ProcessPoolExecutor por uma
+função de validação de linha (que precisa ser importável, para poder ser
+enviada ao processo). Cada processo devolve, por registro, o resultado da
+validação e a contagem de registros da faixa, o que permite ao processo
+principal reconstruir os números de linha globais e detectar números
+duplicados entre faixas diferentes.
+
+Campos entre aspas com quebra de linha não podem ser divididos desta forma:
+a faixa que termina no meio de um campo falha com csv.Error e o chamador
+deve recorrer à leitura sequencial. Como a primeira faixa sempre começa
+alinhada, consumir os resultados na ordem do arquivo garante que esse erro
+aparece antes de qualquer faixa lida fora de alinhamento.
+"""
+
+import csv
+import io
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Tuple
+
+# (num, tupla para inserção ou None, mensagem de erro ou None)
+ResultadoLinha = Tuple[int | None, tuple | None, str | None]
+
+
+@dataclass
+class FaixaCSV:
+    """Trecho [inicio, fim) do arquivo, em bytes, contendo só linhas inteiras."""
+    indice: int
+    inicio: int
+    fim: int
+
+    @property
+    def tamanho(self) -> int:
+        return self.fim - self.inicio
+
+
+def ler_cabecalho(caminho: str) -> Tuple[List[str], int]:
+    """Retorna os campos do cabeçalho e o byte onde começam os dados."""
+    with open(caminho, 'rb') as f:
+        primeira = f.readline()
+        inicio_dados = f.tell()
+    campos = next(csv.reader([primeira.decode('utf-8-sig')]), [])
+    return campos, inicio_dados
+
+
+def dividir_em_faixas(caminho: str, inicio_dados: int, quantidade: int) -> List[FaixaCSV]:
+    """
+    Divide os dados em até `quantidade` faixas de tamanho parecido. Cada
+    fronteira é empurrada para depois da próxima quebra de linha, de modo que
+    nenhuma linha fique partida entre duas faixas.
+    """
+    tamanho_total = os.path.getsize(caminho)
+    if tamanho_total <= inicio_dados:
+        return []
+    passo = max(1, (tamanho_total - inicio_dados) // max(quantidade, 1))
+    fronteiras = [inicio_dados]
+    with open(caminho, 'rb') as f:
+        alvo = inicio_dados + passo
+        while alvo < tamanho_total:
+            f.seek(alvo - 1)
+            f.readline()  # termina a linha que contém o alvo
+            posicao = f.tell()
+            if posicao >= tamanho_total:
+                break
+            if posicao > fronteiras[-1]:
+                fronteiras.append(posicao)
+            alvo = max(posicao, alvo) + passo
+    fronteiras.append(tamanho_total)
+    return [FaixaCSV(i, inicio, fim) for i, (inicio, fim) in enumerate(zip(fronteiras, fronteiras[1:]))]
+
+
+def validar_faixa(caminho: str, faixa: FaixaCSV, campos: List[str],
+                  validar_linha: Callable[[dict, Any], ResultadoLinha], contexto: Any) -> List[ResultadoLinha]:
+    """Executado no processo de trabalho: valida todos os registros da faixa, em ordem."""
+    with open(caminho, 'rb') as f:
+        f.seek(faixa.inicio)
+        texto = f.read(faixa.tamanho).decode('utf-8')
+    # strict faz um campo entre aspas interrompido no fim da faixa virar csv.Error.
+    leitor = csv.DictReader(io.StringIO(texto, newline=''), fieldnames=campos, strict=True)
+    return [validar_linha(linha, contexto) for linha in leitor]
+
+
+def validar_em_ordem(executor: Executor, caminho: str, faixas: List[FaixaCSV], campos: List[str],
+                     validar_linha: Callable[[dict, Any], ResultadoLinha], contexto: Any,
+                     em_andamento: int) -> Iterator[Tuple[FaixaCSV, List[ResultadoLinha]]]:
+    """
+    Valida as faixas no `executor` e as entrega na ordem do arquivo. No
+    máximo `em_andamento` faixas ficam submetidas ou aguardando consumo, o
+    que limita a memória do processo principal.
+    """
+    pendentes = deque()
+    proximas = iter(faixas)
+
+    def submeter(faixa: FaixaCSV):
+        pendentes.append((faixa, executor.submit(validar_faixa, caminho, faixa, campos, validar_linha, contexto)))
+
+    for faixa in itertools.islice(proximas, max(em_andamento, 1)):
+        submeter(faixa)
+    while pendentes:
+        faixa, futuro = pendentes.popleft()
+        linhas = futuro.result()
+        proxima = next(proximas, None)
+        if proxima is not None:
+            submeter(proxima)
+        yield faixa, linhas
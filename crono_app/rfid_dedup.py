@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# rfid_dedup.py
+
+"""
+Deduplicação das leituras RFID por janela de tempo.
+
+Um chip parado no campo das antenas é lido dezenas de vezes por segundo, em
+várias antenas. O DeduplicadorLeituras agrupa as leituras de cada tag numa
+passagem: a passagem continua aberta enquanto chegarem leituras a menos de
+`janela` segundos da anterior e se encerra depois de `janela` segundos sem
+leituras. De cada passagem sai uma única leitura, escolhida pela política:
+
+- "primeira": a primeira leitura, entregue imediatamente (menor latência);
+- "ultima": a última leitura, entregue quando a passagem se encerra;
+- "pico_rssi": a leitura de sinal mais forte, entregue quando a passagem se
+  encerra (o chip estava mais perto da antena).
+
+As passagens abertas ficam num OrderedDict ordenado pela última leitura, de
+modo que registrar uma leitura e encerrar as passagens vencidas custam O(1)
+amortizado e a memória se limita às tags lidas dentro da janela.
+
+A janela é medida no relógio local de recepção (`agora`), não no instante
+informado pelo leitor, para não depender do acerto do relógio da ponte.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, NamedTuple
+
+POLITICAS = ("primeira", "ultima", "pico_rssi")
+
+
+class LeituraRFID(NamedTuple):
+    tag: str
+    antena: int
+    rssi: float | None
+    # Instante da leitura (epoch, em segundos): o informado pela ponte ou, sem
+    # ele, o de recepção.
+    instante: float
+
+
+def interpretar_leitura(linha: str, recebida: float | None = None) -> LeituraRFID | None:
+    """
+    Interpreta uma linha da ponte no formato `TAG,ANTENA[,RSSI[,INSTANTE]]`,
+    com o instante em segundos desde a época ou em ISO 8601. Retorna None se
+    a linha não estiver nesse formato.
+    """
+    partes = [p.strip() for p in linha.strip().split(',')]
+    if not 2 <= len(partes) <= 4 or not partes[0]:
+        return None
+    try:
+        antena = int(partes[1])
+        rssi = float(partes[2]) if len(partes) > 2 and partes[2] else None
+        instante = _interpretar_instante(partes[3]) if len(partes) > 3 and partes[3] else None
+    except ValueError:
+        return None
+    if instante is None:
+        instante = time.time() if recebida is None else recebida
+    return LeituraRFID(partes[0], antena, rssi, instante)
+
+
+def _interpretar_instante(texto: str) -> float:
+    try:
+        return float(texto)
+    except ValueError:
+        return datetime.fromisoformat(texto).timestamp()
+
+
+class _Passagem:
+    __slots__ = ("escolhida", "ultima_vista", "entregue")
+
+    def __init__(self, leitura: LeituraRFID, agora: float):
+        self.escolhida = leitura
+        self.ultima_vista = agora
+        self.entregue = False
+
+
+class DeduplicadorLeituras:
+    def __init__(self, janela: float = 2.0, politica: str = "primeira"):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de deduplicação desconhecida: {politica!r} (use {', '.join(POLITICAS)}).")
+        if janela <= 0:
+            raise ValueError("A janela de deduplicação deve ser positiva.")
+        self.janela = janela
+        self.politica = politica
+        self._passagens: "OrderedDict[str, _Passagem]" = OrderedDict()
+        self.descartadas = 0
+
+    def __len__(self) -> int:
+        """Número de passagens abertas."""
+        return len(self._passagens)
+
+    def registrar(self, leitura: LeituraRFID, agora: float | None = None) -> List[LeituraRFID]:
+        """
+        Acrescenta uma leitura recebida em `agora` (relógio monotônico) e
+        retorna as leituras a entregar: as das passagens que se encerraram e,
+        na política "primeira", a própria leitura se ela abriu uma passagem.
+        """
+        agora = time.monotonic() if agora is None else agora
+        entregues = self.expirar(agora)
+        passagem = self._passagens.get(leitura.tag)
+        if passagem is None:
+            passagem = self._passagens[leitura.tag] = _Passagem(leitura, agora)
+            if self.politica == "primeira":
+                passagem.entregue = True
+                entregues.append(leitura)
+            return entregues
+
+        self.descartadas += 1
+        passagem.ultima_vista = agora
+        self._passagens.move_to_end(leitura.tag)
+        if self.politica == "ultima":
+            passagem.escolhida = leitura
+        elif self.politica == "pico_rssi" and _rssi(leitura) > _rssi(passagem.escolhida):
+            passagem.escolhida = leitura
+        return entregues
+
+    def expirar(self, agora: float | None = None) -> List[LeituraRFID]:
+        """Encerra as passagens sem leituras há `janela` segundos e retorna as leituras a entregar."""
+        agora = time.monotonic() if agora is None else agora
+        entregues = []
+        while self._passagens:
+            tag, passagem = next(iter(self._passagens.items()))
+            if agora - passagem.ultima_vista < self.janela:
+                break
+            del self._passagens[tag]
+            if not passagem.entregue:
+                entregues.append(passagem.escolhida)
+        return entregues
+
+    def esvaziar(self) -> List[LeituraRFID]:
+        """Encerra todas as passagens abertas (ex.: ao desconectar da ponte)."""
+        entregues = [p.escolhida for p in self._passagens.values() if not p.entregue]
+        self._passagens.clear()
+        return entregues
+
+
+def _rssi(leitura: LeituraRFID) -> float:
+    return float("-inf") if leitura.rssi is None else leitura.rssi
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# rfid_index.py
+
+"""
+Índice em memória para resolver leituras de chips RFID sem consultar o banco.
+
+O índice guarda três tabelas hash: chip -> número do atleta, número -> nome e
+o conjunto dos números que já têm chegada. É carregado de uma vez (na
+largada ou na primeira leitura) e se mantém atualizado como observador do
+DatabaseManager:
+
+- uma mudança na associação de chips ou uma recarga total descarta o índice,
+  que é recarregado na próxima leitura;
+- atletas inseridos ou alterados ficam pendentes e só são relidos, um a um,
+  quando um chip deles é lido para registrar uma chegada;
+- atletas removidos saem do índice na própria notificação.
+
+Com isso uma leitura repetida do mesmo chip (o caso comum no tapete de
+chegada) nunca vai ao banco, e a primeira leitura só vai quando o cadastro
+do atleta mudou desde a carga.
+"""
+
+import threading
+from typing import Dict, Set
+
+
+class IndiceRFID:
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self._lock = threading.Lock()
+        self._tags: Dict[str, int] | None = None
+        self._nomes: Dict[int, str] = {}
+        self._chegados: Set[int] = set()
+        self._pendentes: Set[int] = set()
+        # Incrementada a cada descarte: uma carga que cruzou com um descarte
+        # serve à leitura em curso, mas não fica no índice.
+        self._geracao = 0
+        db_manager.attach(self)
+
+    @property
+    def carregado(self) -> bool:
+        return self._tags is not None
+
+    def carregar(self) -> Dict[str, int]:
+        """Lê do banco todas as associações do evento e a situação dos atletas; retorna o mapa chip -> número."""
+        geracao = self._geracao
+        tags = self.db.obter_tags_rfid()
+        situacao = self.db.obter_situacao_atletas()
+        with self._lock:
+            if geracao == self._geracao:
+                self._tags = tags
+            self._nomes = {num: nome for num, nome, _ in situacao}
+            self._chegados = {num for num, _, chegou in situacao if chegou}
+            self._pendentes = set()
+        return tags
+
+    def update(self, subject, alteracoes):
+        with self._lock:
+            if alteracoes.recarga_total or alteracoes.tags_rfid:
+                self._tags = None
+                self._geracao += 1
+                return
+            for num in alteracoes.atletas_removidos:
+                self._nomes.pop(num, None)
+                self._chegados.discard(num)
+            self._pendentes |= alteracoes.atletas_inseridos | alteracoes.atletas_atualizados
+
+    def num_por_tag(self, tag: str) -> int | None:
+        """Número do atleta dono do chip `tag` (já normalizado), ou None."""
+        # update() pode descartar o índice em outra thread a qualquer momento:
+        # a leitura usa sempre a mesma referência.
+        tags = self._tags
+        if tags is None:
+            tags = self.carregar()
+        return tags.get(tag)
+
+    def ja_chegou(self, num: int) -> bool:
+        return num in self._chegados
+
+    def nome(self, num: int) -> str | None:
+        """Nome do atleta, ou None se ele não está inscrito no evento."""
+        if num in self._pendentes:
+            self._atualizar_atleta(num)
+        return self._nomes.get(num)
+
+    def _atualizar_atleta(self, num: int):
+        situacao = self.db.obter_situacao_atletas([num])
+        with self._lock:
+            self._pendentes.discard(num)
+            self._nomes.pop(num, None)
+            for _, nome, chegou in situacao:
+                self._nomes[num] = nome
+                if chegou:
+                    self._chegados.add(num)
+
+    def marcar_chegada(self, num: int) -> bool:
+        """Marca a chegada de `num`; retorna False se ela já estava marcada."""
+        with self._lock:
+            if num in self._chegados:
+                return False
+            self._chegados.add(num)
+            return True
+
+    def desmarcar_chegada(self, num: int):
+        """Desfaz `marcar_chegada` quando a gravação da chegada falha."""
+        with self._lock:
+            self._chegados.discard(num)
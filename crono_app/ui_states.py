@@ -51,7 +51,8 @@ class PreparacaoState(State):
 
     def handle_ui_update(self, app):
         # CORREÇÃO 2: Verificar se existe QUALQUER atleta, não apenas o de nº 1
-        has_atletas = len(app.db.obter_todos_atletas_para_tabela('Nº', False)) > 0
+        # Uma página de uma linha basta; não é preciso materializar a tabela inteira.
+        has_atletas = len(app.db.obter_pagina_atletas('Nº', False, limite=1)) > 0
         app.btn_importar.configure(state="normal")
         app.btn_confirmar_largada.configure(state="normal" if has_atletas else "disabled")
         app.btn_reiniciar.configure(state="normal" if has_atletas else "disabled")
@@ -88,6 +89,8 @@ class EmCursoState(State):
             horario_largada = datetime.fromisoformat(horario_largada_str)
             app.entry_horario_largada.delete(0, "end")
             app.entry_horario_largada.insert(0, horario_largada.strftime('%H:%M:%S.%f')[:-3])
+        # Chips carregados na largada: as leituras do tapete não vão ao banco.
+        app.gerenciador.preparar_indice_rfid()
 
     def handle_ui_update(self, app):
         app.btn_importar.configure(state="disabled")
@@ -103,25 +106,34 @@ class EmCursoState(State):
             if app.db.obter_atleta_por_id(num_atleta) is None:
                 raise AtletaNaoEncontradoError(f"Atleta com número {num_atleta} não encontrado.")
             
-            horario_largada_str = app.db.carregar_estado_corrida('horario_largada')
-            if not horario_largada_str:
+            horario_largada = app.db.carregar_estado_datetime('horario_largada')
+            if not horario_largada:
                 raise ErroLogicaCorrida("Horário de largada não definido.")
             
-            horario_largada = datetime.fromisoformat(horario_largada_str)
             timestamp_chegada = datetime.now()
             if timestamp_chegada < horario_largada:
                 raise ErroLogicaCorrida("Hora de chegada não pode ser anterior à de largada.")
             
             tempo_liquido = timestamp_chegada - horario_largada
-            app.db.atualizar_tempo_atleta(num_atleta, timestamp_chegada.isoformat(), tempo_liquido.total_seconds())
+            futuro = app.db.atualizar_tempo_atleta(num_atleta, timestamp_chegada.isoformat(), tempo_liquido.total_seconds())
+            # A gravação termina na thread escritora; uma falha volta ao operador pelo loop do Tk.
+            futuro.add_done_callback(lambda f: f.exception() is not None and app.agendar_na_ui(
+                self._avisar_falha_gravacao, app, num_atleta, f.exception()))
         except (ValueError, TypeError):
             messagebox.showerror("Entrada Inválida", "Digite um número de atleta válido.")
         except (AtletaNaoEncontradoError, ErroLogicaCorrida) as e:
             messagebox.showwarning("Erro de Lógica", str(e))
+        except Exception as e:
+            self._avisar_falha_gravacao(app, num_atleta, e)
         finally:
             app.chegada_num_var.set("")
             app.entry_chegada.focus()
 
+    @staticmethod
+    def _avisar_falha_gravacao(app, num_atleta: int, erro: Exception):
+        app.logger.error(f"Falha ao gravar a chegada do atleta #{num_atleta}: {erro}")
+        messagebox.showerror("Erro ao Registrar", f"A chegada do atleta #{num_atleta} não foi gravada: {erro}")
+
     def handle_finalizar_corrida(self, app):
         if messagebox.askyesno("Confirmar Finalização", "Deseja finalizar a corrida? A cronometragem será bloqueada."):
             app.db.salvar_estado_corrida('estado_prova', 'FINALIZADO')
@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 # utils.py
 
-
-from datetime import timedelta
+import hashlib
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 
 def formatar_timedelta(td: timedelta | None) -> str:
     """Formata um objeto timedelta para a string HH:MM:SS.ms com precisão."""
@@ -18,4 +19,74 @@ def formatar_timedelta(td: timedelta | None) -> str:
     seconds = int(seconds_total)
     milliseconds = int((seconds_total - seconds) * 1000)
 
-    return f"{sign}{int(hours):02d}:{int(minutes):02d}:{seconds:02d}.{milliseconds:03d}"
\ No newline at end of file
+    return f"{sign}{int(hours):02d}:{int(minutes):02d}:{seconds:02d}.{milliseconds:03d}"
+
+# Numa lista de inscritos as datas de nascimento se repetem muito; o cache
+# evita refazer o strptime (o passo mais caro da importação) a cada linha.
+@lru_cache(maxsize=65536)
+def converter_data_br(texto: str) -> date:
+    """Converte `dd/mm/aaaa` para `date`; levanta ValueError se inválida."""
+    return datetime.strptime(texto, '%d/%m/%Y').date()
+
+
+def converter_data_nascimento(texto: str | None) -> date | None:
+    """
+    Converte uma data de nascimento em `dd/mm/aaaa` (formato do CSV) ou ISO
+    `aaaa-mm-dd` para `date`. Retorna None se o texto não for uma data válida.
+    """
+    if not texto:
+        return None
+    texto = str(texto).strip()
+    try:
+        return converter_data_br(texto)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def calcular_idade(nascimento: date, data_evento: date) -> int:
+    """Idade completa, em anos, na data do evento."""
+    return data_evento.year - nascimento.year - ((data_evento.month, data_evento.day) < (nascimento.month, nascimento.day))
+
+
+def faixa_etaria_para_idade(idade: int) -> str:
+    """Rótulo da faixa etária de 5 em 5 anos usada nos pódios ("Até 19", "20-24", ..., "70+")."""
+    if idade <= 19:
+        return "Até 19"
+    if idade >= 70:
+        return "70+"
+    faixa_min = (idade // 5) * 5
+    return f"{faixa_min}-{faixa_min + 4}"
+
+
+def derivar_campos_idade(data_nascimento: str | None, data_evento: date | None) -> tuple:
+    """
+    Colunas derivadas da data de nascimento de um atleta:
+    `(data_nascimento_iso, idade, faixa_etaria)`. Datas inválidas, ou sem data
+    do evento definida, deixam os campos correspondentes nulos.
+    """
+    nascimento = converter_data_nascimento(data_nascimento)
+    if nascimento is None:
+        return None, None, None
+    if data_evento is None or nascimento > data_evento:
+        return nascimento.isoformat(), None, None
+    idade = calcular_idade(nascimento, data_evento)
+    return nascimento.isoformat(), idade, faixa_etaria_para_idade(idade)
+
+
+def hash_cadastro(num, nome, sexo, data_nascimento, modalidade, categoria) -> str:
+    """
+    Impressão digital dos dados cadastrais de um atleta, como vieram da
+    importação. Permite à reimportação reconhecer linhas que não mudaram.
+    """
+    campos = (num, nome, sexo, data_nascimento, modalidade, categoria)
+    texto = "\x1f".join("" if c is None else str(c) for c in campos)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def normalizar_tag(tag) -> str:
+    """EPC de um chip na forma canônica: sem espaços nas pontas, em maiúsculas."""
+    return str(tag).strip().upper()
@@ -1,11 +1,16 @@
 import customtkinter as ctk
 import tkinter as tk
-import socket
-import threading
+import queue
 import time
 from .rfid_reader import RFIDReader, MockRFIDReader
+from .server import BridgeServer
 
 class RFIDBridgeApp(ctk.CTk):
+    # Fila de envio de cada cliente. Com "spill", um computador de apuração
+    # que trava recebe depois, em ordem, as passagens gravadas em disco.
+    CLIENT_QUEUE_SIZE = 1000
+    CLIENT_OVERFLOW_POLICY = "spill"
+
     def __init__(self):
         super().__init__()
 
@@ -16,13 +21,14 @@ class RFIDBridgeApp(ctk.CTk):
         self.grid_rowconfigure(4, weight=1) # Adjusted row for log
 
         # --- Server and Reader State ---
+        # O BridgeServer (asyncio, numa thread própria) aceita os clientes,
+        # lê o leitor e distribui uma passagem por chip.
         self.server = None
-        self.server_thread = None
-        self.reader_thread = None
         self.is_running = False
-        self.clients = []
-        # Use MockRFIDReader for development without hardware
-        # self.rfid_reader = MockRFIDReader()
+        # Avisos do servidor chegam da thread do asyncio; o Tk os escreve no log
+        # pelo mesmo ciclo de `after` que atualiza as estatísticas.
+        self.log_queue = queue.Queue()
+        # Use 'mock' como porta serial para desenvolver sem hardware.
         self.rfid_reader = None # To be initialized
 
         # --- Connection Frame ---
@@ -59,6 +65,9 @@ class RFIDBridgeApp(ctk.CTk):
         self.status_label = ctk.CTkLabel(self.status_frame, text="Status: Desconectado", text_color="red")
         self.status_label.grid(row=0, column=0, padx=5, pady=5)
 
+        self.clients_label = ctk.CTkLabel(self.status_frame, text="Clientes: 0")
+        self.clients_label.grid(row=1, column=0, padx=5, pady=(0, 5))
+
         # --- Antennas Frame ---
         self.antennas_frame = ctk.CTkFrame(self)
         self.antennas_frame.grid(row=3, column=0, padx=10, pady=10, sticky="nsew")
@@ -116,26 +125,21 @@ class RFIDBridgeApp(ctk.CTk):
         try:
             # Use MockRFIDReader if serial_port is 'mock' for testing purposes
             if serial_port.lower() == 'mock':
-                self.rfid_reader = MockRFIDReader()
+                self.rfid_reader = MockRFIDReader(serial_port)
                 self.log("Leitor RFID iniciado (Mock).")
             else:
-                self.rfid_reader = RFIDReader(serial_port)
+                self.rfid_reader = RFIDReader(queue.Queue(), port=serial_port)
                 self.log(f"Iniciando o leitor RFID na porta {serial_port}...")
-            
+
             self.rfid_reader.start()
 
-            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server.bind((ip, port))
-            self.server.listen(5)
+            self.server = BridgeServer(self.rfid_reader, ip, port, on_log=self.log_queue.put,
+                                       max_queue=self.CLIENT_QUEUE_SIZE, overflow=self.CLIENT_OVERFLOW_POLICY)
+            self.server.start()
             self.log(f"Servidor escutando em {ip}:{port}")
 
             self.is_running = True
-
-            self.server_thread = threading.Thread(target=self.listen_for_clients, daemon=True)
-            self.server_thread.start()
-
-            self.reader_thread = threading.Thread(target=self.listen_for_reads, daemon=True)
-            self.reader_thread.start()
+            self.after(500, self.refresh_stats)
 
             self.toggle_button.configure(text="Parar Servidor")
             self.status_label.configure(text="Status: Rodando", text_color="green")
@@ -145,6 +149,7 @@ class RFIDBridgeApp(ctk.CTk):
 
         except Exception as e:
             self.log(f"Erro ao iniciar: {e}")
+            self.server = None
             if self.rfid_reader:
                 self.rfid_reader.stop()
 
@@ -153,20 +158,17 @@ class RFIDBridgeApp(ctk.CTk):
         self.log("Parando o servidor...")
         self.is_running = False
 
+        # Passagens ainda abertas são enviadas antes de desconectar os clientes.
+        if self.server:
+            self.server.stop()
+            # A thread do servidor já terminou: o que ela avisou até aqui vai para o log.
+            self.drain_log_queue()
+            self.log("Servidor encerrado e clientes desconectados.")
+
         if self.rfid_reader:
             self.rfid_reader.stop()
             self.log("Leitor RFID parado.")
 
-        for client in self.clients:
-            client.close()
-        self.clients.clear()
-
-        if self.server:
-            self.server.close()
-            self.log("Soquete do servidor fechado.")
-
-        # Threads são daemon, então não precisamos de join()
-
         self.toggle_button.configure(text="Iniciar Servidor")
         self.status_label.configure(text="Status: Desconectado", text_color="red")
         self.serial_port_entry.configure(state="normal")
@@ -174,59 +176,35 @@ class RFIDBridgeApp(ctk.CTk):
         self.port_entry.configure(state="normal")
         self.log("Servidor parado.")
 
-    def listen_for_clients(self):
-        try:
-            while self.is_running:
-                self.server.settimeout(1.0) # Timeout para permitir a verificação de self.is_running
-                try:
-                    client_socket, addr = self.server.accept()
-                    self.clients.append(client_socket)
-                    self.log(f"Cliente conectado: {addr}")
-                except socket.timeout:
-                    continue
-        except Exception as e:
-            if self.is_running: # Evita log de erro ao fechar normalmente
-                self.log(f"Erro no listener de clientes: {e}")
-
-    def handle_client(self, client_socket):
-        # Apenas mantém a conexão. A transmissão é feita pelo listen_for_reads
-        while self.is_running:
-            try:
-                # Pequeno sleep para não sobrecarregar o processador
-                time.sleep(1)
-            except Exception:
-                break
-        self.log("Cliente desconectado.")
-        self.clients.remove(client_socket)
-        client_socket.close()
-
-    def listen_for_reads(self):
-        while self.is_running:
+    def drain_log_queue(self):
+        """Escreve no log, na thread do Tk, os avisos enfileirados pelo servidor."""
+        while True:
             try:
-                tag_read = self.rfid_reader.get_read()
-                if tag_read:
-                    tag_id, antenna = tag_read
-                    message = f"{tag_id},{antenna}"
-                    self.log(f"Lido: {message}")
-                    self.broadcast(message + '\n')
-                    self.update_antenna_count(antenna)
-                time.sleep(0.1) # Evita uso excessivo da CPU
-            except Exception as e:
-                self.log(f"Erro ao ler tag: {e}")
-                break
-
-    def broadcast(self, message):
-        for client in self.clients[:]: # Itera sobre uma cópia
-            try:
-                client.sendall(message.encode('utf-8'))
-            except (socket.error, BrokenPipeError):
-                self.log("Cliente se desconectou, removendo.")
-                self.clients.remove(client)
-                client.close()
-
-    def update_antenna_count(self, antenna):
-        current_count = int(self.antenna_counters[antenna].cget("text"))
-        self.antenna_counters[antenna].configure(text=str(current_count + 1))
+                message = self.log_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.log(message)
+
+    def refresh_stats(self):
+        """Atualiza os contadores por antena e o resumo dos clientes a partir das estatísticas do servidor."""
+        self.drain_log_queue()
+        if not self.is_running or self.server is None:
+            return
+        # Cópias feitas no loop do servidor, que continua contando enquanto o Tk lê.
+        stats = self.server.stats_snapshot()
+        for antenna, count in stats.reads_per_antenna.items():
+            if antenna in self.antenna_counters:
+                self.antenna_counters[antenna].configure(text=str(count))
+
+        clients = self.server.client_stats()
+        summary = f"Clientes: {len(clients)}"
+        if clients:
+            slowest = max(clients, key=lambda c: c.last_lag)
+            summary += (f" | maior atraso: {slowest.last_lag * 1000:.0f} ms ({slowest.address})"
+                        f" | na fila: {sum(c.queued for c in clients)}"
+                        f" | descartadas: {sum(c.dropped for c in clients)}")
+        self.clients_label.configure(text=summary)
+        self.after(500, self.refresh_stats)
 
     def on_closing(self):
         if self.is_running:
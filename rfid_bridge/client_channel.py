@@ -0,0 +1,195 @@
+"""
+Fila de envio por cliente da ponte RFID.
+
+Cada cliente conectado tem um ClientChannel: o servidor só enfileira as
+mensagens (`offer`, que nunca bloqueia) e uma tarefa própria do canal as
+escreve no socket e aguarda o `drain`. Um cliente lento ou travado acumula
+mensagens apenas na sua fila, sem atrasar os demais nem a leitura dos chips.
+
+A fila tem no máximo `max_queue` mensagens em memória; quando enche, vale a
+política de estouro:
+
+- "drop_oldest": descarta a mensagem mais antiga da fila;
+- "disconnect": desconecta o cliente, que pode reconectar e recomeçar;
+- "spill": passa a gravar as mensagens num arquivo temporário, reenviadas
+  em ordem quando o cliente volta a consumir; nada é perdido.
+
+Por cliente são mantidas métricas de atraso (do enfileiramento até o socket
+aceitar a mensagem), de mensagens enviadas, descartadas e em espera.
+"""
+
+import asyncio
+import struct
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Callable, Tuple
+
+OVERFLOW_POLICIES = ("drop_oldest", "disconnect", "spill")
+
+# Mensagens escritas no socket de uma vez, antes de aguardar o drain.
+WRITE_BATCH = 256
+
+
+@dataclass
+class ClientStats:
+    address: str
+    queued: int = 0
+    sent: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    disconnected: bool = False
+
+
+class SpillFile:
+    """Fila FIFO de mensagens num arquivo temporário (registro: instante, tamanho, dados)."""
+    _HEADER = struct.Struct("<dI")
+
+    def __init__(self, directory: str | None = None):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._read_pos = 0
+        self._write_pos = 0
+        self.pending = 0
+
+    def append(self, enqueued_at: float, data: bytes):
+        self._file.seek(self._write_pos)
+        self._file.write(self._HEADER.pack(enqueued_at, len(data)))
+        self._file.write(data)
+        self._write_pos = self._file.tell()
+        self.pending += 1
+
+    def pop(self) -> Tuple[float, bytes] | None:
+        if not self.pending:
+            return None
+        self._file.seek(self._read_pos)
+        enqueued_at, size = self._HEADER.unpack(self._file.read(self._HEADER.size))
+        data = self._file.read(size)
+        self._read_pos = self._file.tell()
+        self.pending -= 1
+        if not self.pending:
+            # Tudo reenviado: o arquivo volta a ocupar zero bytes.
+            self._file.truncate(0)
+            self._read_pos = self._write_pos = 0
+        return enqueued_at, data
+
+    def close(self):
+        self._file.close()
+
+
+def validate_queue_options(max_queue: int, overflow: str):
+    """Recusa uma configuração de fila inválida antes de qualquer cliente conectar."""
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f"Política de estouro desconhecida: {overflow!r} (use {', '.join(OVERFLOW_POLICIES)}).")
+    if max_queue < 1:
+        raise ValueError(f"O tamanho da fila de envio deve ser pelo menos 1 (recebido: {max_queue}).")
+
+
+class ClientChannel:
+    def __init__(self, writer: asyncio.StreamWriter, max_queue: int = 1000, overflow: str = "drop_oldest",
+                 spill_dir: str | None = None, on_log: Callable[[str], None] | None = None):
+        validate_queue_options(max_queue, overflow)
+        self.writer = writer
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        self.on_log = on_log or (lambda message: None)
+        self.stats = ClientStats(str(writer.get_extra_info("peername")))
+        self.closed = False
+        self._queue = deque()
+        self._spill = None
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue) + (self._spill.pending if self._spill else 0)
+
+    def snapshot(self) -> ClientStats:
+        return replace(self.stats, queued=self.queued)
+
+    def offer(self, data: bytes):
+        """Enfileira uma mensagem sem bloquear, aplicando a política se a fila estiver cheia."""
+        if self.closed:
+            return
+        item = (time.monotonic(), data)
+        spilling = self._spill is not None and self._spill.pending
+        if spilling or len(self._queue) >= self.max_queue:
+            if self.overflow == "drop_oldest":
+                self._queue.popleft()
+                self.stats.dropped += 1
+                self._queue.append(item)
+            elif self.overflow == "disconnect":
+                self.on_log(f"Cliente {self.stats.address} desconectado: fila cheia ({self.max_queue} mensagens).")
+                self.close()
+                return
+            else:
+                if self._spill is None:
+                    self._spill = SpillFile(self.spill_dir)
+                if not spilling:
+                    self.on_log(f"Cliente {self.stats.address} atrasado: mensagens passam a ser gravadas em disco.")
+                self._spill.append(*item)
+                self.stats.spilled += 1
+        else:
+            self._queue.append(item)
+        self._idle.clear()
+        self._wakeup.set()
+
+    def _next_batch(self):
+        batch = []
+        while self._queue and len(batch) < WRITE_BATCH:
+            batch.append(self._queue.popleft())
+        # A fila em memória é sempre mais antiga que o que foi para o disco.
+        if not batch and self._spill is not None:
+            while self._spill.pending and len(batch) < WRITE_BATCH:
+                batch.append(self._spill.pop())
+        return batch
+
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while batch := self._next_batch():
+                    self.writer.write(b"".join(data for _, data in batch))
+                    await self.writer.drain()
+                    lag = time.monotonic() - batch[0][0]
+                    self.stats.sent += len(batch)
+                    self.stats.last_lag = lag
+                    self.stats.max_lag = max(self.stats.max_lag, lag)
+                self._idle.set()
+        except (ConnectionError, OSError):
+            self.close()
+
+    async def aclose(self, timeout: float = 1.0):
+        """Tenta entregar o que está na fila por até `timeout` segundos e fecha a conexão."""
+        if not self.closed:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.close(abort=False)
+        try:
+            await asyncio.wait_for(self.writer.wait_closed(), timeout)
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            pass
+
+    def close(self, abort: bool = True):
+        if self.closed:
+            return
+        self.closed = True
+        self.stats.disconnected = True
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        if abort:
+            self.writer.transport.abort()
+        else:
+            self.writer.close()
+        self._queue.clear()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
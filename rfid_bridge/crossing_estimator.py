@@ -0,0 +1,150 @@
+"""
+Estimativa do instante de passagem de cada chip pelo pórtico de chegada.
+
+Enquanto o chip atravessa o campo das antenas ele é lido muitas vezes, e o
+RSSI sobe até o ponto mais próximo da antena e depois cai. O
+CrossingEstimator acumula as leituras de cada tag (de todas as antenas) e,
+quando a tag fica `gap` segundos sem ser lida, emite uma única passagem com
+o instante estimado:
+
+- "peak": o instante de RSSI máximo (o meio do patamar, se o valor máximo se
+  repete, como acontece com RSSI inteiro);
+- "parabola": o vértice da parábola ajustada por mínimos quadrados às
+  leituras em torno do pico, o que recupera o instante entre duas leituras.
+  Sem leituras suficientes ou com uma curva que não tem máximo, usa o pico.
+
+Sem RSSI, a passagem é o ponto médio entre a primeira e a última leitura.
+
+As leituras de cada tag ficam num buffer circular (deque com tamanho
+máximo) e as tags ativas num OrderedDict ordenado pela última leitura, de
+modo que cada leitura custa O(1) e só o ajuste, uma vez por passagem,
+percorre o buffer.
+"""
+
+from collections import OrderedDict, deque
+from typing import List, NamedTuple
+
+METHODS = ("peak", "parabola")
+
+
+class Crossing(NamedTuple):
+    epc: str
+    antenna: int
+    rssi: float | None
+    timestamp: float
+    reads: int
+
+    def to_line(self) -> str:
+        """Linha enviada aos clientes da ponte: `EPC,ANTENA,RSSI,INSTANTE`."""
+        rssi = "" if self.rssi is None else f"{self.rssi:g}"
+        return f"{self.epc},{self.antenna},{rssi},{self.timestamp:.3f}"
+
+
+class _TagTrack:
+    __slots__ = ("samples", "first_seen", "last_seen", "reads",
+                 "peak_rssi", "peak_antenna", "peak_start", "peak_end")
+
+    def __init__(self, buffer_size: int, timestamp: float):
+        self.samples = deque(maxlen=buffer_size)
+        self.first_seen = self.last_seen = timestamp
+        self.reads = 0
+        self.peak_rssi = None
+        self.peak_antenna = None
+        self.peak_start = self.peak_end = timestamp
+
+    def add(self, antenna: int, rssi: float | None, timestamp: float):
+        self.reads += 1
+        self.first_seen = min(self.first_seen, timestamp)
+        self.last_seen = max(self.last_seen, timestamp)
+        if self.peak_antenna is None:
+            self.peak_antenna = antenna
+        if rssi is None:
+            return
+        self.samples.append((timestamp, rssi))
+        if self.peak_rssi is None or rssi > self.peak_rssi:
+            self.peak_rssi, self.peak_antenna = rssi, antenna
+            self.peak_start = self.peak_end = timestamp
+        elif rssi == self.peak_rssi:
+            self.peak_start = min(self.peak_start, timestamp)
+            self.peak_end = max(self.peak_end, timestamp)
+
+
+class CrossingEstimator:
+    def __init__(self, gap: float = 1.0, method: str = "parabola",
+                 buffer_size: int = 64, fit_window: float = 0.5):
+        if method not in METHODS:
+            raise ValueError(f"Método de estimativa desconhecido: {method!r} (use {', '.join(METHODS)}).")
+        self.gap = gap
+        self.method = method
+        self.buffer_size = buffer_size
+        self.fit_window = fit_window
+        self._tracks: "OrderedDict[str, _TagTrack]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Número de tags com passagem em andamento."""
+        return len(self._tracks)
+
+    def add(self, epc: str, antenna: int, rssi: float | None, timestamp: float) -> List[Crossing]:
+        """Acrescenta uma leitura e retorna as passagens encerradas até `timestamp`."""
+        crossings = self.expire(timestamp)
+        track = self._tracks.get(epc)
+        if track is None:
+            track = self._tracks[epc] = _TagTrack(self.buffer_size, timestamp)
+        else:
+            self._tracks.move_to_end(epc)
+        track.add(antenna, rssi, timestamp)
+        return crossings
+
+    def expire(self, now: float) -> List[Crossing]:
+        """Encerra as passagens das tags sem leituras há `gap` segundos."""
+        crossings = []
+        while self._tracks:
+            epc, track = next(iter(self._tracks.items()))
+            if now - track.last_seen < self.gap:
+                break
+            del self._tracks[epc]
+            crossings.append(self._estimate(epc, track))
+        return crossings
+
+    def flush(self) -> List[Crossing]:
+        """Encerra todas as passagens em andamento (ex.: ao parar o servidor)."""
+        crossings = [self._estimate(epc, track) for epc, track in self._tracks.items()]
+        self._tracks.clear()
+        return crossings
+
+    def _estimate(self, epc: str, track: _TagTrack) -> Crossing:
+        if track.peak_rssi is None:
+            timestamp = (track.first_seen + track.last_seen) / 2
+        else:
+            timestamp = (track.peak_start + track.peak_end) / 2
+            if self.method == "parabola":
+                timestamp = self._fit_apex(track, timestamp)
+        return Crossing(epc, track.peak_antenna, track.peak_rssi, timestamp, track.reads)
+
+    def _fit_apex(self, track: _TagTrack, peak_time: float) -> float:
+        """Vértice de rssi = a·t² + b·t + c ajustado às leituras a até `fit_window` do pico."""
+        points = [(t - peak_time, r) for t, r in track.samples if abs(t - peak_time) <= self.fit_window]
+        if len({t for t, _ in points}) < 3:
+            return peak_time
+        # Equações normais do ajuste quadrático, resolvidas pela regra de Cramer.
+        s = [sum(t ** k for t, _ in points) for k in range(5)]
+        y = [sum(r * t ** k for t, r in points) for k in range(3)]
+        matrix = [[s[4], s[3], s[2]], [s[3], s[2], s[1]], [s[2], s[1], s[0]]]
+        det = _det3(matrix)
+        if abs(det) < 1e-18:
+            return peak_time
+        a = _det3([[y[2], s[3], s[2]], [y[1], s[2], s[1]], [y[0], s[1], s[0]]]) / det
+        b = _det3([[s[4], y[2], s[2]], [s[3], y[1], s[1]], [s[2], y[0], s[0]]]) / det
+        if a >= 0:
+            return peak_time
+        apex = -b / (2 * a)
+        first, last = min(t for t, _ in points), max(t for t, _ in points)
+        if not first <= apex <= last:
+            return peak_time
+        return peak_time + apex
+
+
+def _det3(m) -> float:
+    return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1])
+            - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0])
+            + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
@@ -10,7 +10,8 @@ class RFIDReader:
         """Inicializa o leitor.
 
         Args:
-            data_queue (queue.Queue): Fila para enviar os dados lidos para a thread principal.
+            data_queue (queue.Queue): Fila para enviar os dados lidos para a thread principal,
+                como tuplas `(instante de recepção, linha)`.
             port (str): A porta serial a ser usada (ex: 'COM3' no Windows, '/dev/ttyUSB0' no Linux).
             baudrate (int): A taxa de transmissão em bits por segundo.
             timeout (int): Tempo de espera para leitura da porta serial.
@@ -43,8 +44,11 @@ class RFIDReader:
                 # Ela bloqueará por até 'timeout' segundos esperando por dados.
                 line = self.serial_connection.readline().decode('utf-8').strip()
                 if line:
+                    # O instante de chegada da linha acompanha a leitura: é ele
+                    # que a estimativa da passagem usa, não o de retirada da fila.
+                    received_at = time.time()
                     print(f"[RFID] Dado bruto recebido: '{line}'")
-                    self.data_queue.put(line) # Coloca o número lido na fila
+                    self.data_queue.put((received_at, line))
             except serial.SerialException:
                 print("[RFID] Erro: A porta serial foi desconectada.")
                 self.connection_status = "Desconectado"
@@ -56,6 +60,35 @@ class RFIDReader:
                 print(f"[RFID] Erro inesperado: {e}")
                 time.sleep(2)
 
+    def read_tags(self, timeout=1.0):
+        """Aguarda até `timeout` segundos e devolve as leituras recebidas desde a última chamada.
+
+        Cada linha da serial no formato `EPC[,ANTENA[,RSSI]]` vira uma tupla
+        `(epc, antena, rssi, instante)`; sem antena, vale a 1, e o instante é
+        o momento em que a linha chegou pela serial (ver `_read_loop`).
+        """
+        try:
+            lines = [self.data_queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                lines.append(self.data_queue.get_nowait())
+            except queue.Empty:
+                break
+        reads = []
+        for received_at, line in lines:
+            parts = [p.strip() for p in line.split(',')]
+            try:
+                antenna = int(parts[1]) if len(parts) > 1 and parts[1] else 1
+                rssi = float(parts[2]) if len(parts) > 2 and parts[2] else None
+            except ValueError:
+                print(f"[RFID] Linha ignorada (formato inesperado): '{line}'")
+                continue
+            if parts[0]:
+                reads.append((parts[0], antenna, rssi, received_at))
+        return reads
+
     def start(self):
         """Inicia a thread de leitura do RFID."""
         if not self.is_running:
@@ -81,14 +114,18 @@ class MockRFIDReader:
     A mock version of the RFIDReader for testing purposes.
     It simulates reading tags without requiring a physical device.
     """
-    def __init__(self, serial_port, **kwargs):
+    def __init__(self, serial_port, read_delay=0.1, verbose=True, **kwargs):
         """
-        Initializes the mock reader. The parameters are for compatibility
-        with the real RFIDReader, but are not used here.
+        Initializes the mock reader. The serial port and extra keyword
+        arguments are for compatibility with the real RFIDReader and are not
+        used. `read_delay` is the simulated duration of each read cycle
+        (0 to benchmark the bridge); `verbose` prints every cycle.
         """
         print(f"Mock RFID Reader initialized for port {serial_port}.")
         self._tags_to_read = []
         self._read_count = 0
+        self.read_delay = read_delay
+        self.verbose = verbose
         self.is_reading = threading.Event()
 
     def set_mock_data(self, tags):
@@ -105,21 +142,36 @@ class MockRFIDReader:
         Simulates reading tags. Returns one batch of tags from the pre-set mock data per call.
         """
         self.is_reading.set()
-        print(f"Mock reading tags (timeout: {timeout}s)...")
-        time.sleep(0.1) # Simulate read delay
+        if self.verbose:
+            print(f"Mock reading tags (timeout: {timeout}s)...")
+        if self.read_delay:
+            time.sleep(self.read_delay) # Simulate read delay
         if self._read_count < len(self._tags_to_read):
             tags_to_return = self._tags_to_read[self._read_count]
             # Update timestamp to be current
-            tags_with_current_time = [(epc, ant, rssi, time.time()) for epc, ant, rssi, _ in tags_to_return]
-            print(f"Mock reader returning: {tags_with_current_time}")
+            now = time.time()
+            tags_with_current_time = [(epc, ant, rssi, now) for epc, ant, rssi, _ in tags_to_return]
+            if self.verbose:
+                print(f"Mock reader returning: {tags_with_current_time}")
             self._read_count += 1
             self.is_reading.clear()
             return tags_with_current_time
-        
-        print("No more mock tags to return.")
+
+        if self.verbose:
+            print("No more mock tags to return.")
+        if timeout and not self.read_delay:
+            # Like a real reader with no tags in range, wait out the timeout.
+            time.sleep(timeout)
         self.is_reading.clear()
         return []
 
+    def start(self):
+        """Compatibility with RFIDReader: the mock has no thread to start."""
+        print("Mock RFID Reader started.")
+
+    def stop(self):
+        self.close()
+
     def close(self):
         """
         Simulates closing the connection.
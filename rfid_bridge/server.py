@@ -0,0 +1,206 @@
+"""
+Núcleo de rede da ponte RFID sobre asyncio.
+
+O BridgeServer roda um event loop próprio numa thread de fundo (a interface
+Tk continua na thread principal) e cuida de três coisas:
+
+- aceitar clientes com `asyncio.start_server`, sem threads nem timeouts por
+  conexão;
+- bombear as leituras do leitor: `read_tags` bloqueia no leitor, por isso roda
+  num executor de uma thread, e cada lote devolvido é processado no loop,
+  sem pausas entre lotes;
+- distribuir as passagens a todos os clientes: cada um tem uma fila
+  limitada e uma tarefa de escrita própria (ClientChannel), então um cliente
+  lento não atrasa os demais nem a leitura.
+
+O leitor deve oferecer `read_tags(timeout)`, que espera até `timeout`
+segundos e devolve uma lista de leituras `(epc, antena, rssi, instante)`.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Tuple
+
+from .client_channel import ClientChannel, ClientStats, validate_queue_options
+from .crossing_estimator import CrossingEstimator
+
+
+@dataclass
+class BridgeStats:
+    reads: int = 0
+    crossings: int = 0
+    reads_per_antenna: Dict[int, int] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def reads_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.started_at
+        return self.reads / elapsed if elapsed > 0 else 0.0
+
+
+class BridgeServer:
+    def __init__(self, reader, host: str, port: int, estimator: CrossingEstimator | None = None,
+                 on_log: Callable[[str], None] | None = None, read_timeout: float = 0.5,
+                 max_queue: int = 1000, overflow: str = "drop_oldest", spill_dir: str | None = None):
+        self.reader = reader
+        self.host = host
+        self.port = port
+        self.estimator = estimator if estimator is not None else CrossingEstimator()
+        self.on_log = on_log or (lambda message: None)
+        self.read_timeout = read_timeout
+        # Fila de envio de cada cliente: tamanho máximo e política de estouro.
+        validate_queue_options(max_queue, overflow)
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        self.stats = BridgeStats()
+        self.address: Tuple[str, int] | None = None
+        self._clients: Dict[asyncio.StreamWriter, ClientChannel] = {}
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def stats_snapshot(self) -> BridgeStats:
+        """Cópia das estatísticas de leitura; pode ser chamada de qualquer thread."""
+        return self._call_on_loop(lambda: replace(self.stats, reads_per_antenna=dict(self.stats.reads_per_antenna)))
+
+    def client_stats(self) -> List[ClientStats]:
+        """Métricas de cada cliente conectado (fila, enviadas, descartadas, atraso); pode ser chamada de qualquer thread."""
+        return self._call_on_loop(lambda: [channel.snapshot() for channel in self._clients.values()])
+
+    def _call_on_loop(self, func, timeout: float = 1.0):
+        # As estatísticas só mudam no loop: a cópia é feita lá, entre duas
+        # tarefas, e nunca no meio de um lote (ver process_reads).
+        thread = self._thread
+        if thread is None or not thread.is_alive() or threading.current_thread() is thread:
+            return func()
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(func())
+            except Exception as e:
+                future.set_exception(e)
+
+        try:
+            self._loop.call_soon_threadsafe(run)
+            return future.result(timeout)
+        except (RuntimeError, FutureTimeoutError):
+            # O loop terminou antes de atender: nada mais altera as estatísticas.
+            return func()
+
+    def start(self):
+        """Inicia o loop em segundo plano e retorna quando o servidor já está escutando."""
+        self._thread = threading.Thread(target=asyncio.run, args=(self._main(),),
+                                        name="rfid-bridge-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self, timeout: float = 5.0):
+        """Envia as passagens pendentes, desconecta os clientes e encerra o loop."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self.address = server.sockets[0].getsockname()[:2]
+        self.stats = BridgeStats()
+        self._ready.set()
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rfid-reader")
+        async with server:
+            tasks = [asyncio.create_task(self._pump(executor)), asyncio.create_task(self._expire_periodically())]
+            await self._stopping.wait()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._publish(self.estimator.flush())
+            await self._close_clients()
+        # Uma leitura em andamento termina sozinha em até read_timeout.
+        executor.shutdown(wait=False)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        address = writer.get_extra_info("peername")
+        self._clients[writer] = ClientChannel(writer, self.max_queue, self.overflow, self.spill_dir, self.on_log)
+        self.on_log(f"Cliente conectado: {address}")
+        try:
+            # Os clientes não enviam comandos; ler só detecta a desconexão.
+            while await reader.read(1024):
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            channel = self._clients.pop(writer, None)
+            if channel is not None:
+                channel.close()
+                self.on_log(f"Cliente desconectado: {address}")
+
+    async def _pump(self, executor: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                batch = await loop.run_in_executor(executor, self.reader.read_tags, self.read_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.on_log(f"Erro ao ler tags: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            self.process_reads(batch)
+
+    def process_reads(self, batch):
+        """Passa um lote de leituras pelo estimador e distribui as passagens encerradas."""
+        stats = self.stats
+        estimator = self.estimator
+        for epc, antenna, rssi, timestamp in batch:
+            stats.reads += 1
+            stats.reads_per_antenna[antenna] = stats.reads_per_antenna.get(antenna, 0) + 1
+            self._publish(estimator.add(epc, antenna, rssi, timestamp))
+        self._publish(estimator.expire(time.time()))
+
+    async def _expire_periodically(self):
+        # Sem leituras novas, as passagens ainda precisam ser encerradas.
+        while True:
+            await asyncio.sleep(self.estimator.gap / 4)
+            self._publish(self.estimator.expire(time.time()))
+
+    def _publish(self, crossings):
+        for crossing in crossings:
+            self.stats.crossings += 1
+            line = crossing.to_line()
+            self.broadcast(line + "\n")
+            self.on_log(f"Passagem: {line} ({crossing.reads} leituras)")
+
+    def broadcast(self, message: str):
+        """Enfileira a mensagem para cada cliente; nunca espera pela rede."""
+        data = message.encode("utf-8")
+        for writer, channel in list(self._clients.items()):
+            if channel.closed:
+                self._clients.pop(writer, None)
+                continue
+            channel.offer(data)
+
+    async def _close_clients(self):
+        channels = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(channel.aclose() for channel in channels), return_exceptions=True)
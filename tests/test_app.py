@@ -11,12 +11,15 @@ import inspect
 from datetime import date, timedelta
 import socket
 import logging
+import time
+import threading
 
 # Adiciona o diretório da aplicação principal ao sys.path para importação correta
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
 # Importa os módulos que serão mockados ou usados nos testes
 from crono_app import custom_exceptions
+from crono_app.rfid_dedup import DeduplicadorLeituras
 from crono_app import ui_states
 
 
@@ -122,7 +125,7 @@ class TestAppCronoBasicFunctionality:
             app.after.assert_called_once_with(100, mock_init_pos_ui)
 
             # Verifica se as dependências de negócio foram instanciadas
-            MockDB.assert_called_once_with("race_data.db")
+            MockDB.assert_called_once_with("race_data.db", janela_notificacao=0.05)
             MockDB.return_value.attach.assert_called_once_with(app)
             MockGerenciador.assert_called_once_with(MockDB.return_value, ANY)
             
@@ -192,6 +195,8 @@ class TestAppCronoMethods:
             app.start_bridge_connection = MagicMock()
             app.stop_bridge_connection = MagicMock()
             app.destroy = MagicMock() # Adicionado para o teste _on_closing
+            app.db = MagicMock()
+            app.servico_backup = MagicMock()
             yield app
 
     def test_toggle_bridge_connection_calls_start(self, mock_app_instance):
@@ -479,6 +484,7 @@ class TestRfidProcessing:
             app.rfid_queue = queue.Queue()
             app.logger = MagicMock()
             app.after = MagicMock()
+            app.deduplicador_rfid = DeduplicadorLeituras(janela=2.0)
             # Mocka o método que é chamado pelo processador da fila
             app._ui_registrar_chegada_rfid = MagicMock()
             yield app
@@ -491,7 +497,7 @@ class TestRfidProcessing:
 
         app._processar_fila_rfid()
 
-        app._ui_registrar_chegada_rfid.assert_called_once_with("12345", 1)
+        app._ui_registrar_chegada_rfid.assert_called_once_with("12345", 1, ANY)
         app.after.assert_called_once_with(100, app._processar_fila_rfid)
 
     def test_processar_fila_rfid_com_dados_invalidos(self, app_with_mocks):
@@ -526,11 +532,43 @@ class TestRfidProcessing:
         app._processar_fila_rfid()
 
         assert app._ui_registrar_chegada_rfid.call_count == 2
-        app._ui_registrar_chegada_rfid.assert_any_call("TAG1", 1)
-        app._ui_registrar_chegada_rfid.assert_any_call("TAG2", 2)
+        app._ui_registrar_chegada_rfid.assert_any_call("TAG1", 1, ANY)
+        app._ui_registrar_chegada_rfid.assert_any_call("TAG2", 2, ANY)
         app.logger.warning.assert_called_once_with("Leitura RFID em formato inesperado ignorada: INVALIDO")
         app.after.assert_called_once_with(100, app._processar_fila_rfid)
 
+    def test_leituras_repetidas_da_mesma_tag_sao_descartadas(self, app_with_mocks):
+        """Um chip lido várias vezes, em várias antenas, gera uma única chegada."""
+        app = app_with_mocks
+        for linha in ("TAG1,1,-60", "TAG1,2,-55", "TAG1,1,-50,1750000000.25", "TAG2,3"):
+            app.rfid_queue.put(linha)
+
+        app._processar_fila_rfid()
+
+        assert [c.args[:2] for c in app._ui_registrar_chegada_rfid.call_args_list] == [("TAG1", 1), ("TAG2", 3)]
+        assert app.deduplicador_rfid.descartadas == 2
+
+    def test_instante_informado_pela_ponte_e_repassado(self, app_with_mocks):
+        app = app_with_mocks
+        app.rfid_queue.put("TAG1,1,-48,1750000000.125")
+
+        app._processar_fila_rfid()
+
+        app._ui_registrar_chegada_rfid.assert_called_once_with("TAG1", 1, 1750000000.125)
+
+    def test_politica_pico_rssi_entrega_ao_fim_da_passagem(self, app_with_mocks):
+        app = app_with_mocks
+        app.deduplicador_rfid = DeduplicadorLeituras(janela=0.05, politica="pico_rssi")
+        for linha in ("TAG1,1,-60", "TAG1,2,-40", "TAG1,1,-55"):
+            app.rfid_queue.put(linha)
+
+        app._processar_fila_rfid()
+        app._ui_registrar_chegada_rfid.assert_not_called()
+
+        time.sleep(0.06)
+        app._processar_fila_rfid()
+        app._ui_registrar_chegada_rfid.assert_called_once_with("TAG1", 2, ANY)
+
 
 class TestUiRegistrarChegadaRfid:
     """Testa a lógica de UI para registrar uma chegada por RFID."""
@@ -574,7 +612,7 @@ class TestUiRegistrarChegadaRfid:
 
         app._ui_registrar_chegada_rfid("TAG123", 2)
 
-        app.gerenciador.registrar_chegada_por_rfid.assert_called_once_with("TAG123")
+        app.gerenciador.registrar_chegada_por_rfid.assert_called_once_with("TAG123", 2, None)
         app.logger.info.assert_called_once_with("[RFID Antena 2] Chegada registrada para o atleta #101 (Teste) com a tag TAG123.")
         app.chegada_num_var.set.assert_called_once_with("")
 
@@ -680,6 +718,7 @@ class TestUiCreationMethods:
              patch('crono_app.app.ctk.CTkLabel') as MockLabel, \
              patch('crono_app.app.ctk.CTkEntry') as MockEntry, \
              patch('crono_app.app.ctk.CTkButton') as MockButton, \
+             patch('crono_app.app.ttk.Treeview'), \
              patch('crono_app.app.tk.StringVar') as MockStringVar:
             
             # Chama o método
@@ -698,6 +737,33 @@ class TestUiCreationMethods:
             # Verifica criação das variáveis para os campos
             assert MockStringVar.call_count >= 6  # Uma para busca + 5 para edição
 
+    def test_consulta_sugere_atletas_enquanto_digita(self, app_with_mocked_ui):
+        """A busca por nome roda após a pausa na digitação e preenche as sugestões."""
+        app = app_with_mocked_ui
+        app.after = MagicMock(return_value="after#1")
+        app.db.buscar_atletas.return_value = [{'num': 7, 'nome': 'Ana Silva', 'modalidade': '5km'}]
+
+        with patch('crono_app.app.ctk.CTkFrame'), \
+             patch('crono_app.app.ctk.CTkLabel'), \
+             patch('crono_app.app.ctk.CTkEntry'), \
+             patch('crono_app.app.ctk.CTkButton'), \
+             patch('crono_app.app.ttk.Treeview') as MockTreeview, \
+             patch('crono_app.app.tk.StringVar') as MockStringVar:
+            app._popular_aba_consulta(MagicMock())
+
+            busca_var = MockStringVar.return_value
+            ao_digitar = busca_var.trace_add.call_args[0][1]
+            busca_var.get.return_value = "ana sil"
+            ao_digitar()
+            atraso, atualizar_sugestoes = app.after.call_args[0]
+            assert atraso == 150
+            app.db.buscar_atletas.assert_not_called()
+
+            atualizar_sugestoes()
+
+        app.db.buscar_atletas.assert_called_once_with("ana sil", limite=50)
+        MockTreeview.return_value.insert.assert_called_once_with("", "end", iid="7", values=(7, 'Ana Silva', '5km'))
+
     def test_popular_aba_resultados(self, app_with_mocked_ui):
         """Testa a criação da aba de resultados."""
         app = app_with_mocked_ui
@@ -842,29 +908,28 @@ class TestTableOperations:
             assert app._coluna_ordenacao == ("Nome", True)
 
     def test_ordenar_tabela_por_idade(self, app_for_table_tests):
-        """Testa ordenação especial por idade (que é calculada em Python)."""
+        """Testa a ordenação por idade, feita no SQL sobre a idade pré-calculada."""
         app = app_for_table_tests
         
         mock_data = [
-            {"num": "001", "nome": "Jovem", "sexo": "M", "data_nascimento": "01/01/2000", 
-             "categoria": "GERAL", "modalidade": "5K", "tempo_liquido": 1200.0},
-            {"num": "002", "nome": "Idoso", "sexo": "M", "data_nascimento": "01/01/1970", 
+            {"num": "002", "nome": "Idoso", "sexo": "M", "data_nascimento": "01/01/1970", "idade": 55,
              "categoria": "GERAL", "modalidade": "5K", "tempo_liquido": 1500.0},
+            {"num": "001", "nome": "Jovem", "sexo": "M", "data_nascimento": "01/01/2000", "idade": 25,
+             "categoria": "GERAL", "modalidade": "5K", "tempo_liquido": 1200.0},
         ]
         app.db.obter_todos_atletas_para_tabela.return_value = mock_data
         
-        with patch('crono_app.app.Atleta._calcular_idade', side_effect=[25, 55]), \
+        with patch('crono_app.app.Atleta._calcular_idade') as mock_calcular, \
              patch('crono_app.app.formatar_timedelta', return_value="00:20:00.000"):
             
-            # Ordena por idade
             app._ordenar_tabela("Idade")
             
-            # Verifica se usa coluna data_nascimento no DB
-            app.db.obter_todos_atletas_para_tabela.assert_called_once_with("data_nascimento", False)
+            # A coluna de idade pré-calculada é ordenada no banco
+            app.db.obter_todos_atletas_para_tabela.assert_called_once_with("idade", False)
             
-            # Verifica se a ordenação especial por idade foi aplicada
-            # (os dados são reordenados após a busca do banco)
-            assert len(app.dados_tabela) > 1  # Cabeçalho + dados
+            # A ordem do banco é preservada e a idade não é recalculada
+            assert [linha[3] for linha in app.dados_tabela[1:]] == [55, 25]
+            mock_calcular.assert_not_called()
 
     def test_ordenar_tabela_erro_no_processamento(self, app_for_table_tests):
         """Testa o tratamento de erro durante o processamento da ordenação."""
@@ -909,6 +974,82 @@ class TestTableOperations:
             assert len(app.dados_tabela) > 1
 
 
+    def test_update_com_chegadas_aplica_apenas_linhas_alteradas(self, app_for_table_tests, app_module):
+        """Uma notificação de chegada agenda a atualização pontual, sem reconstruir a tabela."""
+        app = app_for_table_tests
+        app.after = MagicMock()
+        app.fila_ui = queue.Queue()
+        app.current_state = MagicMock()
+        alteracoes = app_module.AlteracoesDB(atletas_atualizados={7})
+
+        with patch.object(app, '_ordenar_tabela') as mock_ordenar, \
+             patch.object(app, '_aplicar_alteracoes_tabela') as mock_aplicar:
+            app.update(MagicMock(spec=app_module.DatabaseManager), alteracoes)
+            app._processar_fila_ui()
+
+            mock_aplicar.assert_called_once_with({7})
+            mock_ordenar.assert_not_called()
+            app.current_state.handle_ui_update.assert_not_called()
+
+    def test_update_com_recarga_total_reconstroi_tabela(self, app_for_table_tests, app_module):
+        app = app_for_table_tests
+        app.after = MagicMock()
+        app.fila_ui = queue.Queue()
+        app.current_state = MagicMock()
+
+        with patch.object(app, '_ordenar_tabela') as mock_ordenar:
+            app.update(MagicMock(spec=app_module.DatabaseManager), app_module.AlteracoesDB(recarga_total=True))
+            app._processar_fila_ui()
+
+            mock_ordenar.assert_called_once_with("Nº", manter_direcao=True)
+            app.current_state.handle_ui_update.assert_called_once_with(app)
+
+    def test_update_de_outra_thread_nao_toca_o_tk(self, app_for_table_tests, app_module):
+        """Notificações do escritor só entram na fila; o loop do Tk as aplica."""
+        app = app_for_table_tests
+        app.after = MagicMock()
+        app.fila_ui = queue.Queue()
+        app.current_state = MagicMock()
+
+        with patch.object(app, '_ordenar_tabela') as mock_ordenar:
+            notificador = threading.Thread(target=app.update, args=(
+                MagicMock(spec=app_module.DatabaseManager), app_module.AlteracoesDB(recarga_total=True)))
+            notificador.start()
+            notificador.join()
+            app.after.assert_not_called()
+            mock_ordenar.assert_not_called()
+
+            app._processar_fila_ui()
+
+            mock_ordenar.assert_called_once_with("Nº", manter_direcao=True)
+            app.after.assert_called_once_with(50, app._processar_fila_ui)
+
+    def test_aplicar_alteracoes_tabela_atualiza_item_in_loco(self, app_for_table_tests):
+        app = app_for_table_tests
+        app.tabela_atletas.exists.return_value = True
+        app.db.obter_atletas_por_numeros.return_value = [
+            {"num": 7, "nome": "Sete", "sexo": "M", "data_nascimento": "01/01/1990",
+             "categoria": "GERAL", "modalidade": "5K", "tempo_liquido": 1200.0},
+        ]
+
+        with patch.object(app, '_ordenar_tabela') as mock_ordenar:
+            app._aplicar_alteracoes_tabela({7})
+
+            app.db.obter_atletas_por_numeros.assert_called_once_with({7})
+            app.tabela_atletas.item.assert_called_once_with("7", values=[7, "Sete", "M", 35, "GERAL", "5K", "00:20:00.000"])
+            mock_ordenar.assert_not_called()
+
+    def test_aplicar_alteracoes_tabela_ordenada_por_outra_coluna_reconstroi(self, app_for_table_tests):
+        app = app_for_table_tests
+        app._coluna_ordenacao = ("Tempo Bruto", False)
+
+        with patch.object(app, '_ordenar_tabela') as mock_ordenar:
+            app._aplicar_alteracoes_tabela({7})
+
+            mock_ordenar.assert_called_once_with("Tempo Bruto", manter_direcao=True)
+            app.db.obter_atletas_por_numeros.assert_not_called()
+
+
 class TestStateManagement:
     """Testa o gerenciamento de estados da aplicação."""
 
@@ -921,6 +1062,7 @@ class TestStateManagement:
             app = AppCrono()
             app.logger = MagicMock()
             app.db = MagicMock()
+            app.servico_backup = MagicMock()
             app.gerenciador = MagicMock()
             app.current_state = None
             app.data_do_evento = date(2025, 6, 22)
@@ -953,6 +1095,7 @@ class TestStateManagement:
         
         with patch.object(app, '_ordenar_tabela') as mock_ordenar, \
              patch.object(app, '_processar_fila_rfid') as mock_processar_fila, \
+             patch.object(app, '_processar_fila_ui') as mock_processar_fila_ui, \
              patch('crono_app.app.PreparacaoState') as MockPreparacaoState:
             
             # Chama o método
@@ -966,6 +1109,10 @@ class TestStateManagement:
             
             # Verifica se o processamento da fila RFID foi iniciado
             mock_processar_fila.assert_called_once()
+            mock_processar_fila_ui.assert_called_once()
+
+            # Verifica se o backup automático foi iniciado
+            app.servico_backup.iniciar.assert_called_once()
 
     def test_mudar_estado_basico(self, app_for_state_tests, app_module):
         """Testa a mudança básica de estado."""
@@ -1095,8 +1242,23 @@ class TestDataImportExport:
             app.db = MagicMock()
             app.gerenciador = MagicMock()
             app.data_do_evento = date(2025, 6, 22)
-            
-            yield app
+            # A importação roda numa thread e volta ao Tk pela fila_ui: aqui a
+            # thread executa de forma imediata e a fila é drenada logo depois,
+            # como faria o loop do Tk, para os asserts serem síncronos.
+            app.after = MagicMock()
+            app.fila_ui = queue.Queue()
+            app._abrir_janela_progresso_importacao = MagicMock()
+
+            class ThreadImediata:
+                def __init__(self, target, args=(), daemon=None):
+                    self._target, self._args = target, args
+
+                def start(self):
+                    self._target(*self._args)
+                    app._processar_fila_ui()
+
+            with patch('crono_app.app.threading.Thread', ThreadImediata):
+                yield app
 
     def test_executar_importacao_atletas_arquivo_valido(self, app_for_import_tests):
         """Testa a execução da importação de atletas de um arquivo CSV válido."""
@@ -1118,7 +1280,11 @@ class TestDataImportExport:
             mock_filedialog.assert_called_once()
             
             # Verifica se o gerenciador foi chamado corretamente
-            app.gerenciador.carregar_atletas_csv.assert_called_once_with("/caminho/para/atletas.csv", app.data_do_evento)
+            app.gerenciador.carregar_atletas_csv.assert_called_once()
+            args, kwargs = app.gerenciador.carregar_atletas_csv.call_args
+            assert args == ("/caminho/para/atletas.csv", app.data_do_evento)
+            assert not kwargs['cancelamento'].is_set()
+            app._abrir_janela_progresso_importacao.return_value.destroy.assert_called_once()
             
             # Verifica se mensagem de sucesso foi exibida
             mock_messagebox.showinfo.assert_called_once()
@@ -1216,6 +1382,82 @@ class TestDataImportExport:
             # Verifica se foi logado como crítico
             app.logger.critical.assert_called_once()
 
+    def test_reimportacao_pergunta_e_mostra_o_delta(self, app_for_import_tests):
+        """Com atletas já cadastrados, a remoção de ausentes é confirmada e o delta aparece no resumo."""
+        app = app_for_import_tests
+        from crono_app.database_manager import ResumoSincronizacao
+
+        with patch('crono_app.app.filedialog.askopenfilename', return_value="/caminho/atletas.csv"), \
+             patch('crono_app.app.messagebox') as mock_messagebox:
+            app.db.contar_atletas.return_value = 10
+            mock_messagebox.askyesno.return_value = True
+            app.gerenciador.carregar_atletas_csv.return_value = (9, [])
+            app.gerenciador.ultima_sincronizacao = ResumoSincronizacao(
+                inseridos=[11], alterados=[2, 3], removidos=[4], preservados=[5], inalterados=6)
+
+            app._executar_importacao_atletas()
+
+            assert app.gerenciador.carregar_atletas_csv.call_args.kwargs['remover_ausentes'] is True
+            mensagem = mock_messagebox.showinfo.call_args.args[1]
+            assert "Novos: 1 | Alterados: 2 | Removidos: 1 | Sem alteração: 6" in mensagem
+            assert "já ter(em) chegada: 5" in mensagem
+
+    def test_executar_importacao_reporta_progresso_e_cancelamento(self, app_for_import_tests):
+        """O progresso chega à janela e o cancelamento é informado sem erro."""
+        app = app_for_import_tests
+        from crono_app.business_logic import ProgressoImportacao
+        from crono_app.custom_exceptions import ImportacaoCanceladaError
+
+        def importar(caminho, data_evento, progresso, cancelamento, **_kwargs):
+            progresso(ProgressoImportacao(bytes_total=200, bytes_lidos=100, linhas=500, decorrido=0.5))
+            raise ImportacaoCanceladaError("cancelada")
+
+        with patch('crono_app.app.filedialog.askopenfilename', return_value="/caminho/atletas.csv"), \
+             patch('crono_app.app.messagebox') as mock_messagebox:
+            app.gerenciador.carregar_atletas_csv.side_effect = importar
+            janela = app._abrir_janela_progresso_importacao.return_value
+
+            app._executar_importacao_atletas()
+
+            janela.barra.set.assert_called_once_with(0.5)
+            assert "1000 linhas/s" in janela.label_progresso.configure.call_args.kwargs['text']
+            mock_messagebox.showinfo.assert_called_once()
+            assert mock_messagebox.showinfo.call_args.args[0] == "Importação Cancelada"
+            mock_messagebox.showerror.assert_not_called()
+
+    def test_importacao_volta_ao_tk_pela_fila_ui(self, app_for_import_tests):
+        """Progresso e conclusão saem da thread de importação só pela fila_ui, nunca por `after`."""
+        app = app_for_import_tests
+        from crono_app.business_logic import ProgressoImportacao
+
+        def importar(caminho, data_evento, progresso, cancelamento, **_kwargs):
+            progresso(ProgressoImportacao(bytes_total=200, bytes_lidos=100, linhas=500, decorrido=0.5))
+            return (500, [])
+
+        with patch('crono_app.app.filedialog.askopenfilename', return_value="/caminho/atletas.csv"), \
+             patch('crono_app.app.messagebox') as mock_messagebox, \
+             patch.object(app, '_processar_fila_ui'):
+            app.gerenciador.carregar_atletas_csv.side_effect = importar
+            janela = app._abrir_janela_progresso_importacao.return_value
+
+            app._executar_importacao_atletas()
+
+            # Nada tocou a UI ainda: tudo está enfileirado para o loop do Tk.
+            app.after.assert_not_called()
+            janela.barra.set.assert_not_called()
+            mock_messagebox.showinfo.assert_not_called()
+            pendentes = []
+            while not app.fila_ui.empty():
+                pendentes.append(app.fila_ui.get_nowait())
+            assert [funcao for funcao, _args in pendentes] == [
+                app._mostrar_progresso_importacao, app._concluir_importacao_atletas]
+            assert pendentes[1][1] == ((500, []), None)
+
+            for funcao, args in pendentes:
+                funcao(*args)
+            janela.barra.set.assert_called_once_with(0.5)
+            mock_messagebox.showinfo.assert_called_once()
+
 
 class TestReportGeneration:
     """Testa funcionalidades de geração de relatórios."""
@@ -1268,6 +1510,32 @@ class TestReportGeneration:
                 # Verifica se dados foram agrupados
                 assert len(app.dados_relatorio_agrupado) > 0
 
+    def test_montar_grupos_relatorio_usa_a_classificacao_do_banco(self, app_for_reports):
+        app = app_for_reports
+        ana = {"num": 1, "nome": "Ana", "idade": 31, "tempo_liquido": 1500.0}
+        bia = {"num": 2, "nome": "Bia", "idade": 33, "tempo_liquido": 1600.0}
+        caio = {"num": 3, "nome": "Caio", "idade": None, "tempo_liquido": 1400.0}
+        app.db.obter_grupos_classificacao.return_value = [
+            ("GERAL", "F", "30-34"), ("PCD", "M", None)]
+
+        def podio(sexo, categoria, faixa=None, limite=3):
+            if (sexo, categoria) == ("F", "GERAL"):
+                return [ana] if faixa is None else [ana, bia]
+            if (sexo, categoria) == ("M", "PCD"):
+                return [caio]
+            return []
+        app.db.obter_podio.side_effect = podio
+
+        grupos = app._montar_grupos_relatorio()
+
+        assert list(grupos) == ["Pódio Geral Masculino (Top 5)", "Pódio Geral Feminino (Top 5)",
+                                "Pódio PCD Masculino (Geral)", "GERAL Feminino 30-34"]
+        assert grupos["Pódio Geral Feminino (Top 5)"] == [(ana, 31)]
+        # Quem está no pódio geral não se repete na faixa etária.
+        assert grupos["GERAL Feminino 30-34"] == [(bia, 33)]
+        assert grupos["Pódio PCD Masculino (Geral)"] == [(caio, "-")]
+        app.db.obter_podio.assert_any_call("M", "PCD", limite=None)
+
     def test_gerar_dados_relatorio_sem_atletas(self, app_for_reports):
         """Testa a geração de relatório quando não há atletas finalizados."""
         app = app_for_reports
@@ -1400,6 +1668,7 @@ class TestUtilityMethods:
             app = AppCrono()
             app.logger = MagicMock()
             app.db = MagicMock()
+            app.servico_backup = MagicMock()
             app.is_bridge_connected = False
             app.current_state = MagicMock()  # Mock do estado atual
             
@@ -1420,7 +1689,8 @@ class TestUtilityMethods:
             # Verifica se a conexão foi fechada
             mock_stop.assert_called_once()
             
-            # Verifica se a aplicação foi destruída
+            # Verifica se o backup foi parado e a aplicação destruída
+            app.servico_backup.parar.assert_called_once()
             app.destroy.assert_called_once()
 
     def test_on_closing_sem_bridge_conectado(self, app_for_utils):
@@ -1514,22 +1784,22 @@ class TestUtilityMethods:
         from datetime import datetime
         app.current_state = EmCursoState()
         
-        # Mock do horário de largada no banco
-        horario_mock = "2025-06-22T10:00:00"
-        app.db.carregar_estado_corrida.return_value = horario_mock
+        # Mock do horário de largada já convertido pelo cache do banco
+        app.db.carregar_estado_datetime.return_value = datetime(2025, 6, 22, 10, 0, 0)
         
         with patch('crono_app.app.datetime') as mock_datetime, \
              patch('crono_app.app.formatar_timedelta', return_value="00:02:30.000") as mock_formatar:
             
             # Simula horário atual (10:02:30)
             mock_datetime.now.return_value = datetime(2025, 6, 22, 10, 2, 30)
-            mock_datetime.fromisoformat.return_value = datetime(2025, 6, 22, 10, 0, 0)
             
             # Chama o método
             app._atualizar_relogios()
             
-            # Verifica se carregou o horário de largada do banco
-            app.db.carregar_estado_corrida.assert_called_once_with('horario_largada')
+            # Verifica se o horário de largada veio do cache, sem ler o estado bruto
+            app.db.carregar_estado_datetime.assert_called_once_with('horario_largada')
+            app.db.carregar_estado_corrida.assert_not_called()
+            mock_formatar.assert_called_once_with(timedelta(minutes=2, seconds=30))
             
             # Verifica se o texto do cronômetro foi atualizado
             app.label_cronometro.configure.assert_called_once_with(text="00:02:30.000")
@@ -1,7 +1,5 @@
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-import socket
-import threading
+from unittest.mock import Mock, patch, MagicMock, ANY
 
 
 class TestRFIDBridgeAppInit:
@@ -20,11 +18,8 @@ class TestRFIDBridgeAppInit:
         
         # Verifica estado inicial
         assert app.server is None
-        assert app.server_thread is None
-        assert app.reader_thread is None
         assert app.is_running is False
         assert app.rfid_reader is None
-        assert app.clients == []
 
 
 class TestRFIDBridgeAppLogging:
@@ -64,9 +59,9 @@ class TestServerToggle:
 class TestServerStart:
     """Testa a funcionalidade de início do servidor."""
 
+    @patch('rfid_bridge.bridge.BridgeServer')
     @patch('rfid_bridge.bridge.RFIDReader')
-    @patch('socket.socket')
-    def test_start_server_success(self, mock_socket, mock_rfid_reader, app):
+    def test_start_server_success(self, mock_rfid_reader, mock_bridge_server, app):
         """Testa o início do servidor com sucesso."""
         app.serial_port_entry.get.return_value = "/dev/ttyUSB0"
         app.ip_entry.get.return_value = "0.0.0.0"
@@ -75,13 +70,13 @@ class TestServerStart:
         app.start_server()
         
         # Verifica se o leitor RFID foi criado e iniciado
-        mock_rfid_reader.assert_called_once_with("/dev/ttyUSB0")
+        mock_rfid_reader.assert_called_once_with(ANY, port="/dev/ttyUSB0")
         app.rfid_reader.start.assert_called_once()
         
-        # Verifica se o socket foi criado e configurado
-        mock_socket.assert_called_once_with(socket.AF_INET, socket.SOCK_STREAM)
-        app.server.bind.assert_called_once_with(("0.0.0.0", 9999))
-        app.server.listen.assert_called_once_with(5)
+        # Verifica se o servidor asyncio foi criado com o leitor e iniciado
+        mock_bridge_server.assert_called_once_with(app.rfid_reader, "0.0.0.0", 9999, on_log=app.log_queue.put,
+                                                   max_queue=1000, overflow="spill")
+        app.server.start.assert_called_once()
         
         # Verifica se o estado foi atualizado
         assert app.is_running is True
@@ -97,20 +92,23 @@ class TestServerStart:
         # Verifica se o estado permanece falso
         assert app.is_running is False
 
-    @patch('socket.socket')
-    def test_start_server_socket_error(self, mock_socket, app):
+    @patch('rfid_bridge.bridge.BridgeServer')
+    @patch('rfid_bridge.bridge.RFIDReader')
+    def test_start_server_socket_error(self, mock_rfid_reader, mock_bridge_server, app):
         """Testa a falha ao iniciar o servidor devido a um erro de socket."""
         app.serial_port_entry.get.return_value = "/dev/ttyUSB0"
         app.ip_entry.get.return_value = "0.0.0.0"
         app.port_entry.get.return_value = "9999"
         
-        # Simula erro no socket
-        mock_socket.side_effect = Exception("Erro de socket")
+        # Simula erro ao abrir o socket
+        mock_bridge_server.return_value.start.side_effect = OSError("Endereço em uso")
         
         app.start_server()
         
-        # Verifica se o estado permanece falso
+        # Verifica se o estado permanece falso e o leitor foi parado
         assert app.is_running is False
+        assert app.server is None
+        mock_rfid_reader.return_value.stop.assert_called_once()
 
 
 class TestServerStop:
@@ -122,23 +120,31 @@ class TestServerStop:
         app.is_running = True
         app.rfid_reader = MagicMock()
         app.server = MagicMock()
-        app.clients = [MagicMock(), MagicMock()]
         
         app.stop_server()
         
         # Verifica se o leitor foi parado
         app.rfid_reader.stop.assert_called_once()
         
-        # Verifica se o socket foi fechado
-        app.server.close.assert_called_once()
-        
-        # Verifica se os clientes foram fechados
-        for client in app.clients:
-            client.close.assert_called_once()
+        # Verifica se o servidor (e com ele os clientes) foi encerrado
+        app.server.stop.assert_called_once()
         
         # Verifica se o estado foi atualizado
         assert app.is_running is False
 
+    def test_stop_server_logs_messages_queued_during_shutdown(self, app):
+        """Avisos que o servidor enfileira ao parar aparecem no log antes do encerramento."""
+        app.is_running = True
+        app.rfid_reader = MagicMock()
+        app.server = MagicMock()
+        app.server.stop.side_effect = lambda: app.log_queue.put("Cliente desconectado")
+
+        with patch.object(app, 'log') as mock_log:
+            app.stop_server()
+
+        mensagens = [c.args[0] for c in mock_log.call_args_list]
+        assert mensagens.index("Cliente desconectado") < mensagens.index("Servidor encerrado e clientes desconectados.")
+
 
 class TestAppClosing:
     """Testa a funcionalidade de fechamento da aplicação."""
@@ -160,44 +166,47 @@ class TestAppClosing:
 class TestHelperMethods:
     """Testa métodos auxiliares da aplicação."""
 
-    def test_update_antenna_count(self, app):
-        """Testa a atualização do contador de antenas."""
-        # Mock do contador da antena 1
-        app.antenna_counters[1] = MagicMock()
-        app.antenna_counters[1].cget.return_value = "5"
+    def test_refresh_stats(self, app):
+        """Testa a atualização dos contadores de antenas e do resumo dos clientes."""
+        from rfid_bridge.client_channel import ClientStats
+        from rfid_bridge.server import BridgeStats
+        app.is_running = True
+        app.server = MagicMock()
+        app.server.stats_snapshot.return_value = BridgeStats(reads=8, reads_per_antenna={1: 6, 3: 2})
+        app.server.client_stats.return_value = [
+            ClientStats("A", queued=0, last_lag=0.002),
+            ClientStats("B", queued=40, dropped=3, last_lag=1.5),
+        ]
+        app.antenna_counters = {i: MagicMock() for i in range(1, 5)}
+        app.clients_label = MagicMock()
         
-        app.update_antenna_count(1)
+        app.refresh_stats()
         
-        # Verifica se o contador foi atualizado
         app.antenna_counters[1].configure.assert_called_with(text="6")
+        app.antenna_counters[3].configure.assert_called_with(text="2")
+        app.antenna_counters[2].configure.assert_not_called()
+        app.clients_label.configure.assert_called_with(
+            text="Clientes: 2 | maior atraso: 1500 ms (B) | na fila: 40 | descartadas: 3")
+        app.after.assert_called_with(500, app.refresh_stats)
+
+    def test_refresh_stats_writes_queued_server_messages(self, app):
+        """Avisos da thread do servidor só chegam ao log pelo ciclo do Tk, sem `after` fora dele."""
+        app.is_running = True
+        app.server = MagicMock()
+        app.server.client_stats.return_value = []
+        app.antenna_counters = {}
+        app.clients_label = MagicMock()
+        app.log_queue.put("Cliente conectado: A")
+        app.log_queue.put("Cliente conectado: B")
 
-    def test_broadcast_message(self, app):
-        """Testa o envio de mensagem para todos os clientes."""
-        # Cria clientes mock
-        client1 = MagicMock()
-        client2 = MagicMock()
-        app.clients = [client1, client2]
-        
-        test_message = "test_message"
-        app.broadcast(test_message)
-        
-        # Verifica se a mensagem foi enviada para todos os clientes
-        client1.sendall.assert_called_once_with(test_message.encode('utf-8'))
-        client2.sendall.assert_called_once_with(test_message.encode('utf-8'))
+        with patch.object(app, 'log') as mock_log:
+            app.refresh_stats()
 
-    def test_broadcast_removes_disconnected_client(self, app):
-        """Testa se clientes desconectados são removidos da lista."""
-        # Cria cliente que vai falhar
-        client_fail = MagicMock()
-        client_fail.sendall.side_effect = socket.error("Connection lost")
-        client_ok = MagicMock()
-        
-        app.clients = [client_fail, client_ok]
-        
-        test_message = "test_message"
-        app.broadcast(test_message)
-        
-        # Verifica se o cliente com falha foi removido
-        assert client_fail not in app.clients
-        assert client_ok in app.clients
-        client_fail.close.assert_called_once()
+        assert [c.args[0] for c in mock_log.call_args_list] == ["Cliente conectado: A", "Cliente conectado: B"]
+        assert app.log_queue.empty()
+        app.after.assert_called_once_with(500, app.refresh_stats)
+
+    def test_refresh_stats_stops_with_server(self, app):
+        app.is_running = False
+        app.refresh_stats()
+        app.after.assert_not_called()
@@ -0,0 +1,154 @@
+import socket
+import time
+
+import pytest
+
+from rfid_bridge.crossing_estimator import CrossingEstimator
+from rfid_bridge.rfid_reader import MockRFIDReader
+from rfid_bridge.server import BridgeServer
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condição não atingida a tempo")
+        time.sleep(0.01)
+
+
+def connect(server):
+    client = socket.create_connection(server.address, timeout=5)
+    return client, client.makefile("r", encoding="utf-8")
+
+
+def mock_reader(batches):
+    reader = MockRFIDReader("mock", read_delay=0, verbose=False)
+    reader.set_mock_data(batches)
+    return reader
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(reader, gap=0.05, **options):
+        server = BridgeServer(reader, "127.0.0.1", 0, estimator=CrossingEstimator(gap=gap), read_timeout=0.05,
+                              **options)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_crossings_fan_out_to_every_client(start_server):
+    reader = mock_reader([])
+    server = start_server(reader)
+    clients = [connect(server) for _ in range(3)]
+    wait_for(lambda: server.client_count == 3)
+
+    reader.set_mock_data([[(f"E{i}", 1 + i % 2, -50, 0) for i in range(20)]])
+
+    for _, stream in clients:
+        lines = [stream.readline().strip() for _ in range(20)]
+        assert sorted(line.split(",")[0] for line in lines) == sorted(f"E{i}" for i in range(20))
+    for client, stream in clients:
+        stream.close()
+        client.close()
+
+
+def test_pump_keeps_up_with_thousands_of_reads_per_second(start_server):
+    batches = [[(f"E{n % 500}", 1 + n % 4, -40 - n % 30, 0) for n in range(b * 250, (b + 1) * 250)]
+               for b in range(80)]
+    server = start_server(mock_reader(batches))
+
+    wait_for(lambda: server.stats.reads == 20000)
+
+    assert server.stats.reads_per_second > 1000
+    assert sum(server.stats.reads_per_antenna.values()) == 20000
+
+
+def test_stats_snapshot_is_safe_while_pumping(start_server):
+    batches = [[(f"E{n}", n, -40, 0) for n in range(b * 100, (b + 1) * 100)] for b in range(100)]
+    server = start_server(mock_reader(batches))
+
+    # Cada lote cria antenas novas no dicionário enquanto esta thread lê as cópias.
+    while server.stats.reads < 10000:
+        snapshot = server.stats_snapshot()
+        assert sum(count for _, count in snapshot.reads_per_antenna.items()) == snapshot.reads
+        assert snapshot.reads_per_antenna is not server.stats.reads_per_antenna
+        server.client_stats()
+
+    server.stop()
+    assert server.stats_snapshot().reads == 10000
+
+
+def test_stop_flushes_open_crossings_and_disconnects(start_server):
+    reader = mock_reader([])
+    server = start_server(reader, gap=60)
+    assert server.estimator.gap == 60
+    client, stream = connect(server)
+    wait_for(lambda: server.client_count == 1)
+    reader.set_mock_data([[("E1", 2, -45, 0), ("E1", 1, -60, 0)]])
+    wait_for(lambda: server.stats.reads == 2)
+
+    server.stop()
+
+    assert stream.readline().startswith("E1,2,-45,")
+    assert stream.readline() == ""
+    stream.close()
+    client.close()
+
+
+def test_client_disconnect_is_detected(start_server):
+    server = start_server(mock_reader([]))
+    client, stream = connect(server)
+    wait_for(lambda: server.client_count == 1)
+
+    stream.close()
+    client.close()
+
+    wait_for(lambda: server.client_count == 0)
+
+
+def test_start_fails_when_port_is_taken(start_server):
+    server = start_server(mock_reader([]))
+
+    with pytest.raises(OSError):
+        BridgeServer(mock_reader([]), "127.0.0.1", server.address[1]).start()
+
+
+def test_invalid_queue_options_fail_before_start():
+    with pytest.raises(ValueError):
+        BridgeServer(mock_reader([]), "127.0.0.1", 0, max_queue=0)
+    with pytest.raises(ValueError):
+        BridgeServer(mock_reader([]), "127.0.0.1", 0, overflow="block")
+
+
+def test_stalled_client_does_not_hold_back_the_others(start_server):
+    server = start_server(mock_reader([]), max_queue=8, overflow="drop_oldest")
+    stalled, stalled_stream = connect(server)
+    fast, _ = connect(server)
+    wait_for(lambda: server.client_count == 2)
+    message = "X" * 65535 + "\n"
+
+    # 200 x 64 KiB, em rajadas de 4: muito além dos buffers do socket do cliente que não lê.
+    for _ in range(50):
+        for _ in range(4):
+            server._loop.call_soon_threadsafe(server.broadcast, message)
+        received = 0
+        while received < 4 * len(message):
+            received += len(fast.recv(1 << 20))
+
+    def stats_of(client):
+        return next(s for s in server.client_stats() if s.address == str(client.getsockname()))
+
+    wait_for(lambda: stats_of(fast).sent == 200)
+    stalled_stats, fast_stats = stats_of(stalled), stats_of(fast)
+    assert fast_stats.dropped == 0
+    assert stalled_stats.dropped > 0 and stalled_stats.queued <= 8
+    stalled_stream.close()
+    stalled.close()
+    fast.close()
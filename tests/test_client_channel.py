@@ -0,0 +1,166 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from rfid_bridge.client_channel import WRITE_BATCH, ClientChannel, SpillFile
+
+
+class StalledWriter:
+    """StreamWriter falso cujo drain só termina quando `gate` é liberado."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.gate = asyncio.Event()
+        self.transport = Mock()
+        self.closed = False
+
+    def get_extra_info(self, name):
+        return ("10.0.0.2", 5000)
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        await self.gate.wait()
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def messages(*numbers):
+    return b"".join(f"m{n}\n".encode() for n in numbers)
+
+
+def test_drop_oldest_keeps_the_newest_messages():
+    async def scenario():
+        writer = StalledWriter()
+        channel = ClientChannel(writer, max_queue=3, overflow="drop_oldest")
+        channel.offer(b"m0\n")
+        await settle()  # m0 já está no socket, aguardando o drain
+        for n in range(1, 6):
+            channel.offer(f"m{n}\n".encode())
+
+        assert (channel.queued, channel.stats.dropped) == (3, 2)
+
+        writer.gate.set()
+        await settle()
+        assert bytes(writer.data) == messages(0, 3, 4, 5)
+        stats = channel.snapshot()
+        assert (stats.sent, stats.queued) == (4, 0)
+        assert stats.max_lag >= stats.last_lag > 0
+        channel.close()
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_drops_the_stalled_client():
+    async def scenario():
+        writer = StalledWriter()
+        log = Mock()
+        channel = ClientChannel(writer, max_queue=2, overflow="disconnect", on_log=log)
+        for n in range(4):
+            channel.offer(f"m{n}\n".encode())
+            await settle()
+
+        assert channel.closed and channel.snapshot().disconnected
+        writer.transport.abort.assert_called_once()
+        assert "fila cheia" in log.call_args.args[0]
+        channel.offer(b"depois\n")
+        assert channel.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_spill_to_disk_delivers_everything_in_order(tmp_path):
+    async def scenario():
+        writer = StalledWriter()
+        channel = ClientChannel(writer, max_queue=2, overflow="spill", spill_dir=str(tmp_path))
+        channel.offer(b"m0\n")
+        await settle()
+        for n in range(1, 10):
+            channel.offer(f"m{n}\n".encode())
+        # Com algo em disco, até as mensagens que caberiam na memória vão para o arquivo.
+        await settle()
+
+        assert (channel.queued, channel.stats.spilled, channel.stats.dropped) == (9, 7, 0)
+
+        writer.gate.set()
+        await settle()
+        channel.offer(b"m10\n")
+        await settle()
+        assert bytes(writer.data) == messages(*range(11))
+        assert channel.queued == 0
+        channel.close()
+
+    asyncio.run(scenario())
+
+
+def test_spilled_backlog_is_replayed_in_write_batches(tmp_path):
+    async def scenario():
+        writer = StalledWriter()
+        writer.write = Mock(side_effect=writer.write)
+        channel = ClientChannel(writer, max_queue=1, overflow="spill", spill_dir=str(tmp_path))
+        channel.offer(b"m0\n")
+        await settle()
+        for n in range(1, 2 * WRITE_BATCH + 2):
+            channel.offer(f"m{n}\n".encode())
+        await settle()
+        assert channel.stats.spilled == 2 * WRITE_BATCH
+
+        writer.gate.set()
+        await settle()
+
+        # m0, a mensagem em memória e o arquivo em dois lotes, não uma escrita por mensagem.
+        assert writer.write.call_count == 4
+        assert bytes(writer.data) == messages(*range(2 * WRITE_BATCH + 2))
+        assert channel.queued == 0
+        channel.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_flushes_pending_messages():
+    async def scenario():
+        writer = StalledWriter()
+        writer.gate.set()
+        channel = ClientChannel(writer)
+        channel.offer(b"m0\n")
+
+        await channel.aclose()
+
+        assert bytes(writer.data) == b"m0\n" and writer.closed
+        writer.transport.abort.assert_not_called()
+
+    asyncio.run(scenario())
+
+
+def test_spill_file_is_fifo_and_reclaims_space(tmp_path):
+    spill = SpillFile(str(tmp_path))
+    spill.append(1.0, b"a")
+    spill.append(2.0, b"bc")
+
+    assert spill.pop() == (1.0, b"a")
+    spill.append(3.0, b"d")
+    assert [spill.pop(), spill.pop(), spill.pop()] == [(2.0, b"bc"), (3.0, b"d"), None]
+    assert spill._write_pos == 0
+    spill.close()
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        ClientChannel(StalledWriter(), overflow="block")
+
+
+@pytest.mark.parametrize("max_queue", [0, -1])
+def test_queue_must_hold_at_least_one_message(max_queue):
+    with pytest.raises(ValueError):
+        ClientChannel(StalledWriter(), max_queue=max_queue, overflow="drop_oldest")
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import logging
+import sys
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from crono_app.business_logic import GerenciadorDeCorrida
+from crono_app.columnar_io import eh_arquivo_colunar, importar_pyarrow
+from crono_app.custom_exceptions import CabecalhoInvalidoError
+from crono_app.database_manager import DatabaseManager
+
+DATA_EVENTO = date(2025, 6, 22)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "colunar.db"))
+    manager.setup_database()
+    manager.definir_data_evento(DATA_EVENTO)
+    yield manager
+    manager.fechar()
+
+
+@pytest.fixture
+def gerenciador(manager):
+    return GerenciadorDeCorrida(manager, logging.getLogger())
+
+
+class TestSemPyarrow:
+    """O formato colunar é opcional: sem pyarrow, só ele deixa de funcionar."""
+
+    def test_extensoes_reconhecidas(self):
+        assert eh_arquivo_colunar("inscritos.PARQUET")
+        assert eh_arquivo_colunar("inscritos.feather")
+        assert not eh_arquivo_colunar("inscritos.csv")
+
+    def test_mensagem_de_instalacao(self):
+        with patch.dict(sys.modules, {"pyarrow": None}):
+            with pytest.raises(ImportError, match="pip install pyarrow"):
+                importar_pyarrow()
+
+
+class TestImportacaoExportacaoColunar:
+    """Testes de ida e volta com pyarrow instalado."""
+
+    @pytest.fixture(autouse=True)
+    def pa(self):
+        return pytest.importorskip("pyarrow")
+
+    def _escrever_parquet(self, pa, caminho, **colunas):
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(colunas), str(caminho))
+
+    def test_importa_colunas_tipadas(self, pa, gerenciador, manager, tmp_path):
+        caminho = tmp_path / "inscritos.parquet"
+        self._escrever_parquet(
+            pa, caminho,
+            NUM=pa.array([1, 2, 3, 2], pa.int32()),
+            nome=["Ana", "Bruno", "Carla", "Repetido"],
+            sexo=["F", "M", "X", "M"],
+            data_nascimento=pa.array([date(1990, 1, 1), date(1985, 5, 20), date(2000, 1, 1), date(1990, 1, 1)]),
+            modalidade=["5km", "10km", "5km", "5km"])
+
+        progresso = []
+        sucesso, erros = gerenciador.carregar_atletas_colunar(str(caminho), DATA_EVENTO, progresso=progresso.append,
+                                                              tamanho_bloco=2)
+
+        assert sucesso == 2
+        assert erros[0].startswith("Linha 4: Atleta #3 - Sexo inválido")
+        assert erros[1] == "Linha 5: Erro inesperado - Número de atleta duplicado no arquivo: 2"
+        atleta = manager.obter_atleta_por_id(2)
+        assert (atleta['data_nascimento'], atleta['categoria'], atleta['idade']) == ('20/05/1985', 'GERAL', 40)
+        assert progresso[-1].percentual == 100.0
+
+    def test_colunas_obrigatorias_ausentes(self, pa, gerenciador, tmp_path):
+        caminho = tmp_path / "incompleto.parquet"
+        self._escrever_parquet(pa, caminho, num=[1], nome=["Ana"])
+
+        with pytest.raises(CabecalhoInvalidoError, match="sexo"):
+            gerenciador.carregar_atletas_colunar(str(caminho), DATA_EVENTO)
+
+    @pytest.mark.parametrize("extensao", [".parquet", ".arrow"])
+    def test_exportacao_ida_e_volta(self, pa, gerenciador, manager, tmp_path, extensao):
+        manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 6)])
+        manager.registrar_chegada(4, "2025-06-22T10:00:00", 1500.0)
+        manager.registrar_chegada(2, "2025-06-22T10:01:00", 1560.0)
+        caminho = tmp_path / f"resultados{extensao}"
+
+        assert manager.exportar_resultados_colunar(str(caminho), tamanho_lote=2) == 5
+
+        if extensao == ".parquet":
+            import pyarrow.parquet as pq
+            tabela = pq.read_table(str(caminho))
+        else:
+            tabela = pa.ipc.open_file(str(caminho)).read_all()
+        assert tabela.column("num").to_pylist() == [4, 2, 1, 3, 5]
+        assert tabela.column("pos_geral").to_pylist() == [1, 2, None, None, None]
+        assert tabela.schema.field("data_nascimento").type == pa.date32()
+        assert tabela.column("data_nascimento")[0].as_py() == date(1990, 1, 1)
+
+        # O arquivo exportado serve de entrada para outro evento.
+        outro = DatabaseManager(str(tmp_path / "outro.db"))
+        outro.setup_database()
+        sucesso, erros = GerenciadorDeCorrida(outro, logging.getLogger()).carregar_atletas_colunar(str(caminho), DATA_EVENTO)
+        assert (sucesso, erros) == (5, [])
+        assert outro.obter_atleta_por_id(4)['tempo_liquido'] is None
+        outro.fechar()
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from rfid_bridge.crossing_estimator import Crossing, CrossingEstimator
+
+
+def simulate_crossing(crossing_time, seed=7, interval=0.025, noise=1.0):
+    """Leituras de um chip cruzando o pórtico: RSSI inteiro, com ruído, alternando duas antenas."""
+    rng = random.Random(seed)
+    reads = []
+    t = crossing_time - 0.9
+    antenna = 1
+    while t < crossing_time + 0.9:
+        rssi = round(-40 - 30 * (t - crossing_time) ** 2 + rng.uniform(-noise, noise))
+        reads.append(("E200", antenna, rssi, t + rng.uniform(0, 0.004)))
+        antenna = 3 - antenna
+        t += interval
+    return reads
+
+
+@pytest.mark.parametrize("method", ["peak", "parabola"])
+@pytest.mark.parametrize("seed", range(5))
+def test_crossing_time_within_100_ms(method, seed):
+    crossing_time = 1000.437
+    estimator = CrossingEstimator(gap=1.0, method=method)
+    for read in simulate_crossing(crossing_time, seed=seed):
+        assert estimator.add(*read) == []
+
+    (crossing,) = estimator.expire(crossing_time + 5)
+
+    assert crossing.epc == "E200"
+    assert crossing.reads == len(simulate_crossing(crossing_time, seed=seed))
+    assert abs(crossing.timestamp - crossing_time) < 0.1
+
+
+def test_passage_closes_after_gap_and_tags_are_independent():
+    estimator = CrossingEstimator(gap=0.5, method="peak")
+    estimator.add("A", 1, -60, 10.0)
+    estimator.add("A", 2, -45, 10.2)
+    estimator.add("B", 1, -50, 10.3)
+    estimator.add("A", 1, -55, 10.4)
+
+    assert estimator.expire(10.75) == []
+    assert estimator.add("C", 1, -70, 10.85) == [Crossing("B", 1, -50, 10.3, 1)]
+    assert estimator.expire(10.9) == [Crossing("A", 2, -45, 10.2, 3)]
+    assert len(estimator) == 1
+
+
+def test_plateau_and_reads_without_rssi():
+    estimator = CrossingEstimator(method="parabola")
+    for t in (1.0, 1.1, 1.2):
+        estimator.add("A", 1, -40, t)
+    estimator.add("B", 4, None, 1.0)
+    estimator.add("B", 4, None, 1.6)
+
+    crossings = {c.epc: c for c in estimator.flush()}
+
+    # Ajuste sem máximo (a >= 0): fica o meio do patamar.
+    assert crossings["A"].timestamp == pytest.approx(1.1)
+    assert crossings["B"] == Crossing("B", 4, None, 1.3, 2)
+    assert len(estimator) == 0
+
+
+def test_ring_buffer_keeps_memory_bounded():
+    estimator = CrossingEstimator(buffer_size=8)
+    for i in range(1000):
+        estimator.add("A", 1, -50, i * 0.01)
+
+    assert len(estimator._tracks["A"].samples) == 8
+    assert estimator.flush()[0].reads == 1000
+
+
+def test_to_line_and_invalid_method():
+    assert Crossing("E200", 2, -41.5, 1750000000.1234, 12).to_line() == "E200,2,-41.5,1750000000.123"
+    assert Crossing("E200", 2, None, 1.0, 1).to_line() == "E200,2,,1.000"
+    with pytest.raises(ValueError):
+        CrossingEstimator(method="media")
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 import pytest
 import sqlite3
+import threading
+from datetime import date, datetime
 from unittest.mock import Mock, patch
 
-from crono_app.database_manager import DatabaseManager
+from crono_app.database_manager import DatabaseManager, GerenciadorDeConexoes, AlteracoesDB
+from crono_app.db_writer import EscritorDeBanco
 
 # Fixture para criar um DatabaseManager com um banco de dados em memória para cada teste.
 # A chave aqui é manter a mesma conexão para toda a duração do teste.
@@ -111,7 +114,7 @@ class TestDatabaseOperations:
         atletas = [(1, 'Observado', 'M', '1999-12-31', '5km', 'GERAL')]
         db_manager.adicionar_atletas_em_lote(atletas)
 
-        mock_observer.update.assert_called_once_with(db_manager)
+        mock_observer.update.assert_called_once_with(db_manager, AlteracoesDB(atletas_inseridos={1}))
 
     def test_obter_atleta_por_id_existente(self, db_manager):
         """Verifica se um atleta existente é retornado corretamente."""
@@ -162,7 +165,7 @@ class TestDatabaseOperations:
         db_manager.attach(mock_observer)
 
         db_manager.atualizar_tempo_atleta(25, "2025-06-22T11:00:00", 2000.0)
-        mock_observer.update.assert_called_once_with(db_manager)
+        mock_observer.update.assert_called_once_with(db_manager, AlteracoesDB(atletas_atualizados={25}))
 
     def test_obter_todos_atletas_retorna_lista_vazia(self, db_manager):
         """Verifica se uma lista vazia é retornada se não houver atletas."""
@@ -199,7 +202,7 @@ class TestDatabaseOperations:
 
         assert atletas == []
         assert status is None
-        mock_observer.update.assert_called_once_with(db_manager)
+        mock_observer.update.assert_called_once_with(db_manager, AlteracoesDB(recarga_total=True))
 
     def test_salvar_e_carregar_estado_corrida(self, db_manager):
         """Verifica se o estado da corrida é salvo e carregado corretamente."""
@@ -237,3 +240,957 @@ class TestCategoriaCRUD:
         db_manager.remover_categoria(categoria[0])
         categorias = db_manager.listar_categorias()
         assert len(categorias) == 0
+
+
+class TestNotificacoesDeAlteracao:
+    """Testes para os eventos tipados entregues aos observadores."""
+
+    def test_salvar_estado_informa_chave_alterada(self, db_manager):
+        mock_observer = Mock()
+        db_manager.attach(mock_observer)
+        db_manager.salvar_estado_corrida('estado_prova', 'FINALIZADO')
+        mock_observer.update.assert_called_once_with(db_manager, AlteracoesDB(chaves_estado={'estado_prova'}))
+
+    def test_crud_de_categorias_informa_categorias(self, db_manager):
+        mock_observer = Mock()
+        db_manager.attach(mock_observer)
+        db_manager.adicionar_categoria("JUVENIL")
+        mock_observer.update.assert_called_once_with(db_manager, AlteracoesDB(categorias=True))
+
+    def test_atualizar_dados_atleta_preserva_tempo_e_notifica(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(3, 'Nome Antigo', 'M', '01/01/1990', '5km', 'GERAL')])
+        db_manager.registrar_chegada(3, "2025-06-22T10:30:00", 1800.0)
+        mock_observer = Mock()
+        db_manager.attach(mock_observer)
+
+        db_manager.atualizar_dados_atleta(3, 'Nome Novo', 'f', '02/02/1991', 'pcd', '10km')
+
+        atleta = db_manager.obter_atleta_por_id(3)
+        assert (atleta['nome'], atleta['sexo'], atleta['categoria']) == ('Nome Novo', 'F', 'PCD')
+        assert atleta['tempo_liquido'] == 1800.0
+        mock_observer.update.assert_called_once_with(db_manager, AlteracoesDB(atletas_atualizados={3}))
+
+    def test_obter_atletas_por_numeros(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 6)])
+        assert sorted(r['num'] for r in db_manager.obter_atletas_por_numeros({2, 4})) == [2, 4]
+        assert db_manager.obter_atletas_por_numeros([]) == []
+
+    def test_notificacoes_dentro_da_janela_sao_coalescidas(self, tmp_path):
+        manager = DatabaseManager(str(tmp_path / "janela.db"), janela_notificacao=60)
+        manager.setup_database()
+        manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 4)])
+        manager.descarregar_notificacoes()
+        mock_observer = Mock()
+        manager.attach(mock_observer)
+
+        manager.registrar_chegada(1, "2025-06-22T10:00:01", 1.0)
+        manager.registrar_chegada(2, "2025-06-22T10:00:02", 2.0)
+        manager.salvar_estado_corrida('estado_prova', 'EM_CURSO')
+        mock_observer.update.assert_not_called()
+
+        manager.descarregar_notificacoes()
+        mock_observer.update.assert_called_once_with(
+            manager, AlteracoesDB(atletas_atualizados={1, 2}, chaves_estado={'estado_prova'})
+        )
+        manager.fechar()
+
+    def test_grupo_do_escritor_gera_um_unico_evento(self, tmp_path):
+        manager = DatabaseManager(str(tmp_path / "grupo.db"))
+        manager.setup_database()
+        manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 4)])
+        mock_observer = Mock()
+        manager.attach(mock_observer)
+
+        escritor = EscritorDeBanco(manager._get_connection, manager._ao_confirmar_grupo)
+        # Enfileira antes de iniciar a thread para garantir que formem um único grupo
+        futuros = [
+            escritor.submeter(lambda c, n=n: c.execute("UPDATE atletas SET tempo_liquido = ? WHERE num = ?", (float(n), n)),
+                              "registrar chegada", AlteracoesDB(atletas_atualizados={n}))
+            for n in range(1, 4)
+        ]
+        escritor.iniciar()
+        for futuro in futuros:
+            futuro.result(timeout=5)
+        escritor.parar()
+        manager.fechar()
+
+        mock_observer.update.assert_called_once_with(manager, AlteracoesDB(atletas_atualizados={1, 2, 3}))
+
+
+class TestCacheEstadoCorrida:
+    """Testes para o espelho em memória de 'estado_corrida'."""
+
+    def test_leituras_repetidas_nao_acessam_o_banco(self, db_manager):
+        db_manager.salvar_estado_corrida('horario_largada', "2025-06-22T09:00:00")
+        db_manager.carregar_estado_corrida('horario_largada')  # aquece o cache
+
+        with patch.object(db_manager, '_get_connection', side_effect=AssertionError("acesso ao disco")):
+            for _ in range(100):
+                assert db_manager.carregar_estado_corrida('horario_largada') == "2025-06-22T09:00:00"
+                assert db_manager.carregar_estado_datetime('horario_largada') == datetime(2025, 6, 22, 9, 0, 0)
+
+    def test_salvar_atualiza_cache_e_valor_convertido(self, db_manager):
+        db_manager.salvar_estado_corrida('horario_largada', "2025-06-22T09:00:00")
+        assert db_manager.carregar_estado_datetime('horario_largada') == datetime(2025, 6, 22, 9, 0, 0)
+
+        db_manager.salvar_estado_corrida('horario_largada', "2025-06-22T09:05:00")
+        assert db_manager.carregar_estado_datetime('horario_largada') == datetime(2025, 6, 22, 9, 5, 0)
+
+    def test_cache_carrega_valores_ja_persistidos(self, db_manager):
+        with db_manager._get_connection() as conn:
+            conn.execute("INSERT INTO estado_corrida (chave, valor) VALUES ('estado_prova', 'FINALIZADO')")
+            conn.commit()
+        assert db_manager.carregar_estado_corrida('estado_prova') == 'FINALIZADO'
+
+    def test_reiniciar_prova_invalida_cache(self, db_manager):
+        db_manager.salvar_estado_corrida('horario_largada', "2025-06-22T09:00:00")
+        assert db_manager.carregar_estado_datetime('horario_largada') is not None
+
+        db_manager.reiniciar_prova()
+
+        assert db_manager.carregar_estado_corrida('horario_largada') is None
+        assert db_manager.carregar_estado_datetime('horario_largada') is None
+
+    def test_valor_nao_iso_retorna_none(self, db_manager):
+        db_manager.salvar_estado_corrida('horario_largada', "ontem")
+        assert db_manager.carregar_estado_datetime('horario_largada') is None
+
+
+class TestJournalChegadas:
+    """Testes para o journal append-only de chegadas."""
+
+    def test_registrar_chegada_grava_journal_e_deriva_resultado(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(7, 'Atleta Sete', 'M', '01/01/1990', '5km', 'GERAL')])
+        db_manager.registrar_chegada(7, "2025-06-22T10:30:00", 1800.0, origem="RFID", tag="E200A1", antena=2)
+
+        chegadas = db_manager.obter_chegadas(7)
+        assert len(chegadas) == 1
+        assert chegadas[0]['tag'] == "E200A1"
+        assert chegadas[0]['origem'] == "RFID"
+        assert chegadas[0]['antena'] == 2
+        assert db_manager.obter_atleta_por_id(7)['tempo_liquido'] == 1800.0
+
+    def test_atualizar_tempo_atleta_tambem_registra_no_journal(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(8, 'Atleta Oito', 'F', '01/01/1990', '5km', 'GERAL')])
+        db_manager.atualizar_tempo_atleta(8, "2025-06-22T10:31:00", 1860.0)
+        assert [c['origem'] for c in db_manager.obter_chegadas(8)] == ["MANUAL"]
+
+    def test_reconstruir_resultados_reaplica_ultima_chegada(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([
+            (1, 'Um', 'M', '01/01/1990', '5km', 'GERAL'),
+            (2, 'Dois', 'F', '01/01/1990', '5km', 'GERAL'),
+        ])
+        db_manager.registrar_chegada(1, "2025-06-22T10:30:00", 1800.0)
+        db_manager.registrar_chegada(1, "2025-06-22T10:30:05", 1805.0)
+        db_manager.registrar_chegada(2, "2025-06-22T10:40:00", 2400.0)
+
+        # Simula a perda dos tempos (ex.: reimportação com INSERT OR REPLACE)
+        db_manager.adicionar_atletas_em_lote([(1, 'Um', 'M', '01/01/1990', '5km', 'GERAL')])
+        assert db_manager.obter_atleta_por_id(1)['tempo_liquido'] is None
+
+        db_manager.reconstruir_resultados_do_journal()
+        assert db_manager.obter_atleta_por_id(1)['tempo_liquido'] == 1805.0
+        assert db_manager.obter_atleta_por_id(2)['tempo_liquido'] == 2400.0
+
+    def test_atualizar_tempos_em_lote_aplica_todas_as_chegadas(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 51)])
+        chegadas = [(n, f"2025-06-22T10:{n:02d}:00", 1000.0 + n, f"TAG{n}", 1) for n in range(1, 51)]
+
+        futuro = db_manager.atualizar_tempos_em_lote(chegadas, origem="RFID")
+
+        assert futuro.result() == 50
+        assert db_manager.obter_atleta_por_id(42)['tempo_liquido'] == 1042.0
+        journal = db_manager.obter_chegadas()
+        assert len(journal) == 50
+        assert journal[0]['tag'] == "TAG1" and journal[0]['origem'] == "RFID"
+
+    def test_atualizar_tempos_em_lote_emite_uma_notificacao_com_os_numeros(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 4)])
+        mock_observer = Mock()
+        db_manager.attach(mock_observer)
+
+        db_manager.atualizar_tempos_em_lote([(1, "2025-06-22T10:00:01", 1.0), (3, "2025-06-22T10:00:03", 3.0)])
+
+        mock_observer.update.assert_called_once_with(db_manager, AlteracoesDB(atletas_atualizados={1, 3}))
+
+    def test_reiniciar_prova_descarta_journal(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(1, 'Um', 'M', '01/01/1990', '5km', 'GERAL')])
+        db_manager.registrar_chegada(1, "2025-06-22T10:30:00", 1800.0)
+        db_manager.reiniciar_prova()
+        assert db_manager.obter_chegadas() == []
+
+
+class TestVersionamentoAtletas:
+    """Testes para as consultas incrementais por versão de linha."""
+
+    def test_leitor_do_zero_recebe_todos_os_atletas(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 4)])
+
+        alterados, removidos, versao = db_manager.obter_atletas_alterados_desde(0)
+
+        assert sorted(r['num'] for r in alterados) == [1, 2, 3]
+        assert removidos == []
+        assert versao == db_manager.versao_atual() == 3
+
+    def test_retorna_apenas_o_que_mudou_desde_a_versao(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 4)])
+        _, _, versao = db_manager.obter_atletas_alterados_desde(0)
+
+        db_manager.registrar_chegada(2, "2025-06-22T10:30:00", 1800.0)
+        alterados, removidos, nova_versao = db_manager.obter_atletas_alterados_desde(versao)
+
+        assert [r['num'] for r in alterados] == [2]
+        assert alterados[0]['tempo_liquido'] == 1800.0
+        assert removidos == []
+        assert nova_versao > versao
+        assert db_manager.obter_atletas_alterados_desde(nova_versao) == ([], [], nova_versao)
+
+    def test_remocoes_geram_tombstones(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(1, 'Um', 'M', '01/01/1990', '5km', 'GERAL')])
+        _, _, versao = db_manager.obter_atletas_alterados_desde(0)
+
+        db_manager.reiniciar_prova()
+        alterados, removidos, _ = db_manager.obter_atletas_alterados_desde(versao)
+
+        assert alterados == []
+        assert removidos == [1]
+
+    def test_reinsercao_apaga_tombstone(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([(1, 'Um', 'M', '01/01/1990', '5km', 'GERAL')])
+        db_manager.reiniciar_prova()
+        db_manager.adicionar_atletas_em_lote([(1, 'Um de novo', 'M', '01/01/1990', '5km', 'GERAL')])
+
+        alterados, removidos, _ = db_manager.obter_atletas_alterados_desde(0)
+
+        assert [r['nome'] for r in alterados] == ['Um de novo']
+        assert removidos == []
+
+    def test_banco_antigo_recebe_coluna_versao(self, db_manager_no_setup):
+        manager = db_manager_no_setup
+        conn = manager._get_connection()
+        conn.execute("""CREATE TABLE atletas (num INTEGER PRIMARY KEY, nome TEXT NOT NULL, sexo TEXT NOT NULL,
+                        data_nascimento TEXT NOT NULL, modalidade TEXT NOT NULL, tempo_absoluto_chegada TEXT,
+                        tempo_liquido REAL, categoria TEXT NOT NULL DEFAULT 'GERAL')""")
+        conn.execute("INSERT INTO atletas (num, nome, sexo, data_nascimento, modalidade) VALUES (5, 'Antigo', 'F', '01/01/1980', '5km')")
+        conn.commit()
+
+        manager.setup_database()
+        alterados, _, versao = manager.obter_atletas_alterados_desde(0)
+
+        assert [r['num'] for r in alterados] == [5]
+        assert versao == 1
+        manager.adicionar_atletas_em_lote([(6, 'Novo', 'M', '01/01/1990', '5km', 'GERAL')])
+        assert manager.versao_atual() == 2
+
+
+class TestIndicesDeConsulta:
+    """Testes para os índices e a reescrita das consultas da tabela e dos resultados."""
+
+    @pytest.fixture
+    def manager_com_tempos(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([
+            (1, 'Carla', 'F', '01/01/1990', '5km', 'GERAL'),
+            (2, 'Bruno', 'M', '01/01/1985', '10km', 'GERAL'),
+            (3, 'Ana', 'F', '01/01/1995', '5km', 'PCD'),
+            (4, 'Diego', 'M', '01/01/1980', '5km', 'GERAL'),
+        ])
+        db_manager.registrar_chegada(2, "2025-06-22T10:30:00", 1800.0)
+        db_manager.registrar_chegada(4, "2025-06-22T10:20:00", 1200.0)
+        return db_manager
+
+    @pytest.mark.parametrize("coluna", ["Nº", "Nome", "Sexo", "Idade", "Categoria", "Modalidade", "Tempo Bruto"])
+    @pytest.mark.parametrize("reverso", [False, True])
+    def test_consultas_da_tabela_nao_ordenam_em_memoria(self, db_manager, coluna, reverso):
+        sql = ("EXPLAIN QUERY PLAN SELECT * FROM atletas WHERE evento_id = ? "
+               f"ORDER BY {DatabaseManager._clausula_ordem(coluna, reverso)}")
+        plano = " | ".join(linha[3] for linha in db_manager._get_connection().execute(sql, (1,)))
+        assert "USE TEMP B-TREE" not in plano
+
+    def test_consulta_de_classificados_usa_indice(self, db_manager):
+        sql = ("EXPLAIN QUERY PLAN SELECT num FROM atletas WHERE evento_id = ? "
+               "AND categoria = ? AND sexo = ? AND tempo_liquido IS NOT NULL ORDER BY tempo_liquido, num")
+        plano = " | ".join(linha[3] for linha in db_manager._get_connection().execute(sql, (1, 'GERAL', 'M')))
+        assert "idx_atletas_categoria_sexo_tempo" in plano
+        assert "USE TEMP B-TREE" not in plano
+
+    def test_ordenacao_por_tempo_deixa_sem_tempo_no_final(self, manager_com_tempos):
+        crescente = [r['num'] for r in manager_com_tempos.obter_todos_atletas_para_tabela("Tempo Bruto", False)]
+        decrescente = [r['num'] for r in manager_com_tempos.obter_todos_atletas_para_tabela("Tempo Bruto", True)]
+        assert crescente == [4, 2, 1, 3]
+        assert decrescente == [2, 4, 3, 1]
+
+    def test_aceita_rotulo_da_ui_e_nome_da_coluna(self, manager_com_tempos):
+        por_rotulo = [r['num'] for r in manager_com_tempos.obter_todos_atletas_para_tabela("Nome", False)]
+        por_coluna = [r['num'] for r in manager_com_tempos.obter_todos_atletas_para_tabela("nome", False)]
+        assert por_rotulo == por_coluna == [3, 2, 1, 4]
+
+    def test_obter_classificados_filtra_e_ordena_por_tempo(self, manager_com_tempos):
+        classificados = manager_com_tempos.obter_classificados('m', 'geral')
+        assert [r['num'] for r in classificados] == [4, 2]
+        assert [r['num'] for r in manager_com_tempos.obter_classificados('M', 'GERAL', limite=1)] == [4]
+        assert manager_com_tempos.obter_classificados('F', 'GERAL') == []
+
+
+class TestIdadePreCalculada:
+    """Testes para as colunas de idade e faixa etária calculadas na importação."""
+
+    def test_importacao_calcula_idade_e_faixa(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.adicionar_atletas_em_lote([
+            (1, 'Um', 'M', '23/06/1990', '5km', 'GERAL'),
+            (2, 'Dois', 'F', '1960-01-01', '5km', 'GERAL'),
+        ])
+
+        um = db_manager.obter_atleta_por_id(1)
+        assert (um['data_nascimento_iso'], um['idade'], um['faixa_etaria']) == ('1990-06-23', 34, '30-34')
+        dois = db_manager.obter_atleta_por_id(2)
+        assert (dois['idade'], dois['faixa_etaria']) == (65, '65-69')
+
+    def test_data_invalida_deixa_campos_nulos(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.adicionar_atletas_em_lote([(1, 'Um', 'M', '31/02/1990', '5km', 'GERAL')])
+        atleta = db_manager.obter_atleta_por_id(1)
+        assert (atleta['data_nascimento_iso'], atleta['idade'], atleta['faixa_etaria']) == (None, None, None)
+
+    def test_mudar_data_do_evento_recalcula_apenas_quando_muda(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.adicionar_atletas_em_lote([(1, 'Um', 'M', '23/06/1990', '5km', 'GERAL')])
+
+        assert db_manager.definir_data_evento(date(2025, 6, 22)) is None
+        futuro = db_manager.definir_data_evento(date(2025, 6, 23))
+
+        assert futuro.result() == 1
+        assert db_manager.obter_atleta_por_id(1)['idade'] == 35
+        assert db_manager.carregar_estado_corrida('data_evento') == '2025-06-23'
+
+    def test_ordenacao_por_idade_no_sql(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.adicionar_atletas_em_lote([
+            (1, 'Um', 'M', '01/01/2000', '5km', 'GERAL'),
+            (2, 'Dois', 'M', '01/01/1970', '5km', 'GERAL'),
+            (3, 'Tres', 'M', '01/01/1985', '5km', 'GERAL'),
+        ])
+        assert [r['num'] for r in db_manager.obter_todos_atletas_para_tabela("Idade", True)] == [2, 3, 1]
+
+    def test_podio_por_faixa_etaria_usa_indice(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.adicionar_atletas_em_lote([
+            (1, 'Um', 'M', '01/01/1991', '5km', 'GERAL'),
+            (2, 'Dois', 'M', '01/01/1992', '5km', 'GERAL'),
+            (3, 'Tres', 'M', '01/01/1970', '5km', 'GERAL'),
+        ])
+        db_manager.atualizar_tempos_em_lote([(1, "t", 1500.0), (2, "t", 1400.0), (3, "t", 1000.0)])
+
+        assert [r['num'] for r in db_manager.obter_classificados('M', 'GERAL', faixa_etaria='30-34')] == [2, 1]
+        sql = ("EXPLAIN QUERY PLAN SELECT num FROM atletas WHERE evento_id = ? AND categoria = ? AND sexo = ? "
+               "AND faixa_etaria = ? AND tempo_liquido IS NOT NULL ORDER BY tempo_liquido, num")
+        plano = " | ".join(linha[3] for linha in db_manager._get_connection().execute(sql, (1, 'GERAL', 'M', '30-34')))
+        assert "idx_atletas_categoria_sexo_faixa_tempo" in plano
+        assert "USE TEMP B-TREE" not in plano
+
+    def test_banco_antigo_recebe_colunas_de_idade(self, db_manager_no_setup):
+        manager = db_manager_no_setup
+        conn = manager._get_connection()
+        conn.execute("""CREATE TABLE atletas (num INTEGER PRIMARY KEY, nome TEXT NOT NULL, sexo TEXT NOT NULL,
+                        data_nascimento TEXT NOT NULL, modalidade TEXT NOT NULL, tempo_absoluto_chegada TEXT,
+                        tempo_liquido REAL, categoria TEXT NOT NULL DEFAULT 'GERAL')""")
+        conn.execute("CREATE TABLE estado_corrida (chave TEXT PRIMARY KEY, valor TEXT)")
+        conn.execute("INSERT INTO estado_corrida VALUES ('data_evento', '2025-06-22')")
+        conn.execute("INSERT INTO atletas (num, nome, sexo, data_nascimento, modalidade) VALUES (5, 'Antigo', 'F', '01/01/1980', '5km')")
+        conn.commit()
+
+        manager.setup_database()
+
+        atleta = manager.obter_atleta_por_id(5)
+        assert (atleta['data_nascimento_iso'], atleta['idade'], atleta['faixa_etaria']) == ('1980-01-01', 45, '45-49')
+
+
+class TestPaginacaoAtletas:
+    """Testes para a paginação por keyset da tabela de atletas."""
+
+    @pytest.fixture
+    def manager_populado(self, db_manager):
+        nomes = ['Ana', 'Bia', 'Caio', 'Davi']
+        db_manager.adicionar_atletas_em_lote(
+            [(n, nomes[n % 4], 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 41)])
+        # Tempos repetidos e atletas sem tempo testam o desempate e o bloco final de nulos.
+        db_manager.atualizar_tempos_em_lote(
+            [(n, "2025-06-22T10:00:00", float(n % 7)) for n in range(1, 41) if n % 5])
+        return db_manager
+
+    @pytest.mark.parametrize("coluna", ["Nº", "Nome", "Tempo Bruto"])
+    @pytest.mark.parametrize("reverso", [False, True])
+    def test_paginas_reproduzem_a_ordem_completa(self, manager_populado, coluna, reverso):
+        completa = [r['num'] for r in manager_populado.obter_todos_atletas_para_tabela(coluna, reverso)]
+        paginas = list(manager_populado.iterar_paginas_atletas(coluna, reverso, tamanho_pagina=6))
+
+        assert [r['num'] for pagina in paginas for r in pagina] == completa
+        assert all(len(pagina) <= 6 for pagina in paginas)
+
+    @pytest.mark.parametrize("reverso", [False, True])
+    def test_paginas_por_idade_incluem_atletas_sem_idade(self, db_manager, reverso):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        # Datas inválidas deixam a idade nula; misturadas às válidas, os nulos
+        # caem no meio das páginas e também como última linha de uma página.
+        db_manager.adicionar_atletas_em_lote(
+            [(n, f'Atleta {n}', 'M', '31/02/1990' if n % 3 == 0 else f'01/01/{1960 + n % 11}', '5km', 'GERAL')
+             for n in range(1, 40)])
+        completa = [r['num'] for r in db_manager.obter_todos_atletas_para_tabela("Idade", reverso)]
+        paginas = list(db_manager.iterar_paginas_atletas("Idade", reverso, tamanho_pagina=5))
+
+        assert len(completa) == 39
+        assert [r['num'] for pagina in paginas for r in pagina] == completa
+
+    @pytest.mark.parametrize("reverso", [False, True])
+    @pytest.mark.parametrize("idade", [30, None])
+    def test_retomada_por_idade_usa_indice(self, db_manager, reverso, idade):
+        trechos = DatabaseManager._trechos_pagina("Idade", reverso, {'num': 3, 'idade': idade})
+        for predicado, params, ordem in trechos:
+            sql = f"EXPLAIN QUERY PLAN SELECT * FROM atletas WHERE evento_id = ? AND {predicado} ORDER BY {ordem} LIMIT 5"
+            plano = " | ".join(linha[3] for linha in db_manager._get_connection().execute(sql, (1, *params)))
+            assert "USING INDEX idx_atletas_idade" in plano
+            assert "USE TEMP B-TREE" not in plano
+
+    def test_pagina_seguinte_comeca_apos_a_ultima_linha(self, manager_populado):
+        primeira = manager_populado.obter_pagina_atletas("Nº", False, limite=10)
+        segunda = manager_populado.obter_pagina_atletas("Nº", False, limite=10, apos=primeira[-1])
+        assert [r['num'] for r in segunda] == list(range(11, 21))
+
+    @pytest.mark.parametrize("reverso, indice", [(False, "idx_atletas_tempo_asc"), (True, "idx_atletas_tempo_desc")])
+    @pytest.mark.parametrize("tempo", [10.0, None])
+    def test_retomada_por_tempo_usa_indice(self, db_manager, reverso, indice, tempo):
+        trechos = DatabaseManager._trechos_pagina("Tempo Bruto", reverso, {'num': 3, 'tempo_liquido': tempo})
+        for predicado, params, ordem in trechos:
+            sql = f"EXPLAIN QUERY PLAN SELECT * FROM atletas WHERE evento_id = ? AND {predicado} ORDER BY {ordem} LIMIT 5"
+            plano = " | ".join(linha[3] for linha in db_manager._get_connection().execute(sql, (1, *params)))
+            assert f"SEARCH atletas USING INDEX {indice}" in plano
+            assert "USE TEMP B-TREE" not in plano
+
+    def test_tabela_vazia_nao_gera_paginas(self, db_manager):
+        assert db_manager.obter_pagina_atletas("Nº", False) == []
+        assert list(db_manager.iterar_paginas_atletas("Nº", False)) == []
+
+
+class TestMultiplosEventos:
+    """Testes para vários eventos convivendo no mesmo arquivo de banco."""
+
+    @pytest.fixture
+    def dois_eventos(self, db_manager):
+        conn = db_manager._get_connection()
+        segundo_id = db_manager.criar_evento("Corrida Noturna").result()
+        segundo = DatabaseManager(db_path=':memory:', evento_id=segundo_id)
+        segundo._get_connection = lambda: conn
+        db_manager.adicionar_atletas_em_lote([(1, 'Ana', 'F', '01/01/1990', '5km', 'GERAL')])
+        segundo.adicionar_atletas_em_lote([(1, 'Bruno', 'M', '01/01/1985', '10km', 'GERAL')])
+        return db_manager, segundo
+
+    def test_mesmo_numero_de_peito_em_eventos_diferentes(self, dois_eventos):
+        primeiro, segundo = dois_eventos
+        assert primeiro.obter_atleta_por_id(1)['nome'] == 'Ana'
+        assert segundo.obter_atleta_por_id(1)['nome'] == 'Bruno'
+        assert [r['nome'] for r in segundo.obter_todos_atletas_para_tabela("Nº", False)] == ['Bruno']
+
+    def test_chegadas_e_estado_ficam_no_proprio_evento(self, dois_eventos):
+        primeiro, segundo = dois_eventos
+        segundo.registrar_chegada(1, "2025-06-22T20:30:00", 1800.0)
+        segundo.salvar_estado_corrida('largada', '2025-06-22T20:00:00')
+
+        assert primeiro.obter_atleta_por_id(1)['tempo_liquido'] is None
+        assert primeiro.obter_chegadas() == []
+        assert primeiro.carregar_estado_corrida('largada') is None
+        assert len(segundo.obter_chegadas()) == 1
+        assert [r['num'] for r in segundo.obter_classificados('M', 'GERAL')] == [1]
+        assert primeiro.obter_classificados('M', 'GERAL') == []
+
+    def test_reiniciar_prova_apaga_somente_o_evento(self, dois_eventos):
+        primeiro, segundo = dois_eventos
+        primeiro.registrar_chegada(1, "2025-06-22T10:30:00", 1800.0)
+        segundo.registrar_chegada(1, "2025-06-22T20:30:00", 1900.0)
+
+        primeiro.reiniciar_prova()
+
+        assert primeiro.obter_atleta_por_id(1) is None
+        assert segundo.obter_atleta_por_id(1)['tempo_liquido'] == 1900.0
+        segundo.reconstruir_resultados_do_journal()
+        assert segundo.obter_atleta_por_id(1)['tempo_liquido'] == 1900.0
+
+    def test_remocoes_sao_visiveis_apenas_no_evento(self, dois_eventos):
+        primeiro, segundo = dois_eventos
+        versao = primeiro.versao_atual()
+        primeiro.reiniciar_prova()
+
+        assert primeiro.obter_atletas_alterados_desde(versao)[1] == [1]
+        assert segundo.obter_atletas_alterados_desde(versao)[1] == []
+
+    def test_listar_e_selecionar_evento(self, dois_eventos):
+        primeiro, segundo = dois_eventos
+        observador = Mock()
+        primeiro.attach(observador)
+
+        assert [(e[0], e[1]) for e in primeiro.listar_eventos()] == [(1, 'Evento padrão'), (segundo.evento_id, 'Corrida Noturna')]
+        primeiro.selecionar_evento(segundo.evento_id)
+
+        assert primeiro.obter_atleta_por_id(1)['nome'] == 'Bruno'
+        observador.update.assert_called_once_with(primeiro, AlteracoesDB(recarga_total=True))
+
+    def test_banco_antigo_vira_evento_padrao(self, db_manager_no_setup):
+        manager = db_manager_no_setup
+        conn = manager._get_connection()
+        conn.execute("""CREATE TABLE atletas (num INTEGER PRIMARY KEY, nome TEXT NOT NULL, sexo TEXT NOT NULL,
+                        data_nascimento TEXT NOT NULL, modalidade TEXT NOT NULL, tempo_absoluto_chegada TEXT,
+                        tempo_liquido REAL, categoria TEXT NOT NULL DEFAULT 'GERAL')""")
+        conn.execute("CREATE TABLE estado_corrida (chave TEXT PRIMARY KEY, valor TEXT)")
+        conn.execute("INSERT INTO atletas (num, nome, sexo, data_nascimento, modalidade) VALUES (7, 'Antigo', 'M', '01/01/1990', '5km')")
+        conn.execute("INSERT INTO estado_corrida VALUES ('largada', '2025-06-22T08:00:00')")
+        conn.commit()
+
+        manager.setup_database()
+
+        assert manager.obter_atleta_por_id(7)['nome'] == 'Antigo'
+        assert manager.carregar_estado_corrida('largada') == '2025-06-22T08:00:00'
+
+
+class TestBuscaPorNome:
+    """Testes para a busca por nome parcial (índice FTS5 'atletas_busca')."""
+
+    @pytest.fixture
+    def manager_com_nomes(self, db_manager):
+        db_manager.adicionar_atletas_em_lote([
+            (1, 'José da Silva', 'M', '01/01/1990', '5km', 'GERAL'),
+            (2, 'Maria Silveira', 'F', '01/01/1990', '5km', 'GERAL'),
+            (3, 'João Santos', 'M', '01/01/1990', '10km', 'GERAL'),
+        ])
+        return db_manager
+
+    def _nums(self, manager, texto):
+        return sorted(r['num'] for r in manager.buscar_atletas(texto))
+
+    def test_prefixos_sem_acento_nem_maiusculas(self, manager_com_nomes):
+        assert self._nums(manager_com_nomes, "jose") == [1]
+        assert self._nums(manager_com_nomes, "SIL") == [1, 2]
+        assert self._nums(manager_com_nomes, "jo sil") == [1]
+        assert self._nums(manager_com_nomes, "pereira") == []
+        assert manager_com_nomes.buscar_atletas("  ") == []
+
+    def test_indice_acompanha_edicoes_e_substituicoes(self, manager_com_nomes):
+        manager = manager_com_nomes
+        manager.atualizar_dados_atleta(3, 'João Pereira', 'M', '01/01/1990', 'GERAL', '10km')
+        manager.adicionar_atletas_em_lote([(2, 'Marta Rocha', 'F', '01/01/1990', '5km', 'GERAL')])
+
+        assert self._nums(manager, "pereira") == [3]
+        assert self._nums(manager, "santos") == []
+        assert self._nums(manager, "silveira") == []
+        assert self._nums(manager, "rocha") == [2]
+        assert manager._get_connection().execute("SELECT COUNT(*) FROM atletas_busca").fetchone()[0] == 3
+
+        manager.reiniciar_prova()
+        assert manager.buscar_atletas("silva") == []
+
+    def test_busca_restrita_ao_evento(self, manager_com_nomes):
+        conn = manager_com_nomes._get_connection()
+        outro = DatabaseManager(db_path=':memory:', evento_id=manager_com_nomes.criar_evento("Outro").result())
+        outro._get_connection = lambda: conn
+        outro.adicionar_atletas_em_lote([(1, 'José Outro', 'M', '01/01/1990', '5km', 'GERAL')])
+
+        assert [r['nome'] for r in outro.buscar_atletas("jose")] == ['José Outro']
+        assert [r['nome'] for r in manager_com_nomes.buscar_atletas("jose")] == ['José da Silva']
+
+    def test_sem_fts_usa_like(self, manager_com_nomes):
+        manager = manager_com_nomes
+        conn = manager._get_connection()
+        for trigger in ("substituir", "insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER trg_atletas_busca_{trigger}")
+        conn.execute("DROP TABLE atletas_busca")
+        manager._busca_fts = None
+
+        assert self._nums(manager, "silv") == [1, 2]
+        assert self._nums(manager, "joão san") == [3]
+
+
+class TestClassificacao:
+    """Testes para a classificação materializada mantida a cada chegada."""
+
+    @pytest.fixture
+    def manager_com_atletas(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.adicionar_atletas_em_lote([
+            (1, 'Um', 'M', '01/01/1990', '5km', 'GERAL'),
+            (2, 'Dois', 'M', '01/01/1992', '5km', 'GERAL'),
+            (3, 'Tres', 'F', '01/01/1990', '5km', 'GERAL'),
+            (4, 'Quatro', 'M', '01/01/1970', '5km', 'GERAL'),
+            (5, 'Cinco', 'M', '01/01/1991', '5km', 'PCD'),
+        ])
+        return db_manager
+
+    @staticmethod
+    def _posicoes(manager, num):
+        linha = manager.obter_posicao(num)
+        return None if linha is None else (linha['pos_geral'], linha['pos_sexo'], linha['pos_categoria'], linha['pos_faixa'])
+
+    def test_chegada_fora_de_ordem_desloca_quem_vem_atras(self, manager_com_atletas):
+        manager = manager_com_atletas
+        manager.registrar_chegada(1, "t", 1500.0)
+        manager.registrar_chegada(3, "t", 1600.0)
+        manager.registrar_chegada(2, "t", 1400.0)
+
+        assert self._posicoes(manager, 2) == (1, 1, 1, 1)
+        assert self._posicoes(manager, 1) == (2, 2, 2, 1)  # 1 (1990) e 2 (1992) estão em faixas diferentes
+        assert self._posicoes(manager, 3) == (3, 1, 1, 1)
+        assert manager.obter_posicao(4) is None
+
+    def test_nova_chegada_do_mesmo_atleta_reposiciona(self, manager_com_atletas):
+        manager = manager_com_atletas
+        manager.atualizar_tempos_em_lote([(1, "t", 1500.0), (2, "t", 1400.0), (4, "t", 1450.0)])
+        manager.registrar_chegada(2, "t", 1550.0)
+
+        assert [r['num'] for r in manager.obter_podio('M', limite=None)] == [4, 1, 2]
+        assert [r['posicao'] for r in manager.obter_podio('M', limite=None)] == [1, 2, 3]
+
+    def test_edicao_de_categoria_move_o_atleta_de_grupo(self, manager_com_atletas):
+        manager = manager_com_atletas
+        manager.atualizar_tempos_em_lote([(1, "t", 1500.0), (5, "t", 1450.0)])
+        manager.atualizar_dados_atleta(1, 'Um', 'M', '01/01/1990', 'PCD', '5km')
+
+        assert [r['num'] for r in manager.obter_podio('M', 'PCD')] == [5, 1]
+        assert manager.obter_podio('M', 'GERAL') == []
+
+    def test_podio_por_faixa_e_limite(self, manager_com_atletas):
+        manager = manager_com_atletas
+        manager.atualizar_tempos_em_lote([(n, "t", 1000.0 + n) for n in range(1, 6)])
+
+        assert [r['num'] for r in manager.obter_podio('M', 'GERAL', '35-39')] == [1]
+        assert [r['num'] for r in manager.obter_podio('M', 'GERAL', limite=2)] == [1, 2]
+        assert [r['num'] for r in manager.obter_podio(limite=3)] == [1, 2, 3]
+        assert ('GERAL', 'M', '55-59') in manager.obter_grupos_classificacao()
+
+    def test_podio_e_leitura_indexada(self, manager_com_atletas):
+        sql = ("EXPLAIN QUERY PLAN SELECT num FROM classificacao WHERE evento_id = ? AND categoria = ? AND sexo = ? "
+               "AND faixa_etaria IS ? AND pos_faixa <= ? ORDER BY pos_faixa")
+        plano = " | ".join(l[3] for l in manager_com_atletas._get_connection().execute(sql, (1, 'GERAL', 'M', '30-34', 3)))
+        assert "idx_classificacao_faixa" in plano
+        assert "USE TEMP B-TREE" not in plano
+
+    def test_incremental_igual_ao_recalculo_completo(self, manager_com_atletas):
+        import random
+        manager = manager_com_atletas
+        aleatorio = random.Random(7)
+        manager.adicionar_atletas_em_lote(
+            [(n, f'A{n}', aleatorio.choice('MF'), f'01/01/{aleatorio.randint(1950, 2005)}', '5km',
+              aleatorio.choice(['GERAL', 'PCD'])) for n in range(10, 110)])
+        for _ in range(150):
+            manager.registrar_chegada(aleatorio.randint(1, 109), "t", float(aleatorio.randint(1000, 1100)))
+
+        conn = manager._get_connection()
+        consulta = "SELECT num, pos_geral, pos_sexo, pos_categoria, pos_faixa FROM classificacao ORDER BY num"
+        incremental = conn.execute(consulta).fetchall()
+        manager._recalcular_classificacao(conn.cursor(), 1)
+        assert conn.execute(consulta).fetchall() == incremental
+
+    def test_reiniciar_e_reconstruir_mantem_a_classificacao(self, manager_com_atletas):
+        manager = manager_com_atletas
+        manager.atualizar_tempos_em_lote([(1, "t", 1500.0), (2, "t", 1400.0)])
+        manager.reconstruir_resultados_do_journal()
+        assert self._posicoes(manager, 2) == (1, 1, 1, 1)
+
+        manager.reiniciar_prova()
+        assert manager.obter_podio(limite=None) == []
+
+
+class TestSincronizacaoAtletas:
+    """Testes para a reimportação diferencial (hash cadastral)."""
+
+    LISTA = [(n, f'Atleta {n}', 'M' if n % 2 else 'F', '01/01/1990', '5km', 'GERAL') for n in range(1, 6)]
+
+    @pytest.fixture
+    def manager(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.sincronizar_atletas_em_blocos([self.LISTA]).result()
+        return db_manager
+
+    def test_primeira_importacao_insere_todos(self, manager):
+        assert [r['num'] for r in manager.obter_todos_atletas_para_tabela("Nº", False)] == [1, 2, 3, 4, 5]
+        assert manager.obter_atleta_por_id(1)['idade'] == 35
+
+    def test_reimportacao_escreve_so_o_que_mudou_e_preserva_tempos(self, manager):
+        manager.registrar_chegada(2, "2025-06-22T10:30:00", 1800.0)
+        _, _, versao = manager.obter_atletas_alterados_desde(0)
+        observador = Mock()
+        manager.attach(observador)
+        lista = list(self.LISTA)
+        lista[1] = (2, 'Atleta Dois', 'F', '01/01/1990', '5km', 'PCD')
+        lista.append((6, 'Atleta 6', 'F', '01/01/2000', '10km', 'GERAL'))
+
+        resumo = manager.sincronizar_atletas_em_blocos([lista[:3], lista[3:]]).result()
+
+        assert (resumo.inseridos, resumo.alterados, resumo.removidos, resumo.inalterados) == ([6], [2], [], 4)
+        atleta = manager.obter_atleta_por_id(2)
+        assert (atleta['nome'], atleta['categoria'], atleta['tempo_liquido']) == ('Atleta Dois', 'PCD', 1800.0)
+        assert manager.obter_posicao(2)['categoria'] == 'PCD'
+        alterados, _, _ = manager.obter_atletas_alterados_desde(versao)
+        assert sorted(r['num'] for r in alterados) == [2, 6]
+        alteracoes = observador.update.call_args.args[1]
+        assert (alteracoes.atletas_inseridos, alteracoes.atletas_atualizados) == ({6}, {2})
+
+    def test_ausentes_sao_removidos_exceto_quem_ja_chegou(self, manager):
+        manager.registrar_chegada(4, "2025-06-22T10:30:00", 1800.0)
+
+        resumo = manager.sincronizar_atletas_em_blocos([self.LISTA[:2]], remover_ausentes=True).result()
+
+        assert (resumo.removidos, resumo.preservados) == ([3, 5], [4])
+        assert [r['num'] for r in manager.obter_todos_atletas_para_tabela("Nº", False)] == [1, 2, 4]
+
+    def test_sem_remover_ausentes_o_arquivo_so_acrescenta(self, manager):
+        resumo = manager.sincronizar_atletas_em_blocos([[(9, 'Nove', 'M', '01/01/1990', '5km', 'GERAL')]]).result()
+
+        assert (resumo.inseridos, resumo.removidos, resumo.inalterados) == ([9], [], 0)
+        assert manager.obter_atleta_por_id(1) is not None
+
+    def test_cancelamento_nao_grava_nada(self, manager):
+        from crono_app.custom_exceptions import ImportacaoCanceladaError
+        cancelamento = threading.Event()
+
+        def blocos():
+            yield [(1, 'Renomeado', 'M', '01/01/1990', '5km', 'GERAL')]
+            cancelamento.set()
+            yield [(7, 'Sete', 'M', '01/01/1990', '5km', 'GERAL')]
+
+        with pytest.raises(ImportacaoCanceladaError):
+            manager.sincronizar_atletas_em_blocos(blocos(), cancelamento).result()
+
+        assert manager.obter_atleta_por_id(1)['nome'] == 'Atleta 1'
+        assert manager.obter_atleta_por_id(7) is None
+
+    def test_edicao_manual_sobrevive_a_reimportacao_da_mesma_linha(self, manager):
+        manager.atualizar_dados_atleta(3, 'Nome Corrigido', 'M', '01/01/1990', 'GERAL', '5km')
+
+        resumo = manager.sincronizar_atletas_em_blocos([self.LISTA]).result()
+
+        assert resumo.alterados == []
+        assert manager.obter_atleta_por_id(3)['nome'] == 'Nome Corrigido'
+
+
+class TestGerenciadorDeConexoes:
+    """Testes para as conexões persistentes por thread e o modo WAL."""
+
+    def test_mesma_thread_reutiliza_conexao(self, tmp_path):
+        gerenciador = GerenciadorDeConexoes(str(tmp_path / "pool.db"))
+        assert gerenciador.obter() is gerenciador.obter()
+        gerenciador.fechar_todas()
+
+    def test_threads_diferentes_recebem_conexoes_diferentes(self, tmp_path):
+        gerenciador = GerenciadorDeConexoes(str(tmp_path / "pool.db"))
+        principal = gerenciador.obter()
+        outras = []
+        t = threading.Thread(target=lambda: outras.append(gerenciador.obter()))
+        t.start()
+        t.join()
+        assert outras[0] is not principal
+        gerenciador.fechar_todas()
+
+    def test_banco_em_arquivo_usa_wal(self, tmp_path):
+        manager = DatabaseManager(str(tmp_path / "wal.db"))
+        manager.setup_database()
+        with manager._get_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        manager.fechar()
+
+    def test_leitor_nao_bloqueia_durante_transacao_de_escrita(self, tmp_path):
+        """Com WAL, um leitor em outra thread enxerga o último commit enquanto há uma escrita aberta."""
+        manager = DatabaseManager(str(tmp_path / "wal.db"))
+        manager.setup_database()
+        manager.adicionar_atletas_em_lote([(1, 'Atleta', 'M', '01/01/1990', '5km', 'GERAL')])
+
+        conn = manager._get_connection()
+        conn.execute("UPDATE atletas SET tempo_liquido = 10.0 WHERE num = 1")  # transação aberta
+        lidos = []
+        t = threading.Thread(target=lambda: lidos.append(manager.obter_atleta_por_id(1)))
+        t.start()
+        t.join(timeout=2)
+        conn.commit()
+
+        assert lidos and lidos[0]['tempo_liquido'] is None
+        manager.fechar()
+
+    def test_banco_em_memoria_compartilha_conexao_entre_threads(self):
+        gerenciador = GerenciadorDeConexoes(":memory:")
+        principal = gerenciador.obter()
+        outras = []
+        t = threading.Thread(target=lambda: outras.append(gerenciador.obter()))
+        t.start()
+        t.join()
+        assert outras[0] is principal
+        gerenciador.fechar_todas()
+
+
+class TestEscritorDedicado:
+    """Testes para a thread escritora única e o group commit."""
+
+    @pytest.fixture
+    def manager_arquivo(self, tmp_path):
+        manager = DatabaseManager(str(tmp_path / "escritor.db"))
+        manager.setup_database()
+        yield manager
+        manager.fechar()
+
+    def test_escrita_sincrona_retorna_future_resolvido(self, db_manager):
+        futuro = db_manager.adicionar_atletas_em_lote([(1, 'Atleta', 'M', '01/01/1990', '5km', 'GERAL')])
+        assert futuro.done()
+        assert futuro.exception() is None
+
+    def test_escritas_enfileiradas_sao_confirmadas_pela_thread(self, manager_arquivo):
+        manager = manager_arquivo
+        manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 51)])
+        manager.iniciar_escritor()
+
+        futuros = [manager.atualizar_tempo_atleta(n, "2025-06-22T10:00:00", float(n)) for n in range(1, 51)]
+        for futuro in futuros:
+            futuro.result(timeout=5)
+
+        assert manager._escritor.ativo
+        assert manager.obter_atleta_por_id(50)['tempo_liquido'] == 50.0
+
+    def test_grupo_pendente_gera_um_commit_e_uma_notificacao(self, manager_arquivo):
+        manager = manager_arquivo
+        confirmados = []
+        escritor = EscritorDeBanco(manager._get_connection, lambda ops: confirmados.append(len(ops)))
+        futuros = [
+            escritor.submeter(lambda c, i=i: c.execute("INSERT INTO categorias (nome) VALUES (?)", (f"CAT{i}",)), "inserir")
+            for i in range(20)
+        ]
+        escritor.iniciar()
+        for futuro in futuros:
+            futuro.result(timeout=5)
+        escritor.parar()
+
+        assert confirmados == [20]
+        assert len(manager.listar_categorias()) == 20
+
+    def test_falha_isolada_nao_desfaz_o_restante_do_grupo(self, manager_arquivo):
+        manager = manager_arquivo
+        escritor = EscritorDeBanco(manager._get_connection)
+        ok1 = escritor.submeter(lambda c: c.execute("INSERT INTO categorias (nome) VALUES ('A')"), "inserir A")
+        falha = escritor.submeter(lambda c: c.execute("INSERT INTO categorias (nome) VALUES ('A')"), "inserir A de novo")
+        ok2 = escritor.submeter(lambda c: c.execute("INSERT INTO categorias (nome) VALUES ('B')"), "inserir B")
+        escritor.iniciar()
+        ok1.result(timeout=5)
+        ok2.result(timeout=5)
+        with pytest.raises(sqlite3.IntegrityError):
+            falha.result(timeout=5)
+        escritor.parar()
+
+        assert [c[1] for c in manager.listar_categorias()] == ['A', 'B']
+
+    def test_observador_com_erro_nao_derruba_o_escritor(self, manager_arquivo):
+        manager = manager_arquivo
+        escritor = EscritorDeBanco(manager._get_connection, Mock(side_effect=RuntimeError("observador")))
+        escritor.iniciar()
+        escritor.submeter(lambda c: c.execute("INSERT INTO categorias (nome) VALUES ('A')"), "inserir A").result(timeout=5)
+        segunda = escritor.submeter(lambda c: c.execute("INSERT INTO categorias (nome) VALUES ('B')"), "inserir B")
+
+        segunda.result(timeout=5)
+        assert escritor.ativo
+        escritor.parar()
+
+    def test_falha_ao_obter_conexao_resolve_todos_os_futures(self):
+        conexoes = iter([RuntimeError("sem conexão")])
+
+        def obter_conexao():
+            raise next(conexoes, sqlite3.OperationalError("ainda sem conexão"))
+
+        escritor = EscritorDeBanco(obter_conexao)
+        futuros = [escritor.submeter(lambda c: None, f"operação {i}") for i in range(3)]
+        escritor.iniciar()
+
+        for futuro in futuros:
+            with pytest.raises(RuntimeError):
+                futuro.result(timeout=5)
+        with pytest.raises(sqlite3.OperationalError):
+            escritor.submeter(lambda c: None, "depois da falha").result(timeout=5)
+        escritor.parar()
+
+    def test_parar_com_timeout_mantem_o_escritor_ativo(self, manager_arquivo):
+        manager = manager_arquivo
+        liberar = threading.Event()
+        manager.iniciar_escritor()
+        bloqueada = manager._escritor.submeter(lambda c: liberar.wait(5), "operação lenta")
+
+        escritor = manager._escritor
+        with patch.object(escritor, "parar", lambda: EscritorDeBanco.parar(escritor, timeout=0.05)):
+            manager.fechar()
+        assert escritor.ativo
+        # As conexões continuam abertas enquanto a thread ainda escreve.
+        assert manager._conexoes._conexoes
+
+        liberar.set()
+        bloqueada.result(timeout=5)
+        escritor.parar()
+        assert not escritor.ativo
+
+    def test_chegada_durante_importacao_e_confirmada_antes_do_fim(self, manager_arquivo):
+        manager = manager_arquivo
+        manager.adicionar_atletas_em_lote([(1, 'Atleta 1', 'M', '01/01/1990', '5km', 'GERAL')])
+        manager.iniciar_escritor()
+        confirmadas = []
+
+        def blocos():
+            yield [(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(2, 100)]
+            # Os blocos são lidos fora do escritor: a chegada não espera a importação.
+            confirmadas.append(manager.registrar_chegada(1, "2025-06-22T10:30:00", 1800.0).result(timeout=2))
+            yield [(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(100, 200)]
+
+        resumo = manager.sincronizar_atletas_em_blocos(blocos()).result(timeout=5)
+
+        assert len(confirmadas) == 1
+        assert len(resumo.inseridos) == 198
+        assert manager.obter_atleta_por_id(1)['tempo_liquido'] == 1800.0
+
+    def test_parar_escritor_drena_fila(self, manager_arquivo):
+        manager = manager_arquivo
+        manager.iniciar_escritor()
+        futuros = [manager.adicionar_categoria(f"CAT{i}") for i in range(10)]
+        manager.parar_escritor()
+        assert all(f.done() for f in futuros)
+        assert len(manager.listar_categorias()) == 10
+
+
+class TestTagsRFID:
+    """Testes para a associação de chips RFID aos atletas."""
+
+    @pytest.fixture
+    def manager(self, db_manager):
+        db_manager.definir_data_evento(date(2025, 6, 22))
+        db_manager.sincronizar_atletas_em_blocos([TestSincronizacaoAtletas.LISTA]).result()
+        return db_manager
+
+    def test_atleta_pode_ter_varios_chips_e_tag_e_normalizada(self, manager):
+        manager.associar_tags([(' e200a1 ', 1), ('E200A2', 1), ('E200B1', 2)]).result()
+
+        assert manager.obter_tags_rfid() == {'E200A1': 1, 'E200A2': 1, 'E200B1': 2}
+        assert manager.obter_tags_do_atleta(1) == ['E200A1', 'E200A2']
+
+    def test_chip_reassociado_passa_para_o_novo_atleta(self, manager):
+        manager.associar_tags([('E200A1', 1)]).result()
+        observador = Mock()
+        manager.attach(observador)
+
+        manager.associar_tags([('E200A1', 3)]).result()
+        manager.remover_tags(['e200a1']).result()
+
+        assert manager.obter_tags_rfid() == {}
+        assert observador.update.call_args.args[1].tags_rfid
+
+    def test_reiniciar_e_remover_atletas_apagam_os_chips(self, manager):
+        manager.associar_tags([('E1', 1), ('E3', 3)]).result()
+
+        manager.sincronizar_atletas_em_blocos([TestSincronizacaoAtletas.LISTA[:2]], remover_ausentes=True).result()
+        assert manager.obter_tags_rfid() == {'E1': 1}
+
+        manager.reiniciar_prova().result()
+        assert manager.obter_tags_rfid() == {}
+
+    def test_situacao_dos_atletas(self, manager):
+        manager.registrar_chegada(2, "2025-06-22T10:30:00", 1800.0)
+
+        assert manager.obter_situacao_atletas([1, 2]) == [(1, 'Atleta 1', 0), (2, 'Atleta 2', 1)]
+        assert manager.obter_situacao_atletas([]) == []
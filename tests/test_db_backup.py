@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import threading
+
+import pytest
+
+from crono_app.database_manager import DatabaseManager
+from crono_app.db_backup import ServicoDeBackup, RelatorioBackup
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "race_data.db"))
+    manager.setup_database()
+    manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 201)])
+    yield manager
+    manager.fechar()
+
+
+class TestServicoDeBackup:
+    """Testes para as cópias de segurança online do banco."""
+
+    def test_backup_gera_copia_consistente_e_relatorio(self, manager, tmp_path):
+        servico = ServicoDeBackup(manager.db_path, str(tmp_path / "backups"), paginas_por_passo=2)
+
+        relatorio = servico.executar_backup()
+
+        assert isinstance(relatorio, RelatorioBackup)
+        assert relatorio.caminho.exists()
+        assert relatorio.bytes == relatorio.caminho.stat().st_size > 0
+        assert relatorio.passos > 1  # copiado em vários passos pequenos
+        with sqlite3.connect(relatorio.caminho) as copia:
+            assert copia.execute("SELECT COUNT(*) FROM atletas").fetchone()[0] == 200
+            assert copia.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+
+    def test_retencao_mantem_apenas_as_copias_mais_recentes(self, manager, tmp_path):
+        servico = ServicoDeBackup(manager.db_path, str(tmp_path / "backups"), retencao=2)
+
+        relatorios = [servico.executar_backup() for _ in range(4)]
+
+        assert servico.listar_backups() == [r.caminho for r in relatorios[-2:]]
+
+    def test_backup_nao_bloqueia_escritas_concorrentes(self, manager, tmp_path):
+        servico = ServicoDeBackup(manager.db_path, str(tmp_path / "backups"),
+                                  paginas_por_passo=1, pausa_entre_passos=0.01)
+        manager.iniciar_escritor()
+        thread = threading.Thread(target=servico.executar_backup)
+        thread.start()
+
+        # Com o backup em andamento, as chegadas continuam sendo confirmadas.
+        for n in range(1, 21):
+            manager.registrar_chegada(n, "2025-06-22T10:00:00", float(n)).result(timeout=2)
+        thread.join(timeout=30)
+
+        assert manager.obter_atleta_por_id(20)['tempo_liquido'] == 20.0
+        assert servico.ultimo_relatorio is not None
+
+    def test_servico_periodico_chama_callback(self, manager, tmp_path):
+        concluido = threading.Event()
+        servico = ServicoDeBackup(manager.db_path, str(tmp_path / "backups"), intervalo=0.05,
+                                  ao_concluir=lambda relatorio: concluido.set())
+        servico.iniciar()
+        try:
+            assert concluido.wait(timeout=5)
+        finally:
+            servico.parar()
+        assert not servico.ativo
+
+    def test_retencao_invalida_lanca_erro(self, tmp_path):
+        with pytest.raises(ValueError):
+            ServicoDeBackup(str(tmp_path / "x.db"), retencao=0)
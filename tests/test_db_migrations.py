@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import logging
+import sqlite3
+from unittest.mock import Mock
+
+import pytest
+
+from crono_app.db_migrations import Migracao, MIGRACOES, VERSAO_SCHEMA, aplicar_migracoes, versao_schema
+from crono_app.utils import hash_cadastro
+
+
+@pytest.fixture
+def conn():
+    conexao = sqlite3.connect(':memory:')
+    yield conexao
+    conexao.close()
+
+
+def _tabelas(conn):
+    return {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+
+class TestAplicarMigracoes:
+    """Testes para o executor de migrações baseado em PRAGMA user_version."""
+
+    def test_banco_novo_chega_a_versao_atual(self, conn):
+        assert aplicar_migracoes(conn) == VERSAO_SCHEMA
+        assert versao_schema(conn) == VERSAO_SCHEMA
+        assert {'atletas', 'estado_corrida', 'categorias', 'chegadas', 'versao_atletas', 'atletas_removidos',
+                'eventos', 'tags_rfid'} <= _tabelas(conn)
+
+    def test_versoes_sao_sequenciais(self):
+        assert [m.versao for m in MIGRACOES] == list(range(1, len(MIGRACOES) + 1))
+
+    def test_banco_em_dia_nao_executa_nenhuma_migracao(self, conn):
+        passo = Mock()
+        migracoes = [Migracao(1, "passo", passo)]
+        aplicar_migracoes(conn, migracoes)
+        aplicar_migracoes(conn, migracoes)
+        passo.assert_called_once()
+
+    def test_apenas_migracoes_pendentes_sao_aplicadas(self, conn):
+        primeiro, segundo = Mock(), Mock()
+        aplicar_migracoes(conn, [Migracao(1, "primeiro", primeiro)])
+        aplicar_migracoes(conn, [Migracao(1, "primeiro", primeiro), Migracao(2, "segundo", segundo)])
+        primeiro.assert_called_once()
+        segundo.assert_called_once()
+        assert versao_schema(conn) == 2
+
+    def test_falha_desfaz_a_migracao_e_preserva_a_versao(self, conn):
+        def quebra(cursor):
+            cursor.execute("CREATE TABLE parcial (id INTEGER)")
+            cursor.execute("SELECT * FROM tabela_inexistente")
+
+        with pytest.raises(sqlite3.OperationalError):
+            aplicar_migracoes(conn, [Migracao(1, "ok", lambda c: c.execute("CREATE TABLE ok (id INTEGER)")),
+                                     Migracao(2, "quebra", quebra)])
+
+        assert versao_schema(conn) == 1
+        assert 'ok' in _tabelas(conn)
+        assert 'parcial' not in _tabelas(conn)
+
+    def test_banco_anterior_as_migracoes_e_atualizado(self, conn):
+        # Schema original, sem 'categoria' e sem user_version.
+        conn.execute("""CREATE TABLE atletas (num INTEGER PRIMARY KEY, nome TEXT NOT NULL, sexo TEXT NOT NULL,
+                        data_nascimento TEXT NOT NULL, modalidade TEXT NOT NULL,
+                        tempo_absoluto_chegada TEXT, tempo_liquido REAL)""")
+        conn.execute("INSERT INTO atletas (num, nome, sexo, data_nascimento, modalidade) VALUES (1, 'Antigo', 'M', '01/01/1990', '5km')")
+        conn.commit()
+
+        aplicar_migracoes(conn)
+
+        linha = conn.execute("SELECT categoria, versao, data_nascimento_iso, hash_cadastro FROM atletas WHERE num = 1").fetchone()
+        assert linha == ('GERAL', 1, '1990-01-01', hash_cadastro(1, 'Antigo', 'M', '01/01/1990', '5km', 'GERAL'))
+
+    def test_tempo_de_cada_passo_e_registrado(self, conn, caplog):
+        with caplog.at_level(logging.INFO, logger="crono_app.db_migrations"):
+            aplicar_migracoes(conn)
+        mensagens = [r.getMessage() for r in caplog.records if "aplicada em" in r.getMessage()]
+        assert len(mensagens) == len(MIGRACOES)
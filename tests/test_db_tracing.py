@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import logging
+import sqlite3
+
+import pytest
+
+from crono_app.database_manager import DatabaseManager
+from crono_app.db_tracing import InstrumentacaoSQL, normalizar_sql
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "trace.db"))
+    manager.setup_database()
+    manager.adicionar_atletas_em_lote([(n, f'Atleta {n}', 'M', '01/01/1990', '5km', 'GERAL') for n in range(1, 6)])
+    yield manager
+    manager.desativar_instrumentacao()
+    manager.fechar()
+
+
+def _estatistica(instrumentacao, trecho):
+    return next(e for e in instrumentacao.resumo() if trecho in e.sql)
+
+
+class TestInstrumentacaoSQL:
+    """Testes para a instrumentação opcional das consultas."""
+
+    def test_desativada_entrega_a_conexao_original(self, manager):
+        assert isinstance(manager._get_connection(), sqlite3.Connection)
+
+    def test_conta_execucoes_e_linhas_por_comando(self, manager):
+        instrumentacao = manager.ativar_instrumentacao()
+        manager.obter_atleta_por_id(1)
+        manager.obter_atleta_por_id(2)
+        manager.obter_todos_atletas_para_tabela("Nº", False)
+
+        por_id = _estatistica(instrumentacao, "FROM atletas WHERE evento_id =? AND num =?")
+        assert (por_id.execucoes, por_id.linhas) == (2, 2)
+        tabela = _estatistica(instrumentacao, "ORDER BY num ASC")
+        assert (tabela.execucoes, tabela.linhas) == (1, 5)
+        assert tabela.p50 <= tabela.p95 <= tabela.p99 <= tabela.tempo_total
+
+    def test_escritas_do_escritor_sao_medidas(self, manager):
+        instrumentacao = manager.ativar_instrumentacao()
+        manager.iniciar_escritor()
+        manager.atualizar_tempos_em_lote([(1, "2025-06-22T10:00:00", 600.0), (2, "2025-06-22T10:01:00", 660.0)]).result(5)
+        manager.parar_escritor()
+
+        derivacao = _estatistica(instrumentacao, "UPDATE atletas SET tempo_absoluto_chegada")
+        assert derivacao.linhas == 2
+        assert manager.obter_atleta_por_id(2)['tempo_liquido'] == 660.0
+
+    def test_listas_in_de_tamanhos_diferentes_sao_o_mesmo_comando(self):
+        assert normalizar_sql("SELECT * FROM t WHERE num IN (?, ?)") == normalizar_sql("SELECT *\n FROM t WHERE num IN (?,?,?)")
+
+    def test_percentis(self):
+        instrumentacao = InstrumentacaoSQL(limite_lento=10)
+        for ms in range(1, 101):
+            instrumentacao.registrar("SELECT 1", ms / 1000, 1)
+        estatistica = instrumentacao.resumo()[0]
+        assert (estatistica.p50, estatistica.p95, estatistica.p99) == (0.05, 0.095, 0.099)
+        assert estatistica.execucoes == 100
+
+    def test_consultas_lentas_vao_para_o_log_e_o_arquivo(self, manager, tmp_path, caplog):
+        arquivo = tmp_path / "lentas.log"
+        manager.ativar_instrumentacao(limite_lento=0, arquivo_lento=str(arquivo))
+        with caplog.at_level(logging.WARNING, logger="crono_app.db_tracing.lento"):
+            manager.obter_atleta_por_id(3)
+        manager.desativar_instrumentacao()
+
+        assert any("parâmetros=(1, 3)" in r.getMessage() for r in caplog.records)
+        assert "num =?" in arquivo.read_text(encoding="utf-8")
+
+    def test_resumo_registrado_no_log(self, manager, caplog):
+        instrumentacao = manager.ativar_instrumentacao()
+        manager.obter_atleta_por_id(1)
+        with caplog.at_level(logging.INFO, logger="crono_app.db_tracing"):
+            instrumentacao.registrar_resumo()
+        assert "Instrumentação SQL" in caplog.text
+        assert "p95" in caplog.text
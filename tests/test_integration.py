@@ -1,7 +1,8 @@
 # test_integration.py
 import pytest
 import logging
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+import time
 import sys
 import os
 
@@ -119,3 +120,218 @@ def test_atualizar_tempo_atleta(gerenciador, tmp_path, data_evento_padrao):
     assert atleta_atualizado['tempo_absoluto_chegada'] == tempo_chegada.isoformat()
     # Usar pytest.approx para comparar números de ponto flutuante com segurança
     assert atleta_atualizado['tempo_liquido'] == pytest.approx(tempo_liquido_segundos)
+
+
+def _escrever_csv_grande(caminho, quantidade):
+    linhas = ["num,nome,sexo,data_nascimento,modalidade,categoria"]
+    linhas += [f"{n},Atleta {n},{'M' if n % 2 else 'F'},01/01/1990,10k,GERAL" for n in range(1, quantidade + 1)]
+    caminho.write_text("\n".join(linhas) + "\n", encoding='utf-8')
+
+
+def test_importacao_em_blocos_reporta_progresso(gerenciador, temp_db, tmp_path, data_evento_padrao):
+    """Arquivos maiores que um bloco são gravados em partes, com progresso a cada bloco."""
+    csv_path = tmp_path / "grande.csv"
+    _escrever_csv_grande(csv_path, 250)
+    # Um número repetido no último bloco ainda é reconhecido como duplicado.
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write("7,Repetido,M,01/01/1990,10k,GERAL\n")
+
+    relatorios = []
+    sucesso, erros = gerenciador.carregar_atletas_csv(
+        str(csv_path), data_evento_padrao,
+        progresso=lambda p: relatorios.append((p.linhas, p.importados, p.percentual)), tamanho_bloco=100)
+
+    assert sucesso == 250
+    assert erros == ["Linha 252: Erro inesperado - Número de atleta duplicado no arquivo: 7"]
+    assert [importados for _, importados, _ in relatorios] == [100, 200, 250]
+    assert relatorios[-1] == (251, 250, 100.0)
+    assert temp_db.obter_atleta_por_id(7)['nome'] == "Atleta 7"
+
+
+def test_importacao_cancelada_nao_grava_nada(gerenciador, temp_db, tmp_path, data_evento_padrao):
+    """Cancelar entre blocos desfaz tudo o que a importação já havia inserido."""
+    import threading
+    from crono_app.custom_exceptions import ImportacaoCanceladaError
+
+    csv_path = tmp_path / "grande.csv"
+    _escrever_csv_grande(csv_path, 300)
+    cancelamento = threading.Event()
+
+    def progresso(p):
+        if p.importados >= 100:
+            cancelamento.set()
+
+    with pytest.raises(ImportacaoCanceladaError):
+        gerenciador.carregar_atletas_csv(str(csv_path), data_evento_padrao, progresso=progresso,
+                                         cancelamento=cancelamento, tamanho_bloco=100)
+
+    assert temp_db.obter_atleta_por_id(1) is None
+
+
+def test_validacao_paralela_equivale_a_sequencial(temp_db, tmp_path, data_evento_padrao):
+    """Números de linha, erros e duplicados entre faixas batem com a leitura sequencial."""
+    from crono_app import business_logic
+    from crono_app.database_manager import DatabaseManager
+
+    linhas = ["num,nome,sexo,data_nascimento,modalidade,categoria"]
+    for n in range(1, 601):
+        linhas.append(f"{n},Atleta {n},M,01/01/1990,10k,GERAL")
+    linhas[150] = "150,Sem Sexo,X,01/01/1990,10k,GERAL"
+    linhas[420] = "abc,Numero Invalido,F,01/01/1990,10k,GERAL"
+    linhas.append("5,Duplicado do inicio,F,01/01/1990,10k,GERAL")
+    csv_path = tmp_path / "paralelo.csv"
+    csv_path.write_text("\n".join(linhas) + "\n", encoding='utf-8')
+
+    outro_db = DatabaseManager(str(tmp_path / "sequencial.db"))
+    outro_db.setup_database()
+    sequencial = GerenciadorDeCorrida(outro_db, logging.getLogger()).carregar_atletas_csv(
+        str(csv_path), data_evento_padrao, processos=1)
+
+    # Faixas pequenas para o arquivo ser dividido entre vários processos.
+    original = business_logic.BYTES_POR_FAIXA_PARALELA
+    business_logic.BYTES_POR_FAIXA_PARALELA = 2000
+    try:
+        paralelo = GerenciadorDeCorrida(temp_db, logging.getLogger()).carregar_atletas_csv(
+            str(csv_path), data_evento_padrao, processos=2, tamanho_bloco=64)
+    finally:
+        business_logic.BYTES_POR_FAIXA_PARALELA = original
+
+    assert paralelo == sequencial
+    sucesso, erros = paralelo
+    assert sucesso == 598
+    assert [e.split(":")[0] for e in erros] == ["Linha 151", "Linha 421", "Linha 602"]
+    assert "duplicado" in erros[-1]
+    assert temp_db.obter_atleta_por_id(5)['nome'] == "Atleta 5"
+
+
+def test_validacao_paralela_grava_cada_bloco_ao_chegar(gerenciador, temp_db, tmp_path, data_evento_padrao, monkeypatch):
+    """Cada bloco validado pelo pool é gravado antes do seguinte, com progresso após cada gravação."""
+    from crono_app import business_logic
+
+    csv_path = tmp_path / "paralelo.csv"
+    _escrever_csv_grande(csv_path, 300)
+    eventos = []
+    executar_escrita = temp_db._executar_escrita
+
+    def espiar(funcao, descricao, *args, **kwargs):
+        eventos.append(("escrita", descricao))
+        return executar_escrita(funcao, descricao, *args, **kwargs)
+
+    monkeypatch.setattr(temp_db, "_executar_escrita", espiar)
+    monkeypatch.setattr(business_logic, "BYTES_POR_FAIXA_PARALELA", 2000)
+    sucesso, _ = gerenciador.carregar_atletas_csv(
+        str(csv_path), data_evento_padrao, processos=2, tamanho_bloco=50,
+        progresso=lambda p: eventos.append(("progresso", p.importados)))
+
+    assert sucesso == 300
+    gravados = 0
+    for tipo, valor in eventos:
+        if tipo == "escrita" and valor == "preparar bloco de importação":
+            gravados += 1
+        elif tipo == "progresso":
+            # O progresso só conta blocos que já estão no banco.
+            assert valor == 50 * gravados
+    assert gravados == 6
+
+
+def test_validacao_paralela_recorre_a_sequencial_com_quebra_entre_aspas(gerenciador, temp_db, tmp_path, data_evento_padrao):
+    """Um campo entre aspas com quebra de linha na fronteira de uma faixa não corrompe a importação."""
+    from crono_app import business_logic
+
+    linhas = ["num,nome,sexo,data_nascimento,modalidade,categoria"]
+    linhas += [f'{n},"Atleta\nNome {n}",M,01/01/1990,10k,GERAL' for n in range(1, 301)]
+    csv_path = tmp_path / "aspas.csv"
+    csv_path.write_text("\n".join(linhas) + "\n", encoding='utf-8')
+
+    original = business_logic.BYTES_POR_FAIXA_PARALELA
+    business_logic.BYTES_POR_FAIXA_PARALELA = 1000
+    try:
+        sucesso, erros = gerenciador.carregar_atletas_csv(str(csv_path), data_evento_padrao, processos=2)
+    finally:
+        business_logic.BYTES_POR_FAIXA_PARALELA = original
+
+    assert (sucesso, erros) == (300, [])
+    assert temp_db.obter_atleta_por_id(300)['nome'] == "Atleta\nNome 300"
+
+
+def test_reimportacao_preserva_tempos_e_reporta_o_delta(gerenciador, temp_db, tmp_path, data_evento_padrao):
+    """Reimportar a lista atualizada no meio da prova não apaga os tempos já registrados."""
+    csv_path = tmp_path / "lista.csv"
+    _escrever_csv_grande(csv_path, 50)
+    gerenciador.carregar_atletas_csv(str(csv_path), data_evento_padrao)
+    temp_db.registrar_chegada(10, "2024-10-26T09:40:00", 2400.0)
+
+    conteudo = csv_path.read_text(encoding='utf-8').replace("10,Atleta 10,F", "10,Atleta Dez,F")
+    csv_path.write_text(conteudo, encoding='utf-8')
+    sucesso, erros = gerenciador.carregar_atletas_csv(str(csv_path), data_evento_padrao)
+
+    resumo = gerenciador.ultima_sincronizacao
+    assert (sucesso, erros) == (50, [])
+    assert (resumo.alterados, resumo.inseridos, resumo.inalterados) == ([10], [], 49)
+    atleta = temp_db.obter_atleta_por_id(10)
+    assert (atleta['nome'], atleta['tempo_liquido']) == ("Atleta Dez", 2400.0)
+
+
+def test_chegada_por_rfid_com_varios_chips(gerenciador, temp_db, tmp_path, data_evento_padrao):
+    from crono_app.custom_exceptions import AtletaNaoEncontradoError, ChegadaJaRegistradaError, ErroLogicaCorrida
+    temp_db.definir_data_evento(data_evento_padrao)
+    temp_db.sincronizar_atletas_em_blocos([[(10, 'Ana', 'F', '01/01/1990', '5k', 'GERAL'),
+                                             (20, 'Bruno', 'M', '01/01/1990', '5k', 'GERAL')]]).result()
+    tags = tmp_path / "tags.csv"
+    tags.write_text("tag,num\ne200a,10\nE200B,10\nE200C,20\nE200C,10\nE200D,99\n", encoding='utf-8')
+
+    associados, erros = gerenciador.carregar_tags_csv(str(tags))
+
+    assert associados == 3
+    assert erros == ["Linha 5: Tag duplicada no arquivo: E200C", "Linha 6: Atleta #99 não está inscrito."]
+    with pytest.raises(ErroLogicaCorrida):
+        gerenciador.registrar_chegada_por_rfid("E200A")
+
+    temp_db.salvar_estado_corrida('horario_largada', datetime(2024, 10, 26, 8, 0).isoformat())
+    gerenciador.preparar_indice_rfid()
+    chegada = gerenciador.registrar_chegada_por_rfid(" e200a ", antena=2)
+
+    assert (chegada.num, chegada.nome, chegada.tag) == (10, 'Ana', 'E200A')
+    registro = temp_db.obter_chegadas(10)[0]
+    assert (registro['origem'], registro['tag'], registro['antena']) == ('RFID', 'E200A', 2)
+    assert temp_db.obter_atleta_por_id(10)['tempo_liquido'] == pytest.approx(chegada.tempo_liquido)
+    with pytest.raises(ChegadaJaRegistradaError):
+        gerenciador.registrar_chegada_por_rfid("E200B")  # o outro chip do mesmo atleta
+    with pytest.raises(AtletaNaoEncontradoError):
+        gerenciador.registrar_chegada_por_rfid("FFFF")
+
+
+def test_chegada_por_rfid_usa_o_instante_da_passagem(gerenciador, temp_db, data_evento_padrao):
+    temp_db.definir_data_evento(data_evento_padrao)
+    temp_db.sincronizar_atletas_em_blocos([[(10, 'Ana', 'F', '01/01/1990', '5k', 'GERAL')]]).result()
+    temp_db.associar_tags([("E200A", 10)]).result()
+    largada = datetime(2024, 10, 26, 8, 0)
+    temp_db.salvar_estado_corrida('horario_largada', largada.isoformat())
+
+    chegada = gerenciador.registrar_chegada_por_rfid("E200A", 1, largada.timestamp() + 1234.567)
+
+    assert chegada.tempo_liquido == pytest.approx(1234.567)
+    assert temp_db.obter_atleta_por_id(10)['tempo_liquido'] == pytest.approx(1234.567)
+
+
+@pytest.mark.parametrize("desvio, usa_instante", [(3600.0, False), (-3600.0, True)])
+def test_chegada_por_rfid_com_relogio_da_ponte_desalinhado(gerenciador, temp_db, data_evento_padrao, caplog,
+                                                          desvio, usa_instante):
+    """Instante adiantado usa o momento do registro; muito atrasado é mantido. Ambos geram aviso."""
+    temp_db.definir_data_evento(data_evento_padrao)
+    temp_db.sincronizar_atletas_em_blocos([[(10, 'Ana', 'F', '01/01/1990', '5k', 'GERAL')]]).result()
+    temp_db.associar_tags([("E200A", 10)]).result()
+    largada = datetime.now() - timedelta(hours=2)
+    temp_db.salvar_estado_corrida('horario_largada', largada.isoformat())
+    instante = time.time() + desvio
+
+    with caplog.at_level(logging.WARNING):
+        antes = (datetime.now() - largada).total_seconds()
+        chegada = gerenciador.registrar_chegada_por_rfid("E200A", 1, instante)
+        depois = (datetime.now() - largada).total_seconds()
+
+    if usa_instante:
+        assert chegada.tempo_liquido == pytest.approx(instante - largada.timestamp())
+    else:
+        assert antes <= chegada.tempo_liquido <= depois
+    assert any("relógio" in r.getMessage() and "E200A" in r.getMessage() for r in caplog.records)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from crono_app.business_logic import validar_linha_csv
+from crono_app.parallel_csv import dividir_em_faixas, ler_cabecalho, validar_em_ordem
+
+
+def _escrever(caminho, linhas):
+    caminho.write_bytes(("\n".join(linhas) + "\n").encode("utf-8-sig"))
+
+
+class TestFaixasCSV:
+    """Testes para a divisão do arquivo em faixas de bytes."""
+
+    def test_cabecalho_ignora_bom(self, tmp_path):
+        caminho = tmp_path / "a.csv"
+        _escrever(caminho, ["num,nome", "1,Ana"])
+        campos, inicio = ler_cabecalho(str(caminho))
+        assert campos == ["num", "nome"]
+        assert caminho.read_bytes()[inicio:] == b"1,Ana\n"
+
+    def test_faixas_cobrem_o_arquivo_em_linhas_inteiras(self, tmp_path):
+        caminho = tmp_path / "a.csv"
+        _escrever(caminho, ["num,nome"] + [f"{n},Atleta {'x' * (n % 7)}" for n in range(1, 200)])
+        _, inicio = ler_cabecalho(str(caminho))
+        dados = caminho.read_bytes()
+
+        faixas = dividir_em_faixas(str(caminho), inicio, 8)
+
+        assert 1 < len(faixas) <= 8
+        assert faixas[0].inicio == inicio and faixas[-1].fim == len(dados)
+        assert all(a.fim == b.inicio for a, b in zip(faixas, faixas[1:]))
+        assert all(dados[f.fim - 1:f.fim] == b"\n" for f in faixas)
+
+    def test_arquivo_so_com_cabecalho_nao_tem_faixas(self, tmp_path):
+        caminho = tmp_path / "a.csv"
+        _escrever(caminho, ["num,nome"])
+        _, inicio = ler_cabecalho(str(caminho))
+        assert dividir_em_faixas(str(caminho), inicio, 4) == []
+
+    def test_resultados_por_faixa_preservam_a_ordem(self, tmp_path):
+        caminho = tmp_path / "a.csv"
+        cabecalho = "num,nome,sexo,data_nascimento,modalidade,categoria"
+        _escrever(caminho, [cabecalho] + [f"{n},Atleta {n},F,01/01/1990,5k," for n in range(1, 101)])
+        campos, inicio = ler_cabecalho(str(caminho))
+        faixas = dividir_em_faixas(str(caminho), inicio, 5)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            entregues = list(validar_em_ordem(executor, str(caminho), faixas, campos,
+                                              validar_linha_csv, date(2025, 1, 1), em_andamento=2))
+            resultados = [r for _, linhas in entregues for r in linhas]
+
+        assert [faixa for faixa, _ in entregues] == faixas
+
+        assert [num for num, _, _ in resultados] == list(range(1, 101))
+        assert resultados[0] == (1, (1, "Atleta 1", "F", "01/01/1990", "5k", "GERAL"), None)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from crono_app.rfid_dedup import DeduplicadorLeituras, LeituraRFID, interpretar_leitura
+
+
+def leitura(tag, antena=1, rssi=None, instante=0.0):
+    return LeituraRFID(tag, antena, rssi, instante)
+
+
+class TestInterpretarLeitura:
+
+    def test_formatos_aceitos(self):
+        assert interpretar_leitura("E200,1", recebida=5.0) == LeituraRFID("E200", 1, None, 5.0)
+        assert interpretar_leitura("E200,2,-48.5\n", recebida=5.0) == LeituraRFID("E200", 2, -48.5, 5.0)
+        assert interpretar_leitura("E200,2,,1750000000.5") == LeituraRFID("E200", 2, None, 1750000000.5)
+        assert interpretar_leitura("E200,1,-50,2025-06-22T10:00:00+00:00").instante == 1750586400.0
+
+    @pytest.mark.parametrize("linha", ["TAG:123", "E200,x", ",1", "E200,1,forte", "E200,1,-50,ontem", "a,1,2,3,4"])
+    def test_formatos_invalidos(self, linha):
+        assert interpretar_leitura(linha) is None
+
+
+class TestDeduplicadorLeituras:
+
+    def test_primeira_entrega_na_hora_e_descarta_o_resto_da_passagem(self):
+        dedup = DeduplicadorLeituras(janela=1.0)
+
+        assert dedup.registrar(leitura("A", 1), agora=0.0) == [leitura("A", 1)]
+        assert dedup.registrar(leitura("A", 2), agora=0.5) == []
+        # A passagem se estende enquanto o chip continua sendo lido.
+        assert dedup.registrar(leitura("A", 3), agora=1.2) == []
+        assert dedup.descartadas == 2
+        assert dedup.expirar(agora=2.2) == []
+        assert len(dedup) == 0
+        assert dedup.registrar(leitura("A", 4), agora=2.3) == [leitura("A", 4)]
+
+    def test_ultima_entrega_ao_fim_da_passagem(self):
+        dedup = DeduplicadorLeituras(janela=1.0, politica="ultima")
+
+        dedup.registrar(leitura("A", 1), agora=0.0)
+        dedup.registrar(leitura("A", 2), agora=0.5)
+
+        assert dedup.expirar(agora=1.4) == []
+        assert dedup.expirar(agora=1.5) == [leitura("A", 2)]
+
+    def test_pico_rssi_escolhe_o_sinal_mais_forte(self):
+        dedup = DeduplicadorLeituras(janela=1.0, politica="pico_rssi")
+
+        dedup.registrar(leitura("A", 1, rssi=None), agora=0.0)
+        dedup.registrar(leitura("A", 2, rssi=-62), agora=0.1)
+        dedup.registrar(leitura("A", 3, rssi=-41), agora=0.2)
+        dedup.registrar(leitura("B", 1, rssi=-70), agora=0.3)
+        dedup.registrar(leitura("A", 4, rssi=-58), agora=0.4)
+
+        # Uma leitura nova também encerra as passagens vencidas, em ordem.
+        assert dedup.registrar(leitura("C"), agora=1.35) == [leitura("B", 1, rssi=-70)]
+        assert dedup.esvaziar() == [leitura("A", 3, rssi=-41), leitura("C")]
+
+    def test_parametros_invalidos(self):
+        with pytest.raises(ValueError):
+            DeduplicadorLeituras(politica="media")
+        with pytest.raises(ValueError):
+            DeduplicadorLeituras(janela=0)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+from unittest.mock import Mock
+
+from crono_app.database_manager import AlteracoesDB
+from crono_app.rfid_index import IndiceRFID
+
+
+@pytest.fixture
+def db():
+    db = Mock()
+    db.obter_tags_rfid.return_value = {'E1': 1, 'E1B': 1, 'E2': 2}
+    db.obter_situacao_atletas.return_value = [(1, 'Ana', False), (2, 'Bruno', True)]
+    return db
+
+
+@pytest.fixture
+def indice(db):
+    indice = IndiceRFID(db)
+    indice.carregar()
+    db.reset_mock()
+    return indice
+
+
+def test_se_registra_como_observador(db):
+    indice = IndiceRFID(db)
+    db.attach.assert_called_once_with(indice)
+
+
+def test_leituras_sao_resolvidas_sem_consultar_o_banco(indice, db):
+    for _ in range(3):
+        assert indice.num_por_tag('E1') == indice.num_por_tag('E1B') == 1
+        assert indice.nome(1) == 'Ana'
+        assert indice.ja_chegou(2)
+    assert indice.num_por_tag('DESCONHECIDA') is None
+
+    db.obter_tags_rfid.assert_not_called()
+    db.obter_situacao_atletas.assert_not_called()
+
+
+def test_marcar_chegada_e_atomico(indice):
+    assert indice.marcar_chegada(1)
+    assert not indice.marcar_chegada(1)
+    indice.desmarcar_chegada(1)
+    assert not indice.ja_chegou(1)
+
+
+def test_carga_e_preguicosa_e_mudanca_de_chips_descarta_o_indice(db):
+    indice = IndiceRFID(db)
+    assert not indice.carregado
+    assert indice.num_por_tag('E2') == 2
+
+    indice.update(db, AlteracoesDB(tags_rfid=True))
+    db.obter_tags_rfid.return_value = {'E2': 1}
+
+    assert indice.num_por_tag('E2') == 1
+    assert db.obter_tags_rfid.call_count == 2
+
+
+def test_atleta_alterado_e_relido_so_quando_lido(indice, db):
+    indice.update(db, AlteracoesDB(atletas_atualizados={1}, atletas_removidos={2}))
+    db.obter_situacao_atletas.return_value = [(1, 'Ana Maria', True)]
+
+    assert indice.nome(2) is None
+    db.obter_situacao_atletas.assert_not_called()
+    assert indice.nome(1) == 'Ana Maria'
+    assert indice.ja_chegou(1)
+    indice.nome(1)
+    db.obter_situacao_atletas.assert_called_once_with([1])
+
+
+def test_descarte_concorrente_nao_quebra_a_leitura(indice, db):
+    """update() na thread do notificador pode descartar o índice logo depois da carga."""
+
+    class LockComNotificacao:
+        # Ao liberar o lock da carga, outra thread descarta o índice antes
+        # que a leitura continue.
+        def __init__(self):
+            self._lock = threading.Lock()
+            self.armado = False
+
+        def __enter__(self):
+            self._lock.acquire()
+
+        def __exit__(self, *exc):
+            self._lock.release()
+            if self.armado:
+                self.armado = False
+                notificador = threading.Thread(target=indice.update, args=(None, AlteracoesDB(tags_rfid=True)))
+                notificador.start()
+                notificador.join()
+
+    indice.update(None, AlteracoesDB(recarga_total=True))
+    indice._lock = LockComNotificacao()
+    indice._lock.armado = True
+
+    assert indice.num_por_tag('E2') == 2
+    assert not indice.carregado
+
+
+def test_carga_que_cruza_um_descarte_nao_fica_no_indice(indice, db):
+    indice.update(None, AlteracoesDB(recarga_total=True))
+
+    def obter_tags_antigas():
+        # A associação muda enquanto a carga ainda lê o banco.
+        indice.update(None, AlteracoesDB(tags_rfid=True))
+        return {'E1': 1}
+
+    db.obter_tags_rfid.side_effect = obter_tags_antigas
+    assert indice.num_por_tag('E1') == 1
+    assert not indice.carregado
@@ -129,7 +129,9 @@ class TestRFIDReaderReadLoop:
         reader._read_loop()
 
         assert not data_queue.empty()
-        assert data_queue.get() == "12345"
+        received_at, line = data_queue.get()
+        assert line == "12345"
+        assert isinstance(received_at, float)
         assert reader.connection_status == "Conectado"
         mock_sleep.assert_not_called()
 
@@ -214,7 +216,9 @@ class TestRFIDReaderReadLoop:
         reader._read_loop()
 
         assert not data_queue.empty()
-        assert data_queue.get() == "TAG123"
+        received_at, line = data_queue.get()
+        assert line == "TAG123"
+        assert isinstance(received_at, float)
         mock_sleep.assert_not_called()
 
     @patch('rfid_bridge.rfid_reader.serial.Serial')
@@ -313,7 +317,35 @@ class TestRFIDReaderIntegration:
         while not data_queue.empty():
             received_data.append(data_queue.get())
 
-        assert received_data == test_data
+        assert [line for _, line in received_data] == test_data
+        instants = [received_at for received_at, _ in received_data]
+        assert instants == sorted(instants)
+
+
+class TestRFIDReaderReadTags:
+    """Testes para a conversão das linhas da serial em leituras."""
+
+    def test_read_tags_keeps_the_receipt_time_of_each_line(self):
+        data_queue = queue.Queue()
+        reader = RFIDReader(data_queue)
+        for received_at, line in [(100.00, "E1,2,-61"), (100.05, "E1,2,-55"), (100.10, "E1,3,-58")]:
+            data_queue.put((received_at, line))
+
+        # Retiradas da fila de uma vez, as leituras mantêm instantes distintos.
+        assert reader.read_tags(timeout=0.1) == [
+            ("E1", 2, -61.0, 100.00), ("E1", 2, -55.0, 100.05), ("E1", 3, -58.0, 100.10)]
+
+    def test_read_tags_skips_malformed_lines(self):
+        data_queue = queue.Queue()
+        reader = RFIDReader(data_queue)
+        data_queue.put((1.0, "E1,x"))
+        data_queue.put((2.0, "E2"))
+
+        with patch('builtins.print'):
+            assert reader.read_tags(timeout=0.1) == [("E2", 1, None, 2.0)]
+
+    def test_read_tags_times_out_empty(self):
+        assert RFIDReader(queue.Queue()).read_tags(timeout=0.01) == []
 
 
 class TestMockRFIDReader:
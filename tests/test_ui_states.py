@@ -2,6 +2,8 @@
 # tests/test_ui_states.py
 
 import pytest
+import sqlite3
+from concurrent.futures import Future
 from unittest.mock import MagicMock, patch, call
 from datetime import datetime, date
 from tkinter import messagebox
@@ -63,7 +65,7 @@ class TestPreparacaoState:
             "red": "#d12e2e"
         }
         app.data_do_evento = date(2025, 6, 22)
-        app.db.obter_todos_atletas_para_tabela.return_value = []
+        app.db.obter_pagina_atletas.return_value = []
         return app
     
     @pytest.fixture
@@ -98,7 +100,7 @@ class TestPreparacaoState:
     
     def test_handle_ui_update_sem_atletas(self, state, app_mock):
         """Testa atualização da UI quando não há atletas."""
-        app_mock.db.obter_todos_atletas_para_tabela.return_value = []
+        app_mock.db.obter_pagina_atletas.return_value = []
         
         state.handle_ui_update(app_mock)
         
@@ -112,9 +114,8 @@ class TestPreparacaoState:
     
     def test_handle_ui_update_com_atletas(self, state, app_mock):
         """Testa atualização da UI quando há atletas."""
-        app_mock.db.obter_todos_atletas_para_tabela.return_value = [
-            ["1", "João", "M", "25", "Adulto", "10K", ""],
-            ["2", "Maria", "F", "30", "Adulto", "10K", ""]
+        app_mock.db.obter_pagina_atletas.return_value = [
+            ["1", "João", "M", "25", "Adulto", "10K", ""]
         ]
         
         state.handle_ui_update(app_mock)
@@ -238,6 +239,7 @@ class TestEmCursoState:
         )
         app_mock.entry_horario_largada.delete.assert_not_called()
         app_mock.entry_horario_largada.insert.assert_not_called()
+        app_mock.gerenciador.preparar_indice_rfid.assert_called_once()
     
     def test_handle_ui_update(self, state, app_mock):
         """Testa atualização da UI durante a corrida."""
@@ -257,24 +259,43 @@ class TestEmCursoState:
         horario_largada = "2025-06-22T10:00:00"
         
         app_mock.db.obter_atleta_por_id.return_value = {"num": 123, "nome": "João"}
-        app_mock.db.carregar_estado_corrida.return_value = horario_largada
+        app_mock.db.carregar_estado_datetime.return_value = datetime.fromisoformat(horario_largada)
         
         with patch('crono_app.ui_states.datetime') as mock_datetime:
             # Mock do horário atual (11:30:45)
             mock_datetime.now.return_value = datetime(2025, 6, 22, 11, 30, 45)
-            mock_datetime.fromisoformat.return_value = datetime(2025, 6, 22, 10, 0, 0)
             
             state.handle_registrar_chegada(app_mock, num_atleta_str)
             
             # Verificar chamadas
             app_mock.db.obter_atleta_por_id.assert_called_with(123)
-            app_mock.db.carregar_estado_corrida.assert_called_with('horario_largada')
-            app_mock.db.atualizar_tempo_atleta.assert_called_once()
+            app_mock.db.carregar_estado_datetime.assert_called_with('horario_largada')
+            app_mock.db.carregar_estado_corrida.assert_not_called()
+            app_mock.db.atualizar_tempo_atleta.assert_called_once_with(123, "2025-06-22T11:30:45", 5445.0)
             
             # Verificar limpeza da entrada
             app_mock.chegada_num_var.set.assert_called_with("")
             app_mock.entry_chegada.focus.assert_called_once()
     
+    def test_handle_registrar_chegada_falha_na_gravacao_avisa_pelo_tk(self, state, app_mock):
+        """Uma escrita que falha na thread escritora chega ao operador pela fila do Tk."""
+        app_mock.db.obter_atleta_por_id.return_value = {"num": 123}
+        app_mock.db.carregar_estado_datetime.return_value = datetime(2025, 6, 22, 10, 0, 0)
+        futuro = Future()
+        app_mock.db.atualizar_tempo_atleta.return_value = futuro
+
+        with patch('crono_app.ui_states.messagebox') as mock_msgbox:
+            state.handle_registrar_chegada(app_mock, "123")
+            app_mock.agendar_na_ui.assert_not_called()
+
+            futuro.set_exception(sqlite3.OperationalError("database is locked"))
+
+            funcao, *args = app_mock.agendar_na_ui.call_args.args
+            mock_msgbox.showerror.assert_not_called()
+            funcao(*args)
+            mock_msgbox.showerror.assert_called_once_with(
+                "Erro ao Registrar", "A chegada do atleta #123 não foi gravada: database is locked")
+
     def test_handle_registrar_chegada_atleta_nao_encontrado(self, state, app_mock):
         """Testa registro de chegada com atleta inexistente."""
         num_atleta_str = "999"
@@ -294,7 +315,7 @@ class TestEmCursoState:
         """Testa registro de chegada sem horário de largada definido."""
         num_atleta_str = "123"
         app_mock.db.obter_atleta_por_id.return_value = {"num": 123}
-        app_mock.db.carregar_estado_corrida.return_value = None
+        app_mock.db.carregar_estado_datetime.return_value = None
         
         with patch('crono_app.ui_states.messagebox') as mock_msgbox:
             state.handle_registrar_chegada(app_mock, num_atleta_str)
@@ -324,12 +345,11 @@ class TestEmCursoState:
         horario_largada = "2025-06-22T12:00:00"  # Largada às 12:00
         
         app_mock.db.obter_atleta_por_id.return_value = {"num": 123}
-        app_mock.db.carregar_estado_corrida.return_value = horario_largada
+        app_mock.db.carregar_estado_datetime.return_value = datetime.fromisoformat(horario_largada)
         
         with patch('crono_app.ui_states.datetime') as mock_datetime:
             # Horário atual antes da largada (11:00)
             mock_datetime.now.return_value = datetime(2025, 6, 22, 11, 0, 0)
-            mock_datetime.fromisoformat.return_value = datetime(2025, 6, 22, 12, 0, 0)
             
             with patch('crono_app.ui_states.messagebox') as mock_msgbox:
                 state.handle_registrar_chegada(app_mock, num_atleta_str)
@@ -1,13 +1,13 @@
 # test_utils.py
 import pytest
-from datetime import timedelta
+from datetime import date, timedelta
 import sys
 import os
 
 # Adiciona o diretório da aplicação principal ao sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
-from crono_app.utils import formatar_timedelta
+from crono_app.utils import formatar_timedelta, converter_data_nascimento, calcular_idade, faixa_etaria_para_idade
 
 # --- Testes do Módulo Utils ---
 
@@ -71,3 +71,20 @@ def test_formatar_timedelta_negativo():
     resultado = formatar_timedelta(delta)
     assert resultado.startswith("-")
     assert "01:30:45" in resultado
+
+
+# --- Idade e faixa etária ---
+
+def test_converter_data_nascimento_aceita_formato_brasileiro_e_iso():
+    assert converter_data_nascimento("20/05/1990") == date(1990, 5, 20)
+    assert converter_data_nascimento("1990-05-20") == date(1990, 5, 20)
+    assert converter_data_nascimento("31/02/1990") is None
+    assert converter_data_nascimento("") is None
+
+def test_calcular_idade_considera_aniversario():
+    assert calcular_idade(date(1990, 6, 22), date(2025, 6, 22)) == 35
+    assert calcular_idade(date(1990, 6, 23), date(2025, 6, 22)) == 34
+
+@pytest.mark.parametrize("idade, faixa", [(12, "Até 19"), (19, "Até 19"), (20, "20-24"), (34, "30-34"), (69, "65-69"), (70, "70+")])
+def test_faixa_etaria_para_idade(idade, faixa):
+    assert faixa_etaria_para_idade(idade) == faixa